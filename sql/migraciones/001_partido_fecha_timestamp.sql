@@ -0,0 +1,33 @@
+-- Convierte partido.fecha / partido.hora (texto, p. ej. '2024-05-20' y '8:00 PM') en una única
+-- columna partido.fecha de tipo TIMESTAMP y crea los índices de las consultas por rango de fechas.
+-- PostgreSQL. Ejecutar una sola vez, dentro de una transacción.
+
+BEGIN;
+
+ALTER TABLE partido ADD COLUMN IF NOT EXISTS sets_local INTEGER;
+ALTER TABLE partido ADD COLUMN IF NOT EXISTS sets_visitante INTEGER;
+
+ALTER TABLE partido ADD COLUMN fecha_hora TIMESTAMP;
+
+UPDATE partido
+SET fecha_hora = CASE
+    WHEN hora ~* '(AM|PM)$' THEN to_timestamp(fecha || ' ' || upper(hora), 'YYYY-MM-DD HH12:MI AM')
+    ELSE to_timestamp(fecha || ' ' || hora, 'YYYY-MM-DD HH24:MI')
+END;
+
+ALTER TABLE partido DROP COLUMN hora;
+ALTER TABLE partido DROP COLUMN fecha;
+ALTER TABLE partido RENAME COLUMN fecha_hora TO fecha;
+ALTER TABLE partido ALTER COLUMN fecha SET NOT NULL;
+
+DROP INDEX IF EXISTS ix_partido_local_fecha_id;
+DROP INDEX IF EXISTS ix_partido_visitante_fecha_id;
+CREATE INDEX ix_partido_local_fecha_id ON partido (equipo_local_id, fecha, id);
+CREATE INDEX ix_partido_visitante_fecha_id ON partido (equipo_visitante_id, fecha, id);
+CREATE INDEX IF NOT EXISTS ix_partido_fecha_id ON partido (fecha, id);
+
+CREATE INDEX IF NOT EXISTS ix_estadistica_partido_id_id ON estadistica (partido_id, id);
+CREATE INDEX IF NOT EXISTS ix_estadistica_partido_jugador ON estadistica (partido_id, jugador_id);
+CREATE INDEX IF NOT EXISTS ix_estado_jugador_partido_id_id ON estado_jugador (partido_id, id);
+
+COMMIT;
@@ -0,0 +1,36 @@
+-- Una sola fila de estadística y de estado por (partido, jugador), necesaria para los upserts
+-- INSERT … ON CONFLICT, y tabla de respuestas guardadas por Idempotency-Key.
+-- PostgreSQL. Ejecutar una sola vez, dentro de una transacción. Los duplicados existentes se
+-- eliminan conservando la fila más reciente (mayor id); después hay que recalcular la
+-- clasificación con: python -m src.clasificacion reconstruir
+
+BEGIN;
+
+DELETE FROM estadistica e
+USING estadistica mas_reciente
+WHERE e.partido_id = mas_reciente.partido_id
+  AND e.jugador_id = mas_reciente.jugador_id
+  AND e.id < mas_reciente.id;
+
+DELETE FROM estado_jugador e
+USING estado_jugador mas_reciente
+WHERE e.partido_id = mas_reciente.partido_id
+  AND e.jugador_id = mas_reciente.jugador_id
+  AND e.id < mas_reciente.id;
+
+DROP INDEX IF EXISTS ix_estadistica_partido_jugador;
+ALTER TABLE estadistica
+    ADD CONSTRAINT uq_estadistica_partido_jugador UNIQUE (partido_id, jugador_id);
+ALTER TABLE estado_jugador
+    ADD CONSTRAINT uq_estado_jugador_partido_jugador UNIQUE (partido_id, jugador_id);
+
+CREATE TABLE IF NOT EXISTS clave_idempotencia (
+    clave VARCHAR(255) PRIMARY KEY,
+    huella VARCHAR(64) NOT NULL,
+    estado INTEGER NOT NULL,
+    respuesta TEXT NOT NULL,
+    creada TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_clave_idempotencia_creada ON clave_idempotencia (creada);
+
+COMMIT;
@@ -0,0 +1,14 @@
+"""
+Los módulos viven en un directorio por componente (src/app/app.py, src/cache/cache.py, …) pero se
+importan como src.<módulo>: el paquete busca sus submódulos en cada uno de esos directorios.
+
+    from src.app import crear_app          # src/app/app.py
+    from src.database import conectar_db   # src/superliga_db/database.py
+    from src.negocio import crear_equipo   # src/relaciones/relaciones.py
+"""
+import os
+
+_DIRECTORIO = os.path.dirname(__file__)
+
+__path__ = [os.path.join(_DIRECTORIO, nombre) for nombre in sorted(os.listdir(_DIRECTORIO))
+            if os.path.isdir(os.path.join(_DIRECTORIO, nombre)) and not nombre.startswith(("_", "."))]
@@ -0,0 +1,272 @@
+"""
+Analítica de estadísticas sobre una matriz NumPy jugador × partido × métrica.
+
+La matriz se carga con una sola consulta y se refresca de forma incremental: en cada lectura se
+recargan solo las columnas de los partidos cuya versión cambió desde el último refresco (ver
+src.versiones), así que las escrituras nuevas aparecen sin volver a leer toda la temporada.
+Los líderes, percentiles por posición y medias móviles son operaciones vectorizadas sobre la matriz;
+en el modo asíncrono se calculan en un hilo aparte para no bloquear el event loop.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from src.database import ejecutar_bloqueante, Estadistica, Jugador, Partido, VersionEntidad
+from src.negocio import CAMPOS_ESTADISTICA
+
+MODOS = ("total", "promedio")
+PERCENTILES = (25, 50, 75, 90)
+# Las versiones se escriben antes del commit; el margen cubre transacciones que tardan en confirmarse.
+MARGEN_REFRESCO = timedelta(seconds=30)
+
+
+def _consulta_estadisticas():
+    return (
+        select(Estadistica.jugador_id, Estadistica.partido_id, Partido.fecha, Jugador.posicion,
+               *(getattr(Estadistica, campo) for campo in CAMPOS_ESTADISTICA))
+        .join(Partido, Partido.id == Estadistica.partido_id)
+        .join(Jugador, Jugador.id == Estadistica.jugador_id)
+    )
+
+
+def _indice_metrica(metrica: str) -> int:
+    if metrica not in CAMPOS_ESTADISTICA:
+        raise ValueError(f"Métrica desconocida: {metrica}. Opciones: {', '.join(CAMPOS_ESTADISTICA)}")
+    return CAMPOS_ESTADISTICA.index(metrica)
+
+
+class MatrizEstadisticas:
+    """
+    valores[j, p, m] es la suma de la métrica m del jugador j en el partido p y jugo[j, p] indica si
+    el jugador tiene alguna estadística en ese partido. Filas y columnas crecen por duplicación.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cargada = False
+        self.ultimo_refresco = None
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.jugadores = np.zeros(0, dtype=np.int64)
+        self.posiciones = np.zeros(0, dtype=object)
+        self.partidos = np.zeros(0, dtype=np.int64)
+        self.fechas = np.zeros(0, dtype="datetime64[s]")
+        self.valores = np.zeros((0, 0, len(CAMPOS_ESTADISTICA)), dtype=np.int64)
+        self.jugo = np.zeros((0, 0), dtype=bool)
+        self.n_jugadores = 0
+        self.n_partidos = 0
+        self._fila = {}
+        self._columna = {}
+
+    def _asegurar_capacidad(self, n_jugadores: int, n_partidos: int):
+        filas, columnas = self.jugo.shape
+        if n_jugadores <= filas and n_partidos <= columnas:
+            return
+        filas = max(filas, 1)
+        while filas < n_jugadores:
+            filas *= 2
+        columnas = max(columnas, 1)
+        while columnas < n_partidos:
+            columnas *= 2
+        valores = np.zeros((filas, columnas, len(CAMPOS_ESTADISTICA)), dtype=np.int64)
+        jugo = np.zeros((filas, columnas), dtype=bool)
+        valores[:self.n_jugadores, :self.n_partidos] = self.valores[:self.n_jugadores, :self.n_partidos]
+        jugo[:self.n_jugadores, :self.n_partidos] = self.jugo[:self.n_jugadores, :self.n_partidos]
+        self.valores, self.jugo = valores, jugo
+        self.jugadores = np.resize(self.jugadores, filas)
+        self.posiciones = np.resize(self.posiciones, filas)
+        self.partidos = np.resize(self.partidos, columnas)
+        self.fechas = np.resize(self.fechas, columnas)
+
+    def _aplicar(self, filas: list, partidos_recargados=()):
+        """
+        Incorpora filas (jugador_id, partido_id, fecha, posicion, *métricas). Las columnas de
+        partidos_recargados se ponen a cero antes, porque sus filas llegan completas.
+        """
+        nuevos_jugadores = {fila[0]: fila[3] for fila in filas if fila[0] not in self._fila}
+        nuevos_partidos = {fila[1]: fila[2] for fila in filas if fila[1] not in self._columna}
+        self._asegurar_capacidad(self.n_jugadores + len(nuevos_jugadores), self.n_partidos + len(nuevos_partidos))
+        for jugador_id, posicion in nuevos_jugadores.items():
+            self._fila[jugador_id] = self.n_jugadores
+            self.jugadores[self.n_jugadores] = jugador_id
+            self.posiciones[self.n_jugadores] = posicion
+            self.n_jugadores += 1
+        for partido_id, fecha in nuevos_partidos.items():
+            self._columna[partido_id] = self.n_partidos
+            self.partidos[self.n_partidos] = partido_id
+            self.fechas[self.n_partidos] = np.datetime64(fecha, "s")
+            self.n_partidos += 1
+
+        columnas = [self._columna[partido_id] for partido_id in partidos_recargados if partido_id in self._columna]
+        if columnas:
+            self.valores[:, columnas] = 0
+            self.jugo[:, columnas] = False
+        if not filas:
+            return
+        indices_j = np.fromiter((self._fila[fila[0]] for fila in filas), dtype=np.int64, count=len(filas))
+        indices_p = np.fromiter((self._columna[fila[1]] for fila in filas), dtype=np.int64, count=len(filas))
+        metricas = np.array([[valor or 0 for valor in fila[4:]] for fila in filas], dtype=np.int64)
+        np.add.at(self.valores, (indices_j, indices_p), metricas)
+        self.jugo[indices_j, indices_p] = True
+        for fila in filas:
+            self.fechas[self._columna[fila[1]]] = np.datetime64(fila[2], "s")
+            self.posiciones[self._fila[fila[0]]] = fila[3]
+
+    def cargar(self, session: Session):
+        inicio = datetime.now(timezone.utc)
+        filas = session.execute(_consulta_estadisticas()).all()
+        ejecutar_bloqueante(self._cargar_filas, filas, inicio)
+
+    def _cargar_filas(self, filas: list, inicio: datetime):
+        with self._lock:
+            self._reiniciar()
+            self._aplicar(filas)
+            self.cargada = True
+            self.ultimo_refresco = inicio
+
+    def refrescar(self, session: Session):
+        """
+        Carga la matriz la primera vez; después recarga solo los partidos y jugadores que cambiaron. Un
+        jugador eliminado no cambia la versión de sus partidos: su fila se vacía aquí.
+        """
+        if not self.cargada:
+            self.cargar(session)
+            return
+        inicio = datetime.now(timezone.utc)
+        desde = self.ultimo_refresco - MARGEN_REFRESCO
+        cambiados = (
+            select(VersionEntidad.entidad_id)
+            .where(VersionEntidad.tipo == "partido", VersionEntidad.actualizado >= desde)
+        )
+        filas = session.execute(_consulta_estadisticas().where(Estadistica.partido_id.in_(cambiados))).all()
+        partidos = session.execute(cambiados).scalars().all()
+        posiciones = session.execute(
+            select(VersionEntidad.entidad_id, Jugador.posicion)
+            .outerjoin(Jugador, Jugador.id == VersionEntidad.entidad_id)
+            .where(VersionEntidad.tipo == "jugador", VersionEntidad.actualizado >= desde)
+        ).all()
+        ejecutar_bloqueante(self._refrescar_filas, filas, partidos, posiciones, inicio)
+
+    def _refrescar_filas(self, filas: list, partidos: list, posiciones: list, inicio: datetime):
+        """
+        posiciones trae (jugador_id, posicion) de los jugadores que cambiaron; posicion es None si el
+        jugador ya no existe.
+        """
+        with self._lock:
+            self._aplicar(filas, partidos)
+            for jugador_id, posicion in posiciones:
+                fila = self._fila.get(jugador_id)
+                if fila is None:
+                    continue
+                if posicion is None:
+                    self.valores[fila] = 0
+                    self.jugo[fila] = False
+                else:
+                    self.posiciones[fila] = posicion
+            self.ultimo_refresco = inicio
+
+    def _vista(self):
+        n_j, n_p = self.n_jugadores, self.n_partidos
+        return (self.jugadores[:n_j].copy(), self.posiciones[:n_j].copy(), self.partidos[:n_p].copy(),
+                self.fechas[:n_p].copy(), self.valores[:n_j, :n_p].copy(), self.jugo[:n_j, :n_p].copy())
+
+    def por_jugador(self, metrica: str, modo: str = "total", ventana: int = None):
+        """
+        Devuelve (jugadores, posiciones, valor, partidos) por jugador. Con ventana, el valor se calcula
+        sobre los últimos `ventana` partidos jugados por cada uno.
+        """
+        m = _indice_metrica(metrica)
+        if modo not in MODOS:
+            raise ValueError(f"Modo desconocido: {modo}. Opciones: {', '.join(MODOS)}")
+        with self._lock:
+            jugadores, posiciones, _, fechas, valores, jugo = self._vista()
+        valores = valores[:, :, m]
+        if ventana is not None:
+            if ventana < 1:
+                raise ValueError("La ventana debe ser mayor que cero")
+            orden = np.argsort(fechas, kind="stable")
+            valores, jugo = valores[:, orden], jugo[:, orden]
+            restantes = np.cumsum(jugo[:, ::-1], axis=1)[:, ::-1]
+            jugo = jugo & (restantes <= ventana)
+        partidos = jugo.sum(axis=1)
+        total = np.where(jugo, valores, 0).sum(axis=1).astype(np.float64)
+        if modo == "promedio":
+            total = np.divide(total, partidos, out=np.zeros_like(total), where=partidos > 0)
+        return jugadores, posiciones, total, partidos
+
+    def lideres(self, metrica: str, k: int = 10, modo: str = "total", ventana: int = None,
+                posicion: str = None) -> list[dict]:
+        jugadores, posiciones, valor, partidos = self.por_jugador(metrica, modo, ventana)
+        candidatos = partidos > 0
+        if posicion:
+            candidatos &= posiciones == posicion
+        indices = np.flatnonzero(candidatos)
+        k = min(max(k, 0), len(indices))
+        if k == 0:
+            return []
+        if k < len(indices):
+            indices = indices[np.argpartition(-valor[indices], k - 1)[:k]]
+        indices = indices[np.lexsort((jugadores[indices], -valor[indices]))]
+        return [{"jugador_id": int(jugadores[i]), "posicion": posiciones[i], metrica: float(valor[i]),
+                 "partidos": int(partidos[i])} for i in indices]
+
+    def percentiles_por_posicion(self, metrica: str, modo: str = "total", percentiles=PERCENTILES) -> dict:
+        jugadores, posiciones, valor, partidos = self.por_jugador(metrica, modo)
+        activos = partidos > 0
+        resultado = {}
+        for posicion in sorted({p for p in posiciones[activos] if p is not None}):
+            valores = valor[activos & (posiciones == posicion)]
+            resultado[posicion] = {
+                "jugadores": int(len(valores)),
+                **{f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(valores, percentiles))},
+            }
+        return resultado
+
+    def forma(self, jugador_id: int, metrica: str, ventana: int = 5) -> list[dict] | None:
+        """
+        Serie cronológica del jugador con la media móvil de los últimos `ventana` partidos jugados
+        (media acumulada mientras aún no hay `ventana` partidos). None si el jugador no tiene estadísticas.
+        """
+        m = _indice_metrica(metrica)
+        if ventana < 1:
+            raise ValueError("La ventana debe ser mayor que cero")
+        with self._lock:
+            fila = self._fila.get(jugador_id)
+            if fila is None:
+                return None
+            n_p = self.n_partidos
+            jugados = np.flatnonzero(self.jugo[fila, :n_p])
+            if not len(jugados):
+                return None
+            partidos = self.partidos[jugados].copy()
+            fechas = self.fechas[jugados].copy()
+            valores = self.valores[fila, jugados, m].astype(np.float64)
+        orden = np.argsort(fechas, kind="stable")
+        partidos, fechas, valores = partidos[orden], fechas[orden], valores[orden]
+        acumulado = np.concatenate(([0.0], np.cumsum(valores)))
+        posiciones = np.arange(1, len(valores) + 1)
+        inicio = np.maximum(posiciones - ventana, 0)
+        media = (acumulado[posiciones] - acumulado[inicio]) / (posiciones - inicio)
+        return [{"partido_id": int(p), "fecha": str(f.astype("datetime64[D]")), metrica: int(v),
+                 "media_movil": round(float(mm), 3)} for p, f, v, mm in zip(partidos, fechas, valores, media)]
+
+
+matriz_estadisticas = MatrizEstadisticas()
+
+
+def obtener_lideres(session: Session, metrica: str, k: int = 10, modo: str = "total", ventana: int = None,
+                    posicion: str = None) -> list[dict]:
+    matriz_estadisticas.refrescar(session)
+    return ejecutar_bloqueante(matriz_estadisticas.lideres, metrica, k, modo, ventana, posicion)
+
+
+def obtener_percentiles_por_posicion(session: Session, metrica: str, modo: str = "total") -> dict:
+    matriz_estadisticas.refrescar(session)
+    return ejecutar_bloqueante(matriz_estadisticas.percentiles_por_posicion, metrica, modo)
+
+
+def obtener_forma_jugador(session: Session, jugador_id: int, metrica: str, ventana: int = 5) -> list[dict] | None:
+    matriz_estadisticas.refrescar(session)
+    return ejecutar_bloqueante(matriz_estadisticas.forma, jugador_id, metrica, ventana)
@@ -0,0 +1,985 @@
+"""
+Punto de entrada ASGI asíncrono con las mismas rutas y contratos JSON que src/app/app.py.
+
+Las rutas usan las funciones de src/relaciones/relaciones_async.py sobre un engine asíncrono con su
+propio pool, así un solo worker atiende muchas peticiones concurrentes mientras espera a la base de
+datos. La paginación, los GET condicionales y las repeticiones por Idempotency-Key vienen de
+src/peticiones/peticiones.py, compartido con la aplicación Flask, que sigue disponible sin cambios. La E/S
+local (caché y cola en SQLite) y los cálculos con NumPy se ejecutan en hilos aparte.
+
+Uso:
+    python -m src.migrar
+    hypercorn "src.app_async:crear_app()" --bind 0.0.0.0:8000
+    uvicorn src.app_async:crear_app --factory --port 8000
+"""
+import asyncio
+import logging
+import time
+import uuid
+from functools import wraps
+from quart import Blueprint, Quart, current_app, jsonify, request, make_response, g
+from werkzeug.exceptions import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.relaciones_async import (
+    crear_equipo,
+    obtener_equipo_por_id,
+    crear_jugador,
+    obtener_jugador_por_id,
+    actualizar_jugador,
+    eliminar_jugador,
+    crear_partido,
+    obtener_partido_por_id,
+    obtener_partidos,
+    registrar_resultado_partido,
+    crear_estadistica,
+    crear_estadisticas_bulk,
+    registrar_eventos_partido,
+    obtener_estadisticas_en_vivo,
+    finalizar_partido,
+    crear_estado_jugador,
+    obtener_convocatoria,
+    actualizar_convocatoria,
+    obtener_jugadores_de_equipo,
+    obtener_partidos_de_equipo,
+    obtener_estadisticas_de_partido,
+    obtener_estado_jugadores_de_partido,
+    obtener_resumen_jugador,
+    obtener_resumen_equipo,
+    obtener_clasificacion,
+    crear_calendario,
+    obtener_version,
+    obtener_lideres,
+    obtener_percentiles_por_posicion,
+    obtener_forma_jugador,
+    buscar_respuesta,
+    guardar_respuesta,
+    pagina_con_pendientes,
+    iterar_con_pendientes,
+    exportar,
+    iterar_en_sesion,
+)
+from src.negocio import obtener_estadisticas_pendientes, obtener_estados_pendientes
+from src.calendario import DIAS_ENTRE_JORNADAS, DESCANSO_MINIMO_DIAS, HORARIOS
+from src.cache import cache_entidades
+from src.difusion import difusor
+from src.escritura_diferida import escritura_diferida
+from src.exportacion import TIPOS_MIME
+from src.idempotencia import huella_peticion
+from src.peticiones import (
+    parametros_paginacion,
+    parametro_entero,
+    ultimo_evento_id,
+    quiere_streaming,
+    pagina_con_cursor,
+    cabeceras_paginacion,
+    validadores,
+    no_modificado,
+    anadir_validadores,
+    clave_idempotencia,
+    respuesta_repetida,
+    debe_guardarse,
+)
+from src.serializacion import (
+    EQUIPO,
+    JUGADOR,
+    JUGADOR_DE_EQUIPO,
+    PARTIDO,
+    PARTIDO_CON_RESULTADO,
+    ESTADISTICA,
+    ESTADISTICA_DE_PARTIDO,
+    ESTADO_JUGADOR,
+    ESTADO_DE_PARTIDO,
+    convocatoria,
+    ProveedorJSON,
+    stream_array,
+)
+from src.database import crear_engine_async, estado_pool, Estadistica, EstadoJugador
+from src.registro import configurar_logging, iniciar_contexto, medir_tiempo_db, medidas_db
+from src.metricas import metricas, server_timing, SERVER_TIMING, TIPO_CONTENIDO
+from src.depuracion import depuracion_sql, presupuesto_sql
+
+SessionAsync = async_sessionmaker(autoflush=False, expire_on_commit=False)
+logger = logging.getLogger("superliga.http")
+_engine_async = None
+
+api = Blueprint("api", __name__)
+
+def obtener_engine_async():
+    """
+    Engine asíncrono de la aplicación, creado e instrumentado con la primera sesión.
+    """
+    global _engine_async
+    if _engine_async is None:
+        motor = crear_engine_async()
+        medir_tiempo_db(motor.sync_engine)
+        depuracion_sql.instrumentar(motor.sync_engine)
+        _engine_async = motor
+    return _engine_async
+
+
+def conectar_db():
+    return SessionAsync(bind=obtener_engine_async())
+
+
+async def cerrar_db(session):
+    if session:
+        await session.close()
+
+
+async def iniciar_peticion():
+    g.inicio = time.perf_counter()
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.ruta = request.url_rule.rule if request.url_rule else None
+    iniciar_contexto(g.request_id, g.ruta or request.path)
+    depuracion_sql.iniciar_peticion()
+
+
+async def registrar_peticion(respuesta):
+    """
+    Registra la petición en el log y en las métricas y, en modo de depuración, comprueba las sentencias
+    repetidas y el presupuesto de la ruta. Las consultas de una respuesta en streaming se ejecutan
+    después y no se cuentan.
+    """
+    duracion = time.perf_counter() - g.inicio
+    tiempo_sql, sentencias, espera_pool = medidas_db()
+    vista = current_app.view_functions.get(request.endpoint)
+    depuracion_sql.terminar_peticion(f"{request.method} {g.ruta or request.path}",
+                                     getattr(vista, "presupuesto_sql", None))
+    metricas.registrar(request.method, g.ruta, respuesta.status_code, duracion, tiempo_sql, sentencias, espera_pool)
+    respuesta.headers["X-Request-ID"] = g.request_id
+    if SERVER_TIMING:
+        respuesta.headers["Server-Timing"] = server_timing(duracion, tiempo_sql, sentencias, espera_pool)
+    logger.info("petición", extra={
+        "metodo": request.method,
+        "status": respuesta.status_code,
+        "duracion_ms": round(duracion * 1000, 2),
+        "db_ms": round(tiempo_sql * 1000, 2),
+        "sentencias": sentencias,
+    })
+    return respuesta
+
+
+async def iniciar_escritura_diferida():
+    escritura_diferida.iniciar()
+
+
+async def cerrar_engine():
+    difusor.detener()
+    await asyncio.to_thread(escritura_diferida.detener)
+    if _engine_async is not None:
+        await _engine_async.dispose()
+
+
+def respuesta_paginada(elementos, siguiente):
+    respuesta = jsonify(elementos)
+    respuesta.headers.update(cabeceras_paginacion(request.base_url, elementos, siguiente))
+    return respuesta, 200
+
+
+async def filas_pendientes(obtener, partido_id: int) -> list:
+    """
+    Filas del partido que siguen en la cola de escritura diferida, leídas en un hilo aparte.
+    """
+    if not escritura_diferida.activa:
+        return []
+    return await asyncio.to_thread(obtener, partido_id)
+
+
+async def respuesta_en_streaming(session, filas, proyeccion):
+    """
+    Devuelve la colección completa como un array JSON escrito fila a fila. filas es el listado sin
+    ejecutar (iterar=True), ya validado; se recorre por lotes dentro del generador, que cierra la sesión
+    al terminar. No aplica limit; after sí se respeta.
+    """
+    async def generar():
+        try:
+            async for bloque in iterar_en_sesion(session, stream_array(filas, proyeccion)):
+                yield bloque
+        finally:
+            await cerrar_db(session)
+    respuesta = await make_response(generar(), 200, {"Content-Type": "application/json"})
+    respuesta.timeout = None
+    return respuesta
+
+
+def condicional(tipo, parametro=None):
+    """
+    Versión asíncrona del decorador de src/app/app.py: ETag y Last-Modified a partir del contador de
+    versión del ámbito, y 304 sin ejecutar la vista cuando el cliente ya tiene la versión actual.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        async def envoltura(**kwargs):
+            entidad_id = kwargs[parametro] if parametro else 0
+            session = conectar_db()
+            try:
+                version, actualizado = await obtener_version(session, tipo, entidad_id)
+            finally:
+                await cerrar_db(session)
+            pendiente = 0
+            if escritura_diferida.activa:
+                pendiente = await asyncio.to_thread(escritura_diferida.marca, tipo, entidad_id)
+            etag, actualizado = validadores(tipo, entidad_id, version, actualizado, pendiente)
+            if no_modificado(request, etag, actualizado, pendiente):
+                respuesta = await make_response("", 304)
+            else:
+                respuesta = await make_response(await vista(**kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+            anadir_validadores(respuesta, etag, actualizado)
+            return respuesta
+        return envoltura
+    return decorador
+
+
+def idempotente(vista):
+    """
+    Versión asíncrona del decorador de src/app/app.py: guarda la primera respuesta por Idempotency-Key
+    y la repite en los reintentos; reutilizar la clave con otra petición es un 422.
+    """
+    @wraps(vista)
+    async def envoltura(**kwargs):
+        try:
+            clave = clave_idempotencia(request)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if clave is None:
+            return await vista(**kwargs)
+        huella = huella_peticion(request.method, request.path, await request.get_data())
+        session = conectar_db()
+        try:
+            guardada = await buscar_respuesta(session, clave)
+            if guardada is not None:
+                cuerpo, estado, cabeceras = respuesta_repetida(guardada, huella)
+                return await make_response(cuerpo, estado, {"Content-Type": "application/json", **cabeceras})
+            respuesta = await make_response(await vista(**kwargs))
+            if debe_guardarse(respuesta.status_code):
+                await guardar_respuesta(session, clave, huella, respuesta.status_code,
+                                        await respuesta.get_data(as_text=True))
+            return respuesta
+        finally:
+            await cerrar_db(session)
+    return envoltura
+
+
+async def handle_error(error):
+    if isinstance(error, HTTPException):
+        return error
+    return jsonify({"error": str(error)}), 500
+
+
+@api.route("/equipos", methods=["POST"])
+async def crear_equipo_route():
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        nombre = data.get("nombre")
+        ciudad = data.get("ciudad")
+        entrenador = data.get("entrenador")
+        if not nombre or not ciudad or not entrenador:
+            return jsonify({"error": "Nombre, ciudad y entrenador son requeridos"}), 400
+        equipo = await crear_equipo(session, nombre=nombre, ciudad=ciudad, entrenador=entrenador)
+        return jsonify(EQUIPO(equipo)), 201
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/equipos/<int:equipo_id>", methods=["GET"])
+@condicional("equipo", "equipo_id")
+async def obtener_equipo_route(equipo_id):
+    session = conectar_db()
+    try:
+        equipo = await obtener_equipo_por_id(session, equipo_id)
+        if not equipo:
+            return jsonify({"error": "Equipo no encontrado"}), 404
+        return jsonify(EQUIPO(equipo)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/jugadores", methods=["POST"])
+async def crear_jugador_route():
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        nombre = data.get("nombre")
+        apellido = data.get("apellido")
+        posicion = data.get("posicion")
+        numero = data.get("numero")
+        equipo_id = data.get("equipo_id")
+        if not nombre or not apellido or not posicion or not numero or not equipo_id:
+            return jsonify({"error": "Nombre, apellido, posicion, numero y equipo_id son requeridos"}), 400
+        jugador = await crear_jugador(session, nombre=nombre, apellido=apellido, posicion=posicion, numero=numero,
+                                     equipo_id=equipo_id)
+        if not jugador:
+            return jsonify({"error": "No se pudo crear el jugador"}), 400
+        return jsonify(JUGADOR(jugador)), 201
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/jugadores/<int:jugador_id>", methods=["GET"])
+@condicional("jugador", "jugador_id")
+async def obtener_jugador_route(jugador_id):
+    session = conectar_db()
+    try:
+        jugador = await obtener_jugador_por_id(session, jugador_id)
+        if not jugador:
+            return jsonify({"error": "Jugador no encontrado"}), 404
+        return jsonify(JUGADOR(jugador)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/jugadores/<int:jugador_id>", methods=["PUT"])
+async def actualizar_jugador_route(jugador_id):
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        nombre = data.get("nombre")
+        apellido = data.get("apellido")
+        posicion = data.get("posicion")
+        numero = data.get("numero")
+        equipo_id = data.get("equipo_id")
+
+        jugador = await actualizar_jugador(session, jugador_id, nombre, apellido, posicion, numero, equipo_id)
+        if not jugador:
+            return jsonify({"error": "No se pudo actualizar el jugador"}), 400
+        return jsonify(JUGADOR(jugador)), 200
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/jugadores/<int:jugador_id>", methods=["DELETE"])
+async def eliminar_jugador_route(jugador_id):
+    session = conectar_db()
+    try:
+        eliminado = await eliminar_jugador(session, jugador_id)
+        if not eliminado:
+            return jsonify({"error": "No se pudo eliminar el jugador"}), 400
+        return jsonify({"mensaje": "Jugador eliminado correctamente"}), 200
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos", methods=["POST"])
+async def crear_partido_route():
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        fecha = data.get("fecha")
+        hora = data.get("hora")
+        equipo_local_id = data.get("equipo_local_id")
+        equipo_visitante_id = data.get("equipo_visitante_id")
+        if not fecha or not hora or not equipo_local_id or not equipo_visitante_id:
+            return jsonify({"error": "Fecha, hora, equipo_local_id y equipo_visitante_id son requeridos"}), 400
+        partido = await crear_partido(session, fecha=fecha, hora=hora, equipo_local_id=equipo_local_id,
+                                     equipo_visitante_id=equipo_visitante_id)
+        if not partido:
+            return jsonify({"error": "No se pudo crear el partido"}), 400
+        return jsonify(PARTIDO(partido)), 201
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/temporadas/<int:temporada>/calendario", methods=["POST"])
+@presupuesto_sql(4)
+async def crear_calendario_route(temporada):
+    """
+    Genera el calendario round-robin de la temporada y crea todos sus partidos en una transacción.
+    """
+    session = conectar_db()
+    try:
+        data = (await request.get_json(silent=True)) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "El cuerpo debe ser un objeto JSON"}), 400
+        resultado = await crear_calendario(
+            session, temporada, equipos=data.get("equipos"),
+            inicio=data.get("inicio"),
+            horarios=data.get("horarios") or list(HORARIOS),
+            sedes=data.get("sedes"),
+            dias_entre_jornadas=data.get("dias_entre_jornadas", DIAS_ENTRE_JORNADAS),
+            descanso_minimo_dias=data.get("descanso_minimo_dias", DESCANSO_MINIMO_DIAS),
+            ida_y_vuelta=data.get("ida_y_vuelta", True),
+            fechas_excluidas=data.get("fechas_excluidas") or [],
+        )
+        if resultado is None:
+            return jsonify({"error": f"La temporada {temporada} ya tiene partidos programados"}), 409
+        partidos, errores = resultado
+        if errores:
+            return jsonify({"error": "Calendario no válido", "errores": errores}), 400
+        return jsonify({"temporada": temporada, "total": len(partidos), "partidos": PARTIDO.lista(partidos)}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos", methods=["GET"])
+@presupuesto_sql(1)
+async def obtener_partidos_route():
+    session = conectar_db()
+    try:
+        limit, after = parametros_paginacion(request.args)
+        equipo_id = parametro_entero(request.args, "equipo_id")
+        if quiere_streaming(request.args):
+            partidos = await obtener_partidos(session, desde=request.args.get("desde"),
+                                              hasta=request.args.get("hasta"), equipo_id=equipo_id, after=after,
+                                              iterar=True)
+            return await respuesta_en_streaming(session, partidos, PARTIDO)
+        partidos = await obtener_partidos(session, desde=request.args.get("desde"), hasta=request.args.get("hasta"),
+                                          equipo_id=equipo_id, limit=limit, after=after)
+        partidos, siguiente = pagina_con_cursor(partidos, limit, lambda p: (p.fecha, p.id))
+        return respuesta_paginada(PARTIDO.lista(partidos), siguiente)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos/<int:partido_id>", methods=["GET"])
+@presupuesto_sql(2)
+@condicional("partido", "partido_id")
+async def obtener_partido_route(partido_id):
+    session = conectar_db()
+    try:
+        partido = await obtener_partido_por_id(session, partido_id)
+        if not partido:
+            return jsonify({"error": "Partido no encontrado"}), 404
+        return jsonify(PARTIDO(partido)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos/<int:partido_id>/resultado", methods=["PUT"])
+async def registrar_resultado_partido_route(partido_id):
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        sets_local = data.get("sets_local")
+        sets_visitante = data.get("sets_visitante")
+        if not isinstance(sets_local, int) or not isinstance(sets_visitante, int):
+            return jsonify({"error": "sets_local y sets_visitante son requeridos"}), 400
+        partido = await registrar_resultado_partido(session, partido_id, sets_local, sets_visitante)
+        if not partido:
+            return jsonify({"error": "No se pudo registrar el resultado"}), 400
+        return jsonify(PARTIDO_CON_RESULTADO(partido)), 200
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/estadisticas", methods=["POST"])
+@idempotente
+async def crear_estadistica_route():
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        jugador_id = data.get("jugador_id")
+        partido_id = data.get("partido_id")
+        puntos = data.get("puntos", 0)
+        bloqueos = data.get("bloqueos", 0)
+        saques = data.get("saques", 0)
+        recepciones = data.get("recepciones", 0)
+        if not jugador_id or not partido_id:
+            return jsonify({"error": "jugador_id y partido_id son requeridos"}), 400
+        estadistica = await crear_estadistica(session, jugador_id=jugador_id, partido_id=partido_id, puntos=puntos,
+                                               bloqueos=bloqueos, saques=saques, recepciones=recepciones)
+        if not estadistica:
+            return jsonify({"error": "No se pudo crear la estadística"}), 400
+        return jsonify(ESTADISTICA(estadistica)), 201 if estadistica.id else 202
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos/<int:partido_id>/estadisticas/bulk", methods=["POST"])
+@presupuesto_sql(11)
+@idempotente
+async def crear_estadisticas_bulk_route(partido_id):
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        lineas = data.get("estadisticas") if isinstance(data, dict) else data
+        if not isinstance(lineas, list) or not lineas:
+            return jsonify({"error": "Se requiere una lista de estadísticas"}), 400
+        resultado = await crear_estadisticas_bulk(session, partido_id, lineas)
+        if resultado is None:
+            return jsonify({"error": "Partido no encontrado"}), 404
+        creadas, errores = resultado
+        if not creadas:
+            return jsonify({"creadas": 0, "errores": errores}), 400
+        return jsonify({"creadas": creadas, "errores": errores}), 201
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos/<int:partido_id>/eventos", methods=["POST"])
+async def registrar_eventos_partido_route(partido_id):
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        eventos = data.get("eventos") if isinstance(data, dict) else data
+        if not isinstance(eventos, list) or not eventos:
+            return jsonify({"error": "Se requiere una lista de eventos"}), 400
+        resultado = await registrar_eventos_partido(session, partido_id, eventos)
+        if resultado is None:
+            return jsonify({"error": "Partido no encontrado"}), 404
+        creados, errores = resultado
+        if not creados:
+            return jsonify({"creados": 0, "errores": errores}), 400
+        return jsonify({"creados": creados, "errores": errores}), 201
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos/<int:partido_id>/finalizar", methods=["POST"])
+async def finalizar_partido_route(partido_id):
+    session = conectar_db()
+    try:
+        jugadores = await finalizar_partido(session, partido_id)
+        if jugadores is None:
+            return jsonify({"error": "Partido no encontrado"}), 404
+        if not jugadores:
+            return jsonify({"error": "El partido no tiene eventos"}), 400
+        return jsonify({"partido_id": partido_id, "jugadores": jugadores}), 200
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos/<int:partido_id>/convocatoria", methods=["GET"])
+@presupuesto_sql(1)
+async def obtener_convocatoria_route(partido_id):
+    session = conectar_db()
+    try:
+        filas = await obtener_convocatoria(session, partido_id)
+        if filas is None:
+            return jsonify({"error": "Partido no encontrado"}), 404
+        pendientes = await filas_pendientes(obtener_estados_pendientes, partido_id)
+        return jsonify(convocatoria(partido_id, filas, pendientes)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos/<int:partido_id>/convocatoria", methods=["PUT"])
+@presupuesto_sql(4)
+async def actualizar_convocatoria_route(partido_id):
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        lineas = data.get("jugadores") if isinstance(data, dict) else data
+        if not isinstance(lineas, list) or not lineas:
+            return jsonify({"error": "Se requiere una lista de jugadores"}), 400
+        resultado = await actualizar_convocatoria(session, partido_id, lineas)
+        if resultado is None:
+            return jsonify({"error": "Partido no encontrado"}), 404
+        actualizados, errores = resultado
+        if not actualizados:
+            return jsonify({"actualizados": 0, "errores": errores}), 400
+        return jsonify({"actualizados": actualizados, "errores": errores}), 200
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/estado_jugadores", methods=["POST"])
+@idempotente
+async def crear_estado_jugador_route():
+    session = conectar_db()
+    try:
+        data = await request.get_json()
+        jugador_id = data.get("jugador_id")
+        partido_id = data.get("partido_id")
+        disponible = data.get("disponible")
+        lesion_tipo = data.get("lesion_tipo")
+        if not jugador_id or not partido_id or disponible is None:
+            return jsonify({"error": "jugador_id, partido_id y disponible son requeridos"}), 400
+        estado_jugador = await crear_estado_jugador(session, jugador_id=jugador_id, partido_id=partido_id,
+                                                     disponible=disponible, lesion_tipo=lesion_tipo)
+        if not estado_jugador:
+            return jsonify({"error": "No se pudo crear el estado del jugador"}), 400
+        return jsonify(ESTADO_JUGADOR(estado_jugador)), 201 if estado_jugador.id else 202
+    except Exception as e:
+        await session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/equipos/<int:equipo_id>/jugadores", methods=["GET"])
+@presupuesto_sql(2)
+@condicional("equipo", "equipo_id")
+async def obtener_jugadores_de_equipo_route(equipo_id):
+    session = conectar_db()
+    try:
+        limit, after = parametros_paginacion(request.args)
+        if quiere_streaming(request.args):
+            jugadores = await obtener_jugadores_de_equipo(session, equipo_id, after=after, iterar=True)
+            return await respuesta_en_streaming(session, jugadores, JUGADOR_DE_EQUIPO)
+        jugadores = await obtener_jugadores_de_equipo(session, equipo_id, limit=limit, after=after)
+        if not jugadores:
+            return jsonify({"error": "No se pudieron obtener los jugadores"}), 400
+        jugadores, siguiente = pagina_con_cursor(jugadores, limit, lambda j: (j.id,))
+        return respuesta_paginada(JUGADOR_DE_EQUIPO.lista(jugadores), siguiente)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/equipos/<int:equipo_id>/partidos", methods=["GET"])
+@presupuesto_sql(2)
+@condicional("equipo", "equipo_id")
+async def obtener_partidos_de_equipo_route(equipo_id):
+    session = conectar_db()
+    try:
+        limit, after = parametros_paginacion(request.args)
+        if quiere_streaming(request.args):
+            partidos = await obtener_partidos_de_equipo(session, equipo_id, after=after, iterar=True)
+            return await respuesta_en_streaming(session, partidos, PARTIDO)
+        partidos = await obtener_partidos_de_equipo(session, equipo_id, limit=limit, after=after)
+        if not partidos:
+            return jsonify({"error": "No se pudieron obtener los partidos"}), 400
+        partidos, siguiente = pagina_con_cursor(partidos, limit, lambda p: (p.fecha, p.id))
+        return respuesta_paginada(PARTIDO.lista(partidos), siguiente)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos/<int:partido_id>/stream", methods=["GET"])
+async def stream_partido_route(partido_id):
+    """
+    Server-Sent Events con el marcador en directo del partido. Todos los clientes comparten un único
+    productor por partido; se admite Last-Event-ID para reanudar.
+    """
+    session = conectar_db()
+    try:
+        ultimo_id = ultimo_evento_id(request)
+        if not await obtener_partido_por_id(session, partido_id):
+            return jsonify({"error": "Partido no encontrado"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+    suscripcion = difusor.suscribir(partido_id, ultimo_id, asincrona=True)
+
+    async def generar():
+        try:
+            async for mensaje in suscripcion.mensajes():
+                yield mensaje
+        finally:
+            difusor.desuscribir(partido_id, suscripcion)
+
+    respuesta = await make_response(generar(), 200, {"Content-Type": "text/event-stream",
+                                                      "Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    respuesta.timeout = None
+    return respuesta
+
+
+@api.route("/partidos/<int:partido_id>/estadisticas", methods=["GET"])
+@presupuesto_sql(3)
+@condicional("partido", "partido_id")
+async def obtener_estadisticas_de_partido_route(partido_id):
+    session = conectar_db()
+    try:
+        en_vivo = await obtener_estadisticas_en_vivo(session, partido_id)
+        if en_vivo is not None:
+            respuesta = jsonify(en_vivo)
+            respuesta.headers["X-En-Vivo"] = "1"
+            return respuesta, 200
+        limit, after = parametros_paginacion(request.args)
+        pendientes = await filas_pendientes(obtener_estadisticas_pendientes, partido_id)
+        if quiere_streaming(request.args):
+            estadisticas = await obtener_estadisticas_de_partido(session, partido_id, after=after, iterar=True)
+            estadisticas = await iterar_con_pendientes(session, Estadistica, partido_id, estadisticas, pendientes,
+                                                       after)
+            return await respuesta_en_streaming(session, estadisticas, ESTADISTICA_DE_PARTIDO)
+        estadisticas = await obtener_estadisticas_de_partido(session, partido_id, limit=limit, after=after)
+        estadisticas, siguiente = pagina_con_cursor(estadisticas, limit, lambda e: (e.id,))
+        estadisticas = await pagina_con_pendientes(session, Estadistica, partido_id, estadisticas, pendientes, after,
+                                                   not siguiente)
+        if not estadisticas:
+            return jsonify({"error": "No se pudieron obtener las estadísticas"}), 400
+        return respuesta_paginada(ESTADISTICA_DE_PARTIDO.lista(estadisticas), siguiente)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/partidos/<int:partido_id>/estado_jugadores", methods=["GET"])
+@presupuesto_sql(2)
+@condicional("partido", "partido_id")
+async def obtener_estado_jugadores_de_partido_route(partido_id):
+    session = conectar_db()
+    try:
+        limit, after = parametros_paginacion(request.args)
+        pendientes = await filas_pendientes(obtener_estados_pendientes, partido_id)
+        if quiere_streaming(request.args):
+            estados_jugadores = await obtener_estado_jugadores_de_partido(session, partido_id, after=after,
+                                                                          iterar=True)
+            estados_jugadores = await iterar_con_pendientes(session, EstadoJugador, partido_id, estados_jugadores,
+                                                            pendientes, after)
+            return await respuesta_en_streaming(session, estados_jugadores, ESTADO_DE_PARTIDO)
+        estados_jugadores = await obtener_estado_jugadores_de_partido(session, partido_id, limit=limit, after=after)
+        estados_jugadores, siguiente = pagina_con_cursor(estados_jugadores, limit, lambda ej: (ej.id,))
+        estados_jugadores = await pagina_con_pendientes(session, EstadoJugador, partido_id, estados_jugadores,
+                                                        pendientes, after, not siguiente)
+        if not estados_jugadores:
+            return jsonify({"error": "No se pudo obtener el estado de los jugadores"}), 400
+        return respuesta_paginada(ESTADO_DE_PARTIDO.lista(estados_jugadores), siguiente)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/jugadores/<int:jugador_id>/resumen", methods=["GET"])
+@presupuesto_sql(3)
+@condicional("jugador", "jugador_id")
+async def obtener_resumen_jugador_route(jugador_id):
+    session = conectar_db()
+    try:
+        resumen = await obtener_resumen_jugador(session, jugador_id, desde=request.args.get("desde"),
+                                                hasta=request.args.get("hasta"))
+        if resumen is None:
+            return jsonify({"error": "Jugador no encontrado"}), 404
+        return jsonify({"jugador_id": jugador_id, **resumen}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/equipos/<int:equipo_id>/resumen", methods=["GET"])
+@presupuesto_sql(3)
+@condicional("equipo", "equipo_id")
+async def obtener_resumen_equipo_route(equipo_id):
+    session = conectar_db()
+    try:
+        resumen = await obtener_resumen_equipo(session, equipo_id, desde=request.args.get("desde"),
+                                               hasta=request.args.get("hasta"))
+        if resumen is None:
+            return jsonify({"error": "Equipo no encontrado"}), 404
+        return jsonify({"equipo_id": equipo_id, **resumen}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/clasificacion", methods=["GET"])
+@presupuesto_sql(2)
+@condicional("liga")
+async def obtener_clasificacion_route():
+    session = conectar_db()
+    try:
+        clasificacion = await obtener_clasificacion(session)
+        clasificacion_json = [
+            {"posicion": posicion, "equipo_id": c.equipo_id, "equipo": nombre, "partidos_jugados": c.partidos_jugados,
+             "partidos_ganados": c.partidos_ganados, "partidos_perdidos": c.partidos_perdidos,
+             "sets_favor": c.sets_favor, "sets_contra": c.sets_contra, "puntos": c.puntos,
+             "puntos_anotados": c.puntos_anotados} for posicion, (c, nombre) in enumerate(clasificacion, start=1)]
+        return jsonify(clasificacion_json), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/lideres", methods=["GET"])
+@presupuesto_sql(4)
+@condicional("liga")
+async def obtener_lideres_route():
+    session = conectar_db()
+    try:
+        lideres = await obtener_lideres(session, request.args.get("metrica", "puntos"),
+                                        k=parametro_entero(request.args, "k", 10),
+                                        modo=request.args.get("modo", "total"),
+                                        ventana=parametro_entero(request.args, "ventana"),
+                                        posicion=request.args.get("posicion"))
+        return jsonify(lideres), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/lideres/percentiles", methods=["GET"])
+@presupuesto_sql(4)
+@condicional("liga")
+async def obtener_percentiles_route():
+    session = conectar_db()
+    try:
+        percentiles = await obtener_percentiles_por_posicion(session, request.args.get("metrica", "puntos"),
+                                                             modo=request.args.get("modo", "total"))
+        return jsonify(percentiles), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/jugadores/<int:jugador_id>/forma", methods=["GET"])
+@presupuesto_sql(4)
+@condicional("jugador", "jugador_id")
+async def obtener_forma_jugador_route(jugador_id):
+    session = conectar_db()
+    try:
+        forma = await obtener_forma_jugador(session, jugador_id, request.args.get("metrica", "puntos"),
+                                            ventana=parametro_entero(request.args, "ventana", 5))
+        if forma is None:
+            return jsonify({"error": "Jugador sin estadísticas"}), 404
+        return jsonify(forma), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await cerrar_db(session)
+
+
+@api.route("/export/<any(estadisticas, partidos, estado_jugadores):tipo>", methods=["GET"])
+async def exportar_route(tipo):
+    """
+    Exportación completa en NDJSON (por defecto) o CSV con ?formato=csv. Filtros opcionales:
+    temporada (año), desde y hasta. Las filas se leen con un cursor del servidor y se envían por lotes.
+    """
+    formato = request.args.get("formato", "ndjson").lower()
+    session = conectar_db()
+    try:
+        temporada = request.args.get("temporada")
+        if temporada and not temporada.isdigit():
+            raise ValueError(f"Temporada no válida: {temporada}")
+        bloques = await exportar(session, tipo, formato, temporada=int(temporada) if temporada else None,
+                                 desde=request.args.get("desde"), hasta=request.args.get("hasta"))
+    except ValueError as e:
+        await cerrar_db(session)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        await cerrar_db(session)
+        return jsonify({"error": str(e)}), 500
+
+    async def generar():
+        try:
+            async for bloque in iterar_en_sesion(session, bloques):
+                yield bloque
+        finally:
+            await cerrar_db(session)
+
+    extension = "csv" if formato == "csv" else "ndjson"
+    respuesta = await make_response(generar(), 200, {
+        "Content-Type": TIPOS_MIME[formato], "Content-Disposition": f"attachment; filename={tipo}.{extension}"})
+    respuesta.timeout = None
+    return respuesta
+
+
+@api.route("/metrics", methods=["GET"])
+async def metricas_route():
+    return await make_response(metricas.exportar(estado_pool(obtener_engine_async())), 200,
+                               {"Content-Type": TIPO_CONTENIDO})
+
+
+@api.route("/debug/cache", methods=["GET"])
+async def estadisticas_cache_route():
+    return jsonify(await asyncio.to_thread(cache_entidades.estadisticas)), 200
+
+
+@api.route("/debug/pool", methods=["GET"])
+async def estado_pool_route():
+    return jsonify(estado_pool(obtener_engine_async())), 200
+
+
+@api.route("/debug/difusion", methods=["GET"])
+async def estado_difusion_route():
+    return jsonify(difusor.estadisticas()), 200
+
+
+@api.route("/debug/escritura", methods=["GET"])
+async def estado_escritura_diferida_route():
+    return jsonify(await asyncio.to_thread(escritura_diferida.estadisticas)), 200
+
+
+def crear_app() -> Quart:
+    """
+    Crea la aplicación sin tocar la base de datos: el engine asíncrono se crea con la primera sesión y
+    el esquema con `python -m src.migrar`.
+    """
+    configurar_logging()
+    app = Quart(__name__)
+    app.json = ProveedorJSON(app)
+    app.before_request(iniciar_peticion)
+    app.after_request(registrar_peticion)
+    app.before_serving(iniciar_escritura_diferida)
+    app.after_serving(cerrar_engine)
+    app.register_error_handler(Exception, handle_error)
+    app.register_blueprint(api)
+    return app
+
+
+if __name__ == "__main__":
+    crear_app().run(debug=True)
@@ -0,0 +1,209 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from src.database import ejecutar_bloqueante
+
+
+def _a_json(valor: dict) -> str:
+    return json.dumps(valor, default=lambda v: {"__datetime__": v.isoformat()})
+
+
+def _desde_json(texto: str) -> dict:
+    return json.loads(texto, object_hook=lambda d: datetime.fromisoformat(d["__datetime__"])
+                      if "__datetime__" in d else d)
+
+
+class BackendMemoria:
+    """
+    Caché LRU con TTL dentro del proceso.
+    """
+
+    bloqueante = False
+
+    def __init__(self, max_entradas: int = 2048, ttl: float = 300.0):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str):
+        """
+        Devuelve (valor, expulsadas). valor es None si no existe o expiró.
+        """
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None, 0
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None, 1
+            self._datos.move_to_end(clave)
+            return valor, 0
+
+    def guardar(self, clave: str, valor: dict) -> int:
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            expulsadas = 0
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                expulsadas += 1
+            return expulsadas
+
+    def eliminar(self, clave: str):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def tamano(self) -> int:
+        return len(self._datos)
+
+
+class BackendSQLite:
+    """
+    Caché LRU con TTL en un archivo SQLite local, compartida por todos los procesos del mismo servidor.
+    """
+
+    bloqueante = True
+
+    def __init__(self, ruta: str, max_entradas: int = 2048, ttl: float = 300.0):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conexion() as conexion:
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entidad ("
+                "clave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira REAL NOT NULL, acceso REAL NOT NULL)")
+            conexion.execute("CREATE INDEX IF NOT EXISTS ix_cache_entidad_acceso ON cache_entidad (acceso)")
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def obtener(self, clave: str):
+        conexion = self._conexion()
+        fila = conexion.execute("SELECT valor, expira FROM cache_entidad WHERE clave = ?", (clave,)).fetchone()
+        if fila is None:
+            return None, 0
+        ahora = time.time()
+        if fila[1] < ahora:
+            conexion.execute("DELETE FROM cache_entidad WHERE clave = ?", (clave,))
+            return None, 1
+        conexion.execute("UPDATE cache_entidad SET acceso = ? WHERE clave = ?", (ahora, clave))
+        return _desde_json(fila[0]), 0
+
+    def guardar(self, clave: str, valor: dict) -> int:
+        conexion = self._conexion()
+        ahora = time.time()
+        conexion.execute(
+            "INSERT OR REPLACE INTO cache_entidad (clave, valor, expira, acceso) VALUES (?, ?, ?, ?)",
+            (clave, _a_json(valor), ahora + self.ttl, ahora))
+        sobrantes = self.tamano() - self.max_entradas
+        if sobrantes <= 0:
+            return 0
+        conexion.execute(
+            "DELETE FROM cache_entidad WHERE clave IN "
+            "(SELECT clave FROM cache_entidad ORDER BY acceso LIMIT ?)", (sobrantes,))
+        return sobrantes
+
+    def eliminar(self, clave: str):
+        self._conexion().execute("DELETE FROM cache_entidad WHERE clave = ?", (clave,))
+
+    def limpiar(self):
+        self._conexion().execute("DELETE FROM cache_entidad")
+
+    def tamano(self) -> int:
+        return self._conexion().execute("SELECT COUNT(*) FROM cache_entidad").fetchone()[0]
+
+
+class CacheEntidades:
+    """
+    Caché de lectura para filas de equipo, jugador y partido. Guarda diccionarios de columnas,
+    nunca objetos ORM, para que cada sesión reconstruya su propia instancia.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self._lock = threading.Lock()
+
+    @property
+    def activa(self) -> bool:
+        return self.backend is not None
+
+    def _contar(self, aciertos: int = 0, fallos: int = 0, expulsiones: int = 0):
+        with self._lock:
+            self.aciertos += aciertos
+            self.fallos += fallos
+            self.expulsiones += expulsiones
+
+    def _llamar(self, metodo: str, *args):
+        """
+        Llama al backend; si hace E/S (SQLite), fuera del event loop en el modo asíncrono.
+        """
+        funcion = getattr(self.backend, metodo)
+        if self.backend.bloqueante:
+            return ejecutar_bloqueante(funcion, *args)
+        return funcion(*args)
+
+    def obtener(self, tipo: str, entidad_id: int) -> dict | None:
+        if not self.activa:
+            return None
+        valor, expulsadas = self._llamar("obtener", f"{tipo}:{entidad_id}")
+        self._contar(aciertos=1 if valor is not None else 0, fallos=0 if valor is not None else 1,
+                     expulsiones=expulsadas)
+        return valor
+
+    def guardar(self, tipo: str, entidad_id: int, valor: dict):
+        if self.activa:
+            self._contar(expulsiones=self._llamar("guardar", f"{tipo}:{entidad_id}", valor))
+
+    def invalidar(self, tipo: str, entidad_id: int):
+        if self.activa:
+            self._llamar("eliminar", f"{tipo}:{entidad_id}")
+
+    def limpiar(self):
+        if self.activa:
+            self._llamar("limpiar")
+
+    def estadisticas(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__ if self.activa else None,
+            "entradas": self.backend.tamano() if self.activa else 0,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "expulsiones": self.expulsiones,
+        }
+
+
+def crear_cache_desde_entorno() -> CacheEntidades:
+    """
+    SUPERLIGA_CACHE elige el backend: "memoria" (por defecto), "sqlite" o "desactivada".
+    """
+    tipo = os.environ.get("SUPERLIGA_CACHE", "memoria").lower()
+    max_entradas = int(os.environ.get("SUPERLIGA_CACHE_MAX_ENTRADAS", 2048))
+    ttl = float(os.environ.get("SUPERLIGA_CACHE_TTL", 300))
+    if tipo == "desactivada":
+        return CacheEntidades()
+    if tipo == "sqlite":
+        ruta = os.environ.get("SUPERLIGA_CACHE_RUTA", "/tmp/superliga_cache.sqlite3")
+        return CacheEntidades(BackendSQLite(ruta, max_entradas=max_entradas, ttl=ttl))
+    return CacheEntidades(BackendMemoria(max_entradas=max_entradas, ttl=ttl))
+
+
+cache_entidades = crear_cache_desde_entorno()
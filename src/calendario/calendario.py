@@ -0,0 +1,312 @@
+"""
+Generación del calendario de una temporada.
+
+El calendario se construye entero en memoria: emparejamientos por el método del círculo, una fecha
+por jornada y un horario libre en la sede del equipo local para cada partido. validar_calendario lo
+comprueba en una sola pasada sobre los partidos y crear_calendario inserta todos los Partido en una
+transacción, en lugar de un POST /partidos por encuentro.
+
+La sede no se guarda en Partido: por defecto cada equipo juega en la suya y `sedes` permite indicar
+los equipos que comparten pabellón, que entonces no pueden jugar en casa a la misma hora.
+
+Uso:
+    python -m src.calendario 2025 --inicio 2025-01-11 --horarios 18:00 20:00 --simular
+    python -m src.calendario 2025 --equipos 1 2 3 4 --sede 3=Coliseo --sede 4=Coliseo
+"""
+import argparse
+import sys
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import insert, select, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.database import conectar_db, cerrar_db, Equipo, Partido
+from src.negocio import FORMATOS_HORA
+from src.versiones import incrementar_versiones
+
+DIAS_ENTRE_JORNADAS = 7
+DESCANSO_MINIMO_DIAS = 2
+HORARIOS = ("19:00",)
+
+
+def jornadas_round_robin(equipos: list[int], ida_y_vuelta: bool = True) -> list[list[tuple[int, int]]]:
+    """
+    Método del círculo: devuelve las jornadas como listas de (local, visitante). Con un número impar
+    de equipos se fija un hueco y cada jornada descansa el equipo emparejado con él. El primer cruce
+    de cada jornada alterna la localía y el resto la toma de su posición (tablas de Berger), así cada
+    equipo juega en casa la mitad de los partidos con el mínimo de localías seguidas. La vuelta repite
+    la ida con los papeles cambiados.
+    """
+    rotacion = [None] + list(equipos) if len(equipos) % 2 else list(equipos)
+    jornadas = []
+    for ronda in range(len(rotacion) - 1):
+        jornada = []
+        for i in range(len(rotacion) // 2):
+            local, visitante = rotacion[i], rotacion[-1 - i]
+            if local is None or visitante is None:
+                continue
+            if (ronda % 2 == 1) if i == 0 else (i % 2 == 0):
+                local, visitante = visitante, local
+            jornada.append((local, visitante))
+        jornadas.append(jornada)
+        rotacion.insert(1, rotacion.pop())
+    if ida_y_vuelta:
+        jornadas += [[(visitante, local) for local, visitante in jornada] for jornada in jornadas]
+    return jornadas
+
+
+def programar_jornadas(jornadas: list[list[tuple[int, int]]], inicio: date, horarios: list[time],
+                       sedes: dict[int, str] = None, dias_entre_jornadas: int = DIAS_ENTRE_JORNADAS,
+                       fechas_excluidas: set[date] = frozenset()) -> list[dict]:
+    """
+    Asigna fecha y hora a cada partido. La jornada n empieza el primer día disponible desde
+    inicio + n * dias_entre_jornadas (y después de la jornada anterior). Cada partido toma el primer
+    horario libre de la sede del local; si la sede no tiene más horarios ese día pasa al siguiente,
+    sin salir de la ventana de la jornada. Lanza ValueError si un partido no cabe.
+    """
+    sedes = sedes or {}
+    ocupados = {}
+    partidos = []
+    siguiente_libre = inicio
+    for numero, jornada in enumerate(jornadas):
+        primer_dia = max(inicio + timedelta(days=numero * dias_entre_jornadas), siguiente_libre)
+        for local, visitante in jornada:
+            sede = sedes.get(local, f"equipo-{local}")
+            dia = primer_dia
+            while dia in fechas_excluidas or ocupados.get((sede, dia), 0) >= len(horarios):
+                dia += timedelta(days=1)
+                if dia >= primer_dia + timedelta(days=dias_entre_jornadas):
+                    raise ValueError(f"La jornada {numero + 1} no cabe: la sede {sede} no tiene horarios libres "
+                                     f"entre el {primer_dia.isoformat()} y el {dia.isoformat()}")
+            hora = horarios[ocupados.get((sede, dia), 0)]
+            ocupados[(sede, dia)] = ocupados.get((sede, dia), 0) + 1
+            partidos.append({"jornada": numero + 1, "fecha": datetime.combine(dia, hora), "sede": sede,
+                             "equipo_local_id": local, "equipo_visitante_id": visitante})
+            siguiente_libre = max(siguiente_libre, dia + timedelta(days=1))
+    return partidos
+
+
+def validar_calendario(partidos: list[dict], equipos: list[int], ida_y_vuelta: bool = True,
+                       descanso_minimo_dias: int = DESCANSO_MINIMO_DIAS) -> list[str]:
+    """
+    Comprueba el calendario en una pasada (partidos en orden de jornada): cada cruce una vez (o una
+    por localía con ida y vuelta), un partido por equipo y jornada, un partido por sede y horario,
+    los días de descanso entre partidos de un equipo y el equilibrio de localía. Devuelve los errores.
+    """
+    errores = []
+    participantes = set(equipos)
+    esperados = len(participantes) * (len(participantes) - 1) // (1 if ida_y_vuelta else 2)
+    if len(partidos) != esperados:
+        errores.append(f"Se esperaban {esperados} partidos y hay {len(partidos)}")
+    cruces = set()
+    huecos = set()
+    ultimo = {}
+    locales = dict.fromkeys(participantes, 0)
+    for partido in partidos:
+        local, visitante = partido["equipo_local_id"], partido["equipo_visitante_id"]
+        if local == visitante or local not in participantes or visitante not in participantes:
+            errores.append(f"Cruce no válido en la jornada {partido['jornada']}: {local} - {visitante}")
+            continue
+        cruce = (local, visitante) if ida_y_vuelta else (min(local, visitante), max(local, visitante))
+        if cruce in cruces:
+            errores.append(f"El cruce {local} - {visitante} está repetido")
+        cruces.add(cruce)
+        hueco = (partido["sede"], partido["fecha"])
+        if hueco in huecos:
+            errores.append(f"La sede {partido['sede']} tiene dos partidos el {partido['fecha'].isoformat()}")
+        huecos.add(hueco)
+        for equipo in (local, visitante):
+            anterior = ultimo.get(equipo)
+            if anterior is not None:
+                jornada_anterior, fecha_anterior = anterior
+                descanso = (partido["fecha"].date() - fecha_anterior.date()).days - 1
+                if jornada_anterior == partido["jornada"]:
+                    errores.append(f"El equipo {equipo} juega dos veces en la jornada {partido['jornada']}")
+                elif descanso < descanso_minimo_dias:
+                    errores.append(f"El equipo {equipo} descansa {max(descanso, 0)} días antes de la jornada "
+                                   f"{partido['jornada']} (mínimo {descanso_minimo_dias})")
+            ultimo[equipo] = (partido["jornada"], partido["fecha"])
+        locales[local] += 1
+    for equipo, en_casa in locales.items():
+        fuera = (len(participantes) - 1) * (2 if ida_y_vuelta else 1) - en_casa
+        if abs(en_casa - fuera) > (0 if ida_y_vuelta else 1):
+            errores.append(f"El equipo {equipo} juega {en_casa} partidos en casa y {fuera} fuera")
+    return errores
+
+
+def _es_entero(valor) -> bool:
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _es_lista_de(valores, tipo) -> bool:
+    return isinstance(valores, (list, tuple)) and all(isinstance(valor, tipo) for valor in valores)
+
+
+def _comprobar_tipos(equipos, inicio, horarios, sedes, dias_entre_jornadas, descanso_minimo_dias, ida_y_vuelta,
+                     fechas_excluidas):
+    """
+    Los parámetros llegan tal cual del cuerpo JSON: lanza ValueError si alguno no tiene el tipo esperado.
+    """
+    if not isinstance(equipos, (list, tuple)) or not all(_es_entero(equipo) for equipo in equipos):
+        raise ValueError("equipos debe ser una lista de ids de equipo")
+    if inicio is not None and not isinstance(inicio, str):
+        raise ValueError("inicio debe ser una fecha AAAA-MM-DD")
+    if not _es_lista_de(horarios, str):
+        raise ValueError("horarios debe ser una lista de horas en texto, p. ej. 19:00 u 8:00 PM")
+    if sedes is not None and not isinstance(sedes, dict):
+        raise ValueError("sedes debe ser un objeto {equipo_id: sede}")
+    if not _es_entero(dias_entre_jornadas) or not _es_entero(descanso_minimo_dias):
+        raise ValueError("dias_entre_jornadas y descanso_minimo_dias deben ser números enteros")
+    if not isinstance(ida_y_vuelta, bool):
+        raise ValueError("ida_y_vuelta debe ser true o false")
+    if not _es_lista_de(fechas_excluidas, str):
+        raise ValueError("fechas_excluidas debe ser una lista de fechas AAAA-MM-DD")
+
+
+def _parsear_hora(hora: str) -> time:
+    for formato in FORMATOS_HORA:
+        try:
+            return datetime.strptime(hora.strip().upper(), formato).time()
+        except ValueError:
+            continue
+    raise ValueError(f"Hora inválida: {hora}")
+
+
+def _parsear_fecha(fecha: str) -> date:
+    try:
+        return date.fromisoformat(fecha)
+    except ValueError:
+        raise ValueError(f"Fecha inválida: {fecha}")
+
+
+def generar_calendario(temporada: int, equipos: list[int], inicio: str = None, horarios: list[str] = HORARIOS,
+                       sedes: dict = None, dias_entre_jornadas: int = DIAS_ENTRE_JORNADAS,
+                       descanso_minimo_dias: int = DESCANSO_MINIMO_DIAS, ida_y_vuelta: bool = True,
+                       fechas_excluidas: list[str] = ()) -> tuple[list[dict], list[str]]:
+    """
+    Construye y valida el calendario sin tocar la base de datos. Devuelve (partidos, errores).
+    Lanza ValueError si los parámetros no son válidos.
+    """
+    _comprobar_tipos(equipos, inicio, horarios, sedes, dias_entre_jornadas, descanso_minimo_dias, ida_y_vuelta,
+                     fechas_excluidas)
+    if len(equipos) < 2:
+        raise ValueError("Se necesitan al menos dos equipos")
+    if len(set(equipos)) != len(equipos):
+        raise ValueError("La lista de equipos tiene repetidos")
+    if not horarios:
+        raise ValueError("Se necesita al menos un horario")
+    if dias_entre_jornadas < 1 or descanso_minimo_dias < 0:
+        raise ValueError("dias_entre_jornadas debe ser al menos 1 y descanso_minimo_dias no puede ser negativo")
+    fecha_inicio = _parsear_fecha(inicio) if inicio else date(temporada, 1, 1)
+    if fecha_inicio.year != temporada:
+        raise ValueError(f"La fecha de inicio {fecha_inicio.isoformat()} no es de la temporada {temporada}")
+    horas = sorted(_parsear_hora(hora) for hora in horarios)
+    excluidas = {_parsear_fecha(fecha) for fecha in fechas_excluidas}
+    try:
+        sedes = {int(equipo_id): str(sede) for equipo_id, sede in (sedes or {}).items()}
+    except ValueError:
+        raise ValueError("Las claves de sedes deben ser ids de equipo")
+
+    jornadas = jornadas_round_robin(equipos, ida_y_vuelta)
+    partidos = programar_jornadas(jornadas, fecha_inicio, horas, sedes, dias_entre_jornadas, excluidas)
+    errores = validar_calendario(partidos, equipos, ida_y_vuelta, descanso_minimo_dias)
+    if partidos and partidos[-1]["fecha"].year != temporada:
+        errores.append(f"El calendario termina el {partidos[-1]['fecha'].date().isoformat()}, "
+                       f"fuera de la temporada {temporada}")
+    return partidos, errores
+
+
+def crear_calendario(session: Session, temporada: int, equipos: list[int] = None,
+                     **opciones) -> tuple[list[Partido], list[str]] | None:
+    """
+    Genera el calendario de la temporada (por defecto con todos los equipos) e inserta todos sus
+    partidos en una sola transacción. Devuelve (partidos, errores); si hay errores no se escribe nada.
+    Devuelve None si alguno de los equipos ya tiene partidos en la temporada. Sin INSERT … RETURNING de
+    varias filas (MySQL) los partidos creados se leen después con una consulta.
+    """
+    if equipos is None:
+        equipos = list(session.scalars(select(Equipo.id).order_by(Equipo.id)))
+    partidos, errores = generar_calendario(temporada, equipos, **opciones)
+    if errores:
+        return [], errores
+
+    inicio, fin = datetime(temporada, 1, 1), datetime(temporada + 1, 1, 1)
+    ocupada = session.scalar(
+        select(Partido.id)
+        .where(Partido.fecha >= inicio, Partido.fecha < fin,
+               or_(Partido.equipo_local_id.in_(equipos), Partido.equipo_visitante_id.in_(equipos)))
+        .limit(1)
+    )
+    if ocupada is not None:
+        return None
+
+    filas = [{"fecha": partido["fecha"], "equipo_local_id": partido["equipo_local_id"],
+              "equipo_visitante_id": partido["equipo_visitante_id"]} for partido in partidos]
+    try:
+        if session.get_bind().dialect.insert_executemany_returning:
+            creados = session.scalars(insert(Partido).returning(Partido), filas).all()
+        else:
+            session.execute(insert(Partido), filas)
+            creados = session.scalars(select(Partido).where(Partido.fecha >= inicio, Partido.fecha < fin,
+                                                            Partido.equipo_local_id.in_(equipos))).all()
+    except IntegrityError:
+        session.rollback()
+        return [], ["Alguno de los equipos no existe"]
+    incrementar_versiones(session, *(("equipo", equipo_id) for equipo_id in equipos),
+                          *(("partido", partido.id) for partido in creados))
+    session.commit()
+    return sorted(creados, key=lambda partido: (partido.fecha, partido.id)), []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera el calendario de una temporada de la Superliga")
+    parser.add_argument("temporada", type=int)
+    parser.add_argument("--equipos", type=int, nargs="+", help="Por defecto, todos los equipos")
+    parser.add_argument("--inicio", help="Fecha de la primera jornada (AAAA-MM-DD)")
+    parser.add_argument("--horarios", nargs="+", default=list(HORARIOS))
+    parser.add_argument("--dias-entre-jornadas", type=int, default=DIAS_ENTRE_JORNADAS)
+    parser.add_argument("--descanso", type=int, default=DESCANSO_MINIMO_DIAS, help="Días mínimos de descanso")
+    parser.add_argument("--solo-ida", action="store_true")
+    parser.add_argument("--excluir", nargs="+", default=[], help="Fechas sin partidos (AAAA-MM-DD)")
+    parser.add_argument("--sede", action="append", default=[], metavar="EQUIPO=SEDE")
+    parser.add_argument("--simular", action="store_true", help="Muestra el calendario sin guardarlo")
+    args = parser.parse_args(argv)
+
+    session = conectar_db()
+    if not session:
+        return 1
+    try:
+        opciones = {
+            "inicio": args.inicio,
+            "horarios": args.horarios,
+            "sedes": dict(sede.split("=", 1) for sede in args.sede),
+            "dias_entre_jornadas": args.dias_entre_jornadas,
+            "descanso_minimo_dias": args.descanso,
+            "ida_y_vuelta": not args.solo_ida,
+            "fechas_excluidas": args.excluir,
+        }
+        if args.simular:
+            equipos = args.equipos or list(session.scalars(select(Equipo.id).order_by(Equipo.id)))
+            partidos, errores = generar_calendario(args.temporada, equipos, **opciones)
+            for partido in partidos:
+                print(f"J{partido['jornada']:>2}  {partido['fecha']:%Y-%m-%d %H:%M}  {partido['sede']:<12}  "
+                      f"{partido['equipo_local_id']} - {partido['equipo_visitante_id']}")
+        else:
+            resultado = crear_calendario(session, args.temporada, args.equipos, **opciones)
+            if resultado is None:
+                print(f"Error: la temporada {args.temporada} ya tiene partidos programados", file=sys.stderr)
+                return 1
+            partidos, errores = resultado
+            if not errores:
+                print(f"Calendario {args.temporada}: {len(partidos)} partidos creados.")
+        for error in errores:
+            print(f"Error: {error}", file=sys.stderr)
+        return 1 if errores else 0
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        cerrar_db(session)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
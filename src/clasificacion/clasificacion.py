@@ -0,0 +1,215 @@
+import sys
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from src.database import (
+    conectar_db,
+    cerrar_db,
+    Equipo,
+    Jugador,
+    Partido,
+    Estadistica,
+    Clasificacion,
+)
+
+CAMPOS_CLASIFICACION = (
+    "partidos_jugados",
+    "partidos_ganados",
+    "partidos_perdidos",
+    "sets_favor",
+    "sets_contra",
+    "puntos",
+    "puntos_anotados",
+)
+
+
+def resultado_valido(sets_local: int, sets_visitante: int) -> bool:
+    """
+    Un partido de voleibol termina cuando un equipo gana 3 sets y el otro entre 0 y 2.
+    """
+    return sorted((sets_local, sets_visitante)) in ([0, 3], [1, 3], [2, 3])
+
+
+def _deltas_resultado(sets_propios: int, sets_rival: int) -> dict:
+    """
+    Calcula la contribución de un resultado a la clasificación de un equipo.
+    Sistema de puntos FIVB: 3-0 y 3-1 dan 3 puntos al ganador; 3-2 da 2 al ganador y 1 al perdedor.
+    """
+    gano = sets_propios > sets_rival
+    if gano:
+        puntos = 3 if sets_rival <= 1 else 2
+    else:
+        puntos = 1 if sets_propios == 2 else 0
+    return {
+        "partidos_jugados": 1,
+        "partidos_ganados": 1 if gano else 0,
+        "partidos_perdidos": 0 if gano else 1,
+        "sets_favor": sets_propios,
+        "sets_contra": sets_rival,
+        "puntos": puntos,
+    }
+
+
+def _aplicar_deltas(session: Session, equipo_id: int, deltas: dict, signo: int = 1):
+    """
+    Suma los deltas a la fila del equipo con un UPDATE atómico; crea la fila si aún no existe.
+    """
+    valores = {getattr(Clasificacion, campo): getattr(Clasificacion, campo) + signo * valor
+               for campo, valor in deltas.items() if valor}
+    if not valores:
+        return
+    actualizadas = session.query(Clasificacion).filter(Clasificacion.equipo_id == equipo_id).update(
+        valores, synchronize_session=False)
+    if not actualizadas:
+        fila = Clasificacion(equipo_id=equipo_id, **{campo: 0 for campo in CAMPOS_CLASIFICACION})
+        for campo, valor in deltas.items():
+            setattr(fila, campo, signo * valor)
+        session.add(fila)
+        session.flush()
+
+
+def registrar_resultado(session: Session, partido: Partido, sets_local: int, sets_visitante: int):
+    """
+    Actualiza incrementalmente la clasificación cuando se escribe el resultado de un partido.
+    Si el partido ya tenía un resultado, primero se descuenta el anterior. No hace commit.
+    """
+    if partido.sets_local is not None and partido.sets_visitante is not None:
+        _aplicar_deltas(session, partido.equipo_local_id,
+                        _deltas_resultado(partido.sets_local, partido.sets_visitante), signo=-1)
+        _aplicar_deltas(session, partido.equipo_visitante_id,
+                        _deltas_resultado(partido.sets_visitante, partido.sets_local), signo=-1)
+    _aplicar_deltas(session, partido.equipo_local_id, _deltas_resultado(sets_local, sets_visitante))
+    _aplicar_deltas(session, partido.equipo_visitante_id, _deltas_resultado(sets_visitante, sets_local))
+
+
+def registrar_equipo(session: Session, equipo_id: int):
+    """
+    Crea la fila a cero de un equipo nuevo, para que aparezca en la clasificación igual que tras un
+    recálculo completo. No hace commit.
+    """
+    session.add(Clasificacion(equipo_id=equipo_id, **{campo: 0 for campo in CAMPOS_CLASIFICACION}))
+
+
+def registrar_puntos_anotados(session: Session, puntos_por_equipo: dict[int, int]):
+    """
+    Suma los puntos anotados por los jugadores de cada equipo. No hace commit.
+    """
+    for equipo_id, puntos in puntos_por_equipo.items():
+        if equipo_id is not None:
+            _aplicar_deltas(session, equipo_id, {"puntos_anotados": puntos})
+
+
+def puntos_anotados_jugador(session: Session, jugador_id: int) -> int:
+    """
+    Puntos del jugador en todas sus estadísticas. El recálculo completo los atribuye a su equipo actual,
+    así que al cambiar de equipo o eliminarse hay que moverlos o descontarlos.
+    """
+    return session.scalar(select(func.coalesce(func.sum(Estadistica.puntos), 0))
+                          .where(Estadistica.jugador_id == jugador_id))
+
+
+def obtener_clasificacion(session: Session) -> list[tuple[Clasificacion, str]]:
+    return (
+        session.query(Clasificacion, Equipo.nombre)
+        .join(Equipo, Equipo.id == Clasificacion.equipo_id)
+        .order_by(
+            Clasificacion.puntos.desc(),
+            Clasificacion.partidos_ganados.desc(),
+            (Clasificacion.sets_favor - Clasificacion.sets_contra).desc(),
+            Clasificacion.puntos_anotados.desc(),
+            Clasificacion.equipo_id,
+        )
+        .all()
+    )
+
+
+def calcular_clasificacion(session: Session) -> dict[int, dict]:
+    """
+    Recalcula la clasificación completa desde cero a partir de partido y estadistica.
+    """
+    tabla = {equipo_id: {campo: 0 for campo in CAMPOS_CLASIFICACION}
+             for (equipo_id,) in session.query(Equipo.id).all()}
+
+    partidos = (
+        session.query(Partido.equipo_local_id, Partido.equipo_visitante_id, Partido.sets_local,
+                      Partido.sets_visitante)
+        .filter(Partido.sets_local.isnot(None), Partido.sets_visitante.isnot(None))
+    )
+    for local_id, visitante_id, sets_local, sets_visitante in partidos:
+        for equipo_id, propios, rival in ((local_id, sets_local, sets_visitante),
+                                          (visitante_id, sets_visitante, sets_local)):
+            fila = tabla.setdefault(equipo_id, {campo: 0 for campo in CAMPOS_CLASIFICACION})
+            for campo, valor in _deltas_resultado(propios, rival).items():
+                fila[campo] += valor
+
+    anotados = (
+        session.query(Jugador.equipo_id, func.coalesce(func.sum(Estadistica.puntos), 0))
+        .join(Jugador, Jugador.id == Estadistica.jugador_id)
+        .group_by(Jugador.equipo_id)
+    )
+    for equipo_id, puntos in anotados:
+        if equipo_id in tabla:
+            tabla[equipo_id]["puntos_anotados"] = int(puntos)
+    return tabla
+
+
+def reconstruir_clasificacion(session: Session) -> int:
+    """
+    Reemplaza la tabla de clasificación por un recálculo completo. Sirve para reparaciones.
+    """
+    tabla = calcular_clasificacion(session)
+    session.query(Clasificacion).delete(synchronize_session=False)
+    session.add_all([Clasificacion(equipo_id=equipo_id, **valores) for equipo_id, valores in tabla.items()])
+    session.commit()
+    return len(tabla)
+
+
+def verificar_clasificacion(session: Session) -> list[dict]:
+    """
+    Compara los valores incrementales con un recálculo completo y devuelve las diferencias.
+    """
+    esperada = calcular_clasificacion(session)
+    actual = {fila.equipo_id: fila for fila in session.query(Clasificacion).all()}
+    diferencias = []
+    for equipo_id in sorted(set(esperada) | set(actual)):
+        valores_esperados = esperada.get(equipo_id, {campo: 0 for campo in CAMPOS_CLASIFICACION})
+        fila = actual.get(equipo_id)
+        for campo in CAMPOS_CLASIFICACION:
+            valor_actual = getattr(fila, campo) if fila else 0
+            if valor_actual != valores_esperados[campo]:
+                diferencias.append({"equipo_id": equipo_id, "campo": campo, "actual": valor_actual,
+                                    "esperado": valores_esperados[campo]})
+    return diferencias
+
+
+def main():
+    comando = sys.argv[1] if len(sys.argv) > 1 else "verificar"
+    if comando not in ("reconstruir", "verificar"):
+        print("Uso: python -m src.clasificacion [reconstruir|verificar]")
+        return 2
+
+    session = conectar_db()
+    if not session:
+        return 1
+    try:
+        if comando == "reconstruir":
+            total = reconstruir_clasificacion(session)
+            print(f"Clasificación reconstruida para {total} equipos.")
+            return 0
+        diferencias = verificar_clasificacion(session)
+        for diferencia in diferencias:
+            print(f"Equipo {diferencia['equipo_id']}: {diferencia['campo']} = {diferencia['actual']}, "
+                  f"esperado {diferencia['esperado']}")
+        if diferencias:
+            return 1
+        print("La clasificación es consistente.")
+        return 0
+    except Exception as e:
+        print(f"Ocurrió un error: {e}")
+        session.rollback()
+        return 1
+    finally:
+        cerrar_db(session)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Modo de depuración de SQL: registro de sentencias por petición, detector de N+1 y log de consultas lentas.
+
+Con SUPERLIGA_DEPURAR_SQL=1 cada petición guarda sus sentencias y al terminar avisa de las formas de
+sentencia que se repiten SUPERLIGA_SQL_REPETICIONES veces o más con distintos parámetros (el patrón
+típico de una relación perezosa recorrida en un bucle, p. ej. Partido.__str__ con equipo_local.nombre)
+y de las rutas que superan el presupuesto declarado con @presupuesto_sql.
+
+Con SUPERLIGA_SQL_LENTA_MS (100 por defecto en modo depuración, desactivado si no) las sentencias que
+tardan más se registran con sus parámetros y el punto del código que las lanzó. El origen solo se
+calcula para las sentencias lentas y las repetidas, así que el log de lentas puede quedar activo.
+
+En las pruebas, el plugin src/depuracion/pytest_depuracion.py activa el modo y falla el test que
+supere un presupuesto.
+"""
+import contextvars
+import logging
+import os
+import re
+import sys
+import sysconfig
+import time
+from collections import Counter
+import sqlalchemy
+from sqlalchemy import event
+
+logger = logging.getLogger("superliga.sql")
+
+LONGITUD_MAXIMA = 500
+_PARAMETROS = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)\s*,?)+\)")
+_TUPLAS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_IGNORADOS = (os.path.dirname(sqlalchemy.__file__),) + tuple(
+    filter(None, (sysconfig.get_paths().get(clave) for clave in ("stdlib", "purelib", "platlib"))))
+
+
+def _activado(variable: str) -> bool:
+    return os.environ.get(variable, "0").lower() in ("1", "true", "si")
+
+
+def forma_sentencia(sentencia: str) -> str:
+    """
+    Sentencia sin los valores de sus listas de parámetros: IN (?, ?, ?) y VALUES (?, ?), (?, ?) quedan
+    como (...), de modo que dos ejecuciones que solo difieren en los parámetros tienen la misma forma.
+    """
+    return _TUPLAS.sub("(...)", _PARAMETROS.sub("(...)", " ".join(sentencia.split())))
+
+
+def origen_llamada() -> str | None:
+    """
+    Primer marco de la pila que pertenece a la aplicación (no a SQLAlchemy, la biblioteca estándar
+    ni paquetes instalados), como "archivo:línea (función)".
+    """
+    marco = sys._getframe(1)
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if archivo != __file__ and not archivo.startswith(_IGNORADOS) and not archivo.startswith("<"):
+            return f"{archivo}:{marco.f_lineno} ({marco.f_code.co_name})"
+        marco = marco.f_back
+    return None
+
+
+def _recortar(valor) -> str:
+    texto = repr(valor)
+    return texto if len(texto) <= LONGITUD_MAXIMA else texto[:LONGITUD_MAXIMA] + "…"
+
+
+class RegistroSentencias:
+    """
+    Sentencias de una petición: número de ejecuciones por forma y origen de las que se repiten.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.tiempo = 0.0
+        self.por_forma = Counter()
+        self.origenes = {}
+
+    def anotar(self, sentencia: str, duracion: float, executemany: bool, umbral_repeticiones: int):
+        self.total += 1
+        self.tiempo += duracion
+        if executemany:
+            return
+        forma = forma_sentencia(sentencia)
+        self.por_forma[forma] += 1
+        if self.por_forma[forma] == umbral_repeticiones:
+            self.origenes[forma] = origen_llamada()
+
+    def repetidas(self, umbral_repeticiones: int) -> list[dict]:
+        return [{"veces": veces, "sentencia": forma[:LONGITUD_MAXIMA], "origen": self.origenes.get(forma)}
+                for forma, veces in self.por_forma.most_common() if veces >= umbral_repeticiones]
+
+
+class DepuracionSql:
+    """
+    Estado del modo de depuración. Los eventos del engine se registran siempre y no hacen nada si el
+    modo y el log de lentas están desactivados.
+    """
+
+    def __init__(self, activo: bool = False, umbral_lenta_ms: float = None, umbral_repeticiones: int = 3):
+        self.activo = activo
+        self.umbral_lenta_ms = umbral_lenta_ms
+        self.umbral_repeticiones = umbral_repeticiones
+        self.excesos = []
+        self._registro = contextvars.ContextVar("registro_sentencias", default=None)
+
+    def activar(self, umbral_lenta_ms: float = None):
+        self.activo = True
+        if umbral_lenta_ms is not None or self.umbral_lenta_ms is None:
+            self.umbral_lenta_ms = umbral_lenta_ms if umbral_lenta_ms is not None else 100.0
+
+    def instrumentar(self, engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def antes(conn, cursor, statement, parameters, context, executemany):
+            if self.activo or self.umbral_lenta_ms is not None:
+                conn.info.setdefault("inicio_depuracion", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def despues(conn, cursor, statement, parameters, context, executemany):
+            inicios = conn.info.get("inicio_depuracion")
+            if not inicios:
+                return
+            duracion = time.perf_counter() - inicios.pop()
+            registro = self._registro.get()
+            if registro is not None:
+                registro.anotar(statement, duracion, executemany, self.umbral_repeticiones)
+            if self.umbral_lenta_ms is not None and duracion * 1000 >= self.umbral_lenta_ms:
+                logger.warning("consulta lenta", extra={
+                    "duracion_ms": round(duracion * 1000, 2),
+                    "sentencia": " ".join(statement.split())[:LONGITUD_MAXIMA],
+                    "parametros": _recortar(parameters),
+                    "origen": origen_llamada(),
+                })
+
+        @event.listens_for(engine, "handle_error")
+        def error(contexto):
+            inicios = contexto.connection.info.get("inicio_depuracion") if contexto.connection is not None else None
+            if inicios:
+                inicios.pop()
+
+    def iniciar_peticion(self):
+        self._registro.set(RegistroSentencias() if self.activo else None)
+
+    def terminar_peticion(self, ruta: str, presupuesto: int = None) -> RegistroSentencias | None:
+        """
+        Avisa de las sentencias repetidas y de un presupuesto superado. Las sentencias de una respuesta
+        en streaming se ejecutan después y no se cuentan.
+        """
+        registro = self._registro.get()
+        if registro is None:
+            return None
+        self._registro.set(None)
+        repetidas = registro.repetidas(self.umbral_repeticiones)
+        for repetida in repetidas:
+            logger.warning("sentencia repetida (posible N+1)", extra={"ruta_sql": ruta, **repetida})
+        if presupuesto is not None and registro.total > presupuesto:
+            exceso = {"ruta_sql": ruta, "sentencias": registro.total, "presupuesto": presupuesto,
+                      "repetidas": repetidas}
+            self.excesos.append(exceso)
+            logger.warning("presupuesto de consultas superado", extra=exceso)
+        return registro
+
+
+def presupuesto_sql(maximo: int):
+    """
+    Declara cuántas sentencias SQL puede ejecutar como mucho una ruta. Solo se comprueba en modo de
+    depuración (y por tanto en las pruebas).
+    """
+    def decorador(vista):
+        vista.presupuesto_sql = maximo
+        return vista
+    return decorador
+
+
+def crear_depuracion_desde_entorno() -> DepuracionSql:
+    activo = _activado("SUPERLIGA_DEPURAR_SQL")
+    umbral = os.environ.get("SUPERLIGA_SQL_LENTA_MS")
+    return DepuracionSql(
+        activo=activo,
+        umbral_lenta_ms=float(umbral) if umbral else (100.0 if activo else None),
+        umbral_repeticiones=int(os.environ.get("SUPERLIGA_SQL_REPETICIONES", 3)),
+    )
+
+
+depuracion_sql = crear_depuracion_desde_entorno()
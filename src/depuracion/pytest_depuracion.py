@@ -0,0 +1,53 @@
+"""
+Plugin de pytest con el presupuesto de consultas SQL.
+
+Se carga con `pytest -p src.pytest_depuracion`. El fixture presupuesto_sql activa el modo de
+depuración y falla el test si alguna petición atendida durante el test supera el presupuesto
+declarado en su ruta con @presupuesto_sql. También permite acotar un bloque cualquiera:
+
+    def test_convocatoria(cliente, presupuesto_sql):
+        cliente.get("/partidos/1/convocatoria")
+        with presupuesto_sql.maximo(2):
+            obtener_clasificacion(session)
+"""
+from contextlib import contextmanager
+import pytest
+from src.depuracion import depuracion_sql
+
+
+class PresupuestoSql:
+    def __init__(self, depuracion):
+        self.depuracion = depuracion
+
+    @property
+    def excesos(self) -> list[dict]:
+        return self.depuracion.excesos
+
+    @contextmanager
+    def maximo(self, sentencias: int, descripcion: str = "bloque"):
+        """
+        Falla si el bloque ejecuta más de `sentencias` sentencias SQL. No se puede usar dentro de una
+        petición: el registro es el mismo que el de la ruta.
+        """
+        self.depuracion.iniciar_peticion()
+        try:
+            yield
+        finally:
+            self.depuracion.terminar_peticion(descripcion, sentencias)
+
+
+@pytest.fixture
+def presupuesto_sql():
+    activo, umbral = depuracion_sql.activo, depuracion_sql.umbral_lenta_ms
+    depuracion_sql.activar()
+    depuracion_sql.excesos.clear()
+    presupuesto = PresupuestoSql(depuracion_sql)
+    yield presupuesto
+    excesos = list(depuracion_sql.excesos)
+    depuracion_sql.excesos.clear()
+    depuracion_sql.activo, depuracion_sql.umbral_lenta_ms = activo, umbral
+    if excesos:
+        pytest.fail("\n".join(
+            f"{exceso['ruta_sql']}: {exceso['sentencias']} sentencias SQL (presupuesto {exceso['presupuesto']})"
+            + "".join(f"\n    {r['veces']}x {r['sentencia']} [{r['origen']}]" for r in exceso["repetidas"])
+            for exceso in excesos), pytrace=False)
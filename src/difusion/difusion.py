@@ -0,0 +1,246 @@
+"""
+Difusión por Server-Sent Events del marcador en directo de cada partido.
+
+Por partido hay un único productor (un hilo) que consulta el registro evento_partido una vez por
+intervalo, serializa el marcador solo cuando cambia y entrega el mismo mensaje a todas las
+suscripciones. La carga sobre la base de datos depende del número de partidos, no de espectadores.
+Cada suscripción tiene una cola acotada: si se llena, el cliente es lento y se descarta.
+
+Los mensajes son instantáneas completas del marcador y su id es el último evento aplicado, así que
+reanudar con Last-Event-ID solo requiere reenviar la instantánea actual si el id es distinto.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+from src.database import conectar_db, cerrar_db, liberar_sesion
+from src.en_vivo import MarcadorEnVivo
+from src.serializacion import dumps_bytes
+
+INTERVALO = float(os.environ.get("SUPERLIGA_SSE_INTERVALO", 1.0))
+LATIDO = float(os.environ.get("SUPERLIGA_SSE_LATIDO", 15.0))
+TAMANO_COLA = int(os.environ.get("SUPERLIGA_SSE_COLA", 16))
+MENSAJE_LATIDO = b": latido\n\n"
+
+logger = logging.getLogger("superliga.difusion")
+
+
+def formatear_evento(evento_id: int, nombre: str, datos: bytes) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (evento_id, nombre.encode(), datos)
+
+
+class Suscripcion:
+    """
+    Cola acotada de un cliente servida desde un hilo del servidor WSGI.
+    """
+
+    def __init__(self, tamano: int = TAMANO_COLA, ultimo_id: int = None):
+        self.cola = queue.Queue(tamano)
+        self.descartada = False
+        self.ultimo_id = ultimo_id
+
+    def entregar(self, mensaje: bytes) -> bool:
+        try:
+            self.cola.put_nowait(mensaje)
+            return True
+        except queue.Full:
+            self.descartada = True
+            return False
+
+    def cerrar(self):
+        try:
+            self.cola.put_nowait(None)
+        except queue.Full:
+            self.descartada = True
+
+    def mensajes(self):
+        while not self.descartada:
+            try:
+                mensaje = self.cola.get(timeout=LATIDO)
+            except queue.Empty:
+                yield MENSAJE_LATIDO
+                continue
+            if mensaje is None:
+                return
+            yield mensaje
+
+
+class SuscripcionAsync(Suscripcion):
+    """
+    Variante para la aplicación ASGI: el productor entrega desde su hilo al event loop del cliente.
+    """
+
+    def __init__(self, tamano: int = TAMANO_COLA, ultimo_id: int = None):
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(tamano)
+        self.descartada = False
+        self.ultimo_id = ultimo_id
+
+    def _poner(self, mensaje):
+        try:
+            self.cola.put_nowait(mensaje)
+        except asyncio.QueueFull:
+            self.descartada = True
+
+    def entregar(self, mensaje: bytes) -> bool:
+        if self.descartada or self.cola.full():
+            self.descartada = True
+            return False
+        self.loop.call_soon_threadsafe(self._poner, mensaje)
+        return True
+
+    def cerrar(self):
+        self.loop.call_soon_threadsafe(self._poner, None)
+
+    async def mensajes(self):
+        while not self.descartada:
+            try:
+                mensaje = await asyncio.wait_for(self.cola.get(), LATIDO)
+            except asyncio.TimeoutError:
+                yield MENSAJE_LATIDO
+                continue
+            if mensaje is None:
+                return
+            yield mensaje
+
+
+class Productor:
+    """
+    Hilo que sigue el registro de un partido y difunde cada cambio del marcador.
+    """
+
+    def __init__(self, partido_id: int, difusor: "Difusor"):
+        self.partido_id = partido_id
+        self.difusor = difusor
+        self.suscripciones = set()
+        self.ultimo = None
+        self._lock = threading.Lock()
+        self._marcador = MarcadorEnVivo(partido_id)
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._ejecutar, name=f"sse-partido-{partido_id}", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def agregar(self, suscripcion: Suscripcion):
+        with self._lock:
+            self.suscripciones.add(suscripcion)
+            if self.ultimo is not None and self.ultimo[0] != suscripcion.ultimo_id:
+                suscripcion.entregar(self.ultimo[1])
+
+    def quitar(self, suscripcion: Suscripcion):
+        with self._lock:
+            self.suscripciones.discard(suscripcion)
+
+    def _difundir(self, evento_id: int, mensaje: bytes):
+        with self._lock:
+            suscripciones = list(self.suscripciones)
+        descartadas = [s for s in suscripciones if s.ultimo_id != evento_id and not s.entregar(mensaje)]
+        if descartadas:
+            with self._lock:
+                self.suscripciones.difference_update(descartadas)
+            logger.info("suscripciones lentas descartadas",
+                        extra={"partido_id": self.partido_id, "descartadas": len(descartadas)})
+
+    def _actualizar(self, primera: bool):
+        session = conectar_db()
+        try:
+            if primera:
+                self._marcador.reconstruir(session)
+            else:
+                self._marcador.ponerse_al_dia(session)
+        finally:
+            cerrar_db(session)
+        evento_id = self._marcador.ultimo_evento_id
+        if evento_id == 0 or (self.ultimo is not None and self.ultimo[0] == evento_id):
+            return
+        finalizado = self._marcador.finalizado
+        datos = dumps_bytes({"partido_id": self.partido_id, "finalizado": finalizado,
+                             "estadisticas": self._marcador.box_score()})
+        mensaje = formatear_evento(evento_id, "final" if finalizado else "estadisticas", datos)
+        with self._lock:
+            self.ultimo = (evento_id, mensaje)
+        self._difundir(evento_id, mensaje)
+
+    def _ejecutar(self):
+        primera = True
+        try:
+            while not self._detener.is_set():
+                try:
+                    self._actualizar(primera)
+                    primera = False
+                except Exception:
+                    logger.exception("error actualizando el marcador", extra={"partido_id": self.partido_id})
+                if self._marcador.finalizado or not self.difusor.seguir(self):
+                    break
+                self._detener.wait(INTERVALO)
+        finally:
+            self.difusor.retirar(self)
+            with self._lock:
+                suscripciones = list(self.suscripciones)
+                self.suscripciones.clear()
+            for suscripcion in suscripciones:
+                suscripcion.cerrar()
+            liberar_sesion()
+
+
+class Difusor:
+    """
+    Registro de productores: se crea uno con la primera suscripción a un partido y termina cuando se
+    queda sin suscriptores o el partido finaliza.
+    """
+
+    def __init__(self):
+        self._productores = {}
+        self._lock = threading.Lock()
+
+    def suscribir(self, partido_id: int, ultimo_id: int = None, asincrona: bool = False) -> Suscripcion:
+        suscripcion = SuscripcionAsync(ultimo_id=ultimo_id) if asincrona else Suscripcion(ultimo_id=ultimo_id)
+        with self._lock:
+            productor = self._productores.get(partido_id)
+            if productor is None:
+                productor = Productor(partido_id, self)
+                self._productores[partido_id] = productor
+                productor.iniciar()
+            productor.agregar(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, partido_id: int, suscripcion: Suscripcion):
+        with self._lock:
+            productor = self._productores.get(partido_id)
+        if productor is not None:
+            productor.quitar(suscripcion)
+
+    def seguir(self, productor: Productor) -> bool:
+        """
+        Indica si el productor debe continuar; si no quedan suscriptores lo retira bajo el mismo lock,
+        para que una suscripción concurrente cree un productor nuevo en lugar de unirse a uno que termina.
+        """
+        with self._lock:
+            if productor.suscripciones:
+                return True
+            if self._productores.get(productor.partido_id) is productor:
+                del self._productores[productor.partido_id]
+            return False
+
+    def retirar(self, productor: Productor):
+        with self._lock:
+            if self._productores.get(productor.partido_id) is productor:
+                del self._productores[productor.partido_id]
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {partido_id: len(productor.suscripciones) for partido_id, productor in self._productores.items()}
+
+    def detener(self):
+        with self._lock:
+            productores = list(self._productores.values())
+        for productor in productores:
+            productor.detener()
+
+
+difusor = Difusor()
@@ -0,0 +1,126 @@
+"""
+Marcador en directo de cada partido a partir del registro evento_partido.
+
+El registro es la fuente de verdad y el marcador en memoria es un agregado acumulado: cada lectura o
+escritura solo consulta los eventos con id mayor que el último aplicado. Un proceso que no tiene el
+marcador (tras reiniciarse, o porque los eventos los recibió otro worker) lo reconstruye desde el
+registro con un GROUP BY, así que cualquier worker sirve el box score en directo. Se asume un único
+anotador por partido, de modo que los ids de sus eventos se confirman en orden.
+"""
+import threading
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from src.database import EventoPartido
+
+# Tipo de evento -> campo de Estadistica que incrementa.
+CAMPOS_EVENTO = {"punto": "puntos", "bloqueo": "bloqueos", "ace": "saques", "recepcion": "recepciones"}
+EVENTO_FINAL = "final"
+MAX_SETS = 5
+
+
+class MarcadorEnVivo:
+    """
+    Totales por jugador de un partido en juego.
+    """
+
+    def __init__(self, partido_id: int):
+        self.partido_id = partido_id
+        self.totales = {}
+        self.ultimo_evento_id = 0
+        self.finalizado = False
+        self._lock = threading.Lock()
+
+    def _sumar(self, jugador_id: int, tipo: str, cantidad: int = 1):
+        if tipo == EVENTO_FINAL:
+            self.finalizado = True
+            return
+        campo = CAMPOS_EVENTO.get(tipo)
+        if campo is None or jugador_id is None:
+            return
+        totales = self.totales.setdefault(jugador_id, dict.fromkeys(CAMPOS_EVENTO.values(), 0))
+        totales[campo] += cantidad
+
+    def reconstruir(self, session: Session):
+        filas = session.execute(
+            select(EventoPartido.jugador_id, EventoPartido.tipo, func.count(), func.max(EventoPartido.id))
+            .where(EventoPartido.partido_id == self.partido_id)
+            .group_by(EventoPartido.jugador_id, EventoPartido.tipo)
+        ).all()
+        with self._lock:
+            self.totales = {}
+            self.ultimo_evento_id = 0
+            self.finalizado = False
+            for jugador_id, tipo, cantidad, ultimo_id in filas:
+                self._sumar(jugador_id, tipo, cantidad)
+                self.ultimo_evento_id = max(self.ultimo_evento_id, ultimo_id)
+
+    def ponerse_al_dia(self, session: Session):
+        filas = session.execute(
+            select(EventoPartido.id, EventoPartido.jugador_id, EventoPartido.tipo)
+            .where(EventoPartido.partido_id == self.partido_id, EventoPartido.id > self.ultimo_evento_id)
+            .order_by(EventoPartido.id)
+        ).all()
+        with self._lock:
+            for evento_id, jugador_id, tipo in filas:
+                if evento_id > self.ultimo_evento_id:
+                    self._sumar(jugador_id, tipo)
+                    self.ultimo_evento_id = evento_id
+
+    def box_score(self) -> list[dict]:
+        with self._lock:
+            return [{"id": None, "jugador_id": jugador_id, **totales}
+                    for jugador_id, totales in sorted(self.totales.items())]
+
+
+class AgregadorEnVivo:
+    """
+    Marcadores en directo de este proceso, uno por partido. Son una caché del registro evento_partido,
+    que comparten todos los workers.
+    """
+
+    def __init__(self):
+        self._marcadores = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, partido_id: int) -> MarcadorEnVivo | None:
+        return self._marcadores.get(partido_id)
+
+    def obtener_o_reconstruir(self, session: Session, partido_id: int) -> MarcadorEnVivo:
+        marcador = self._marcadores.get(partido_id)
+        if marcador is None:
+            marcador = MarcadorEnVivo(partido_id)
+            marcador.reconstruir(session)
+            with self._lock:
+                marcador = self._marcadores.setdefault(partido_id, marcador)
+        return marcador
+
+    def obtener_en_juego(self, session: Session, partido_id: int) -> MarcadorEnVivo | None:
+        """
+        Marcador al día del partido si está en juego, aunque sus eventos los haya recibido otro proceso.
+        Sin marcador en memoria se reconstruye desde el registro y solo se conserva si el partido tiene
+        eventos y no ha terminado; en otro caso devuelve None.
+        """
+        marcador = self._marcadores.get(partido_id)
+        if marcador is None:
+            marcador = MarcadorEnVivo(partido_id)
+            marcador.reconstruir(session)
+            if marcador.ultimo_evento_id == 0 or marcador.finalizado:
+                return None
+            with self._lock:
+                marcador = self._marcadores.setdefault(partido_id, marcador)
+        else:
+            marcador.ponerse_al_dia(session)
+        if marcador.finalizado:
+            self.terminar(partido_id)
+            return None
+        return marcador
+
+    def terminar(self, partido_id: int):
+        with self._lock:
+            self._marcadores.pop(partido_id, None)
+
+    def partidos_en_juego(self) -> list[int]:
+        return sorted(self._marcadores)
+
+
+agregador_en_vivo = AgregadorEnVivo()
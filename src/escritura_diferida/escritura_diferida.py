@@ -0,0 +1,275 @@
+"""
+Escritura diferida (write-behind) de estadísticas y estados de jugador.
+
+Con SUPERLIGA_ESCRITURA_DIFERIDA=1, crear_estadistica y crear_estado_jugador validan la petición,
+guardan la fila en una cola local en SQLite (confirmada en disco antes de responder) y devuelven 202.
+En el modo asíncrono la E/S de la cola se hace en un hilo aparte (ver ejecutar_bloqueante).
+Un hilo de vaciado agrupa las filas pendientes en inserciones masivas, en una transacción por lote,
+cuando se acumulan SUPERLIGA_ESCRITURA_DIFERIDA_LOTE filas o pasan SUPERLIGA_ESCRITURA_DIFERIDA_INTERVALO
+segundos. La entrega es al menos una vez: si el proceso muere entre el commit y el borrado de la cola,
+el lote se vuelve a escribir al reiniciar. Varios procesos pueden compartir la cola: cada lote se
+reclama de forma atómica y los reclamos de un proceso caído caducan.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.database import (conectar_db, cerrar_db, liberar_sesion, ejecutar_bloqueante, Jugador, Estadistica,
+                          EstadoJugador)
+from src.clasificacion import registrar_puntos_anotados
+from src.versiones import incrementar_versiones, LIGA
+from src.idempotencia import upsert_estadisticas, upsert_estados
+
+MODELOS = {"estadistica": Estadistica, "estado_jugador": EstadoJugador}
+# Segundos tras los que un lote reclamado por un proceso que no lo confirmó vuelve a estar disponible.
+CADUCIDAD_RECLAMO = 60.0
+
+logger = logging.getLogger("superliga.escritura_diferida")
+
+
+class ColaEscritura:
+    """
+    Cola de filas pendientes en un archivo SQLite local.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._local = threading.local()
+        conexion = self._conexion()
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS cola_escritura ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL, partido_id INTEGER NOT NULL, "
+            "datos TEXT NOT NULL, reclamado REAL)")
+        conexion.execute("CREATE INDEX IF NOT EXISTS ix_cola_escritura_partido ON cola_escritura (partido_id, tipo)")
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=FULL")
+            self._local.conexion = conexion
+        return conexion
+
+    def encolar(self, tipo: str, fila: dict) -> int:
+        cursor = self._conexion().execute(
+            "INSERT INTO cola_escritura (tipo, partido_id, datos) VALUES (?, ?, ?)",
+            (tipo, fila["partido_id"], json.dumps(fila)))
+        return cursor.lastrowid
+
+    def reclamar(self, cantidad: int) -> list[tuple[int, str, dict]]:
+        """
+        Marca como reclamadas hasta `cantidad` filas libres, las más antiguas primero, y las devuelve.
+        """
+        conexion = self._conexion()
+        ahora = time.time()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            filas = conexion.execute(
+                "SELECT id, tipo, datos FROM cola_escritura WHERE reclamado IS NULL OR reclamado < ? "
+                "ORDER BY id LIMIT ?", (ahora - CADUCIDAD_RECLAMO, cantidad)).fetchall()
+            conexion.executemany("UPDATE cola_escritura SET reclamado = ? WHERE id = ?",
+                                 [(ahora, fila[0]) for fila in filas])
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        return [(fila_id, tipo, json.loads(datos)) for fila_id, tipo, datos in filas]
+
+    def confirmar(self, ids: list[int]):
+        self._conexion().executemany("DELETE FROM cola_escritura WHERE id = ?", [(fila_id,) for fila_id in ids])
+
+    def liberar(self, ids: list[int]):
+        self._conexion().executemany("UPDATE cola_escritura SET reclamado = NULL WHERE id = ?",
+                                     [(fila_id,) for fila_id in ids])
+
+    def pendientes(self, tipo: str, partido_id: int) -> list[dict]:
+        filas = self._conexion().execute(
+            "SELECT datos FROM cola_escritura WHERE partido_id = ? AND tipo = ? ORDER BY id",
+            (partido_id, tipo)).fetchall()
+        return [json.loads(fila[0]) for fila in filas]
+
+    def ultimo_id(self, partido_id: int) -> int:
+        fila = self._conexion().execute(
+            "SELECT MAX(id) FROM cola_escritura WHERE partido_id = ?", (partido_id,)).fetchone()
+        return fila[0] or 0
+
+    def tamano(self) -> int:
+        return self._conexion().execute("SELECT COUNT(*) FROM cola_escritura").fetchone()[0]
+
+
+def escribir_lote(session: Session, filas: list[tuple[int, str, dict]]):
+    """
+    Escribe un lote de la cola con upserts en una sola transacción, con los mismos efectos que las escrituras
+    síncronas: puntos anotados en la clasificación y versiones de partido, jugador, equipo y liga.
+    """
+    por_tipo = {tipo: [] for tipo in MODELOS}
+    for _, tipo, datos in filas:
+        por_tipo[tipo].append(datos)
+    claves = {("partido", datos["partido_id"]) for _, _, datos in filas}
+
+    estadisticas = por_tipo["estadistica"]
+    if estadisticas:
+        jugadores = {datos["jugador_id"] for datos in estadisticas}
+        equipos_por_jugador = dict(
+            session.query(Jugador.id, Jugador.equipo_id).filter(Jugador.id.in_(jugadores)).all()
+        )
+        puntos_por_equipo = upsert_estadisticas(session, estadisticas, equipos_por_jugador)
+        registrar_puntos_anotados(session, puntos_por_equipo)
+        claves |= {("jugador", jugador_id) for jugador_id in jugadores}
+        claves |= {("equipo", equipo_id) for equipo_id in puntos_por_equipo}
+        claves.add(LIGA)
+    upsert_estados(session, por_tipo["estado_jugador"])
+    incrementar_versiones(session, *claves)
+    session.commit()
+
+
+class EscrituraDiferida:
+    """
+    Cola local más el hilo que la vacía en la base de datos. Inactiva si no tiene cola.
+    """
+
+    def __init__(self, cola: ColaEscritura = None, lote: int = 500, intervalo: float = 1.0):
+        self.cola = cola
+        self.lote = lote
+        self.intervalo = intervalo
+        self.escritas = 0
+        self.descartadas = 0
+        self._sin_vaciar = 0
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    @property
+    def activa(self) -> bool:
+        return self.cola is not None
+
+    def iniciar(self):
+        """
+        Arranca el hilo de vaciado (una vez por proceso) y registra el drenaje al terminar.
+        Las filas que quedaron en la cola de una ejecución anterior se escriben en el primer ciclo.
+        """
+        with self._lock:
+            if not self.activa or self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._ejecutar, name="escritura-diferida", daemon=True)
+            self._hilo.start()
+        atexit.register(self.detener)
+
+    def detener(self, timeout: float = 30.0):
+        """
+        Drena la cola y detiene el hilo de vaciado.
+        """
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hay_trabajo.set()
+        self._hilo.join(timeout)
+
+    def encolar(self, tipo: str, fila: dict):
+        ejecutar_bloqueante(self.cola.encolar, tipo, fila)
+        with self._lock:
+            self._sin_vaciar += 1
+            lleno = self._sin_vaciar >= self.lote
+        if lleno:
+            self._hay_trabajo.set()
+
+    def pendientes(self, tipo: str, partido_id: int) -> list[dict]:
+        return ejecutar_bloqueante(self.cola.pendientes, tipo, partido_id) if self.activa else []
+
+    def marca(self, tipo: str, entidad_id: int) -> int:
+        """
+        Id de la última fila pendiente que afecta a las lecturas del ámbito (0 si no hay ninguna).
+        Se añade al ETag para que un cliente no reciba 304 mientras sus escrituras siguen en la cola.
+        """
+        if not self.activa or tipo != "partido":
+            return 0
+        return ejecutar_bloqueante(self.cola.ultimo_id, entidad_id)
+
+    def _ejecutar(self):
+        try:
+            while not self._detener.is_set():
+                self._hay_trabajo.wait(self.intervalo)
+                self._hay_trabajo.clear()
+                try:
+                    self.vaciar()
+                except Exception:
+                    logger.exception("error leyendo la cola de escritura")
+            self.vaciar()
+        finally:
+            liberar_sesion()
+
+    def vaciar(self):
+        """
+        Escribe lotes hasta que la cola queda vacía (o hasta el primer error, que se reintenta después).
+        """
+        with self._lock:
+            self._sin_vaciar = 0
+        while True:
+            filas = self.cola.reclamar(self.lote)
+            if not filas or not self._escribir(filas):
+                return
+
+    def _escribir(self, filas: list[tuple[int, str, dict]]) -> bool:
+        ids = [fila[0] for fila in filas]
+        session = conectar_db()
+        try:
+            escribir_lote(session, filas)
+            self.cola.confirmar(ids)
+            self.escritas += len(filas)
+            return True
+        except IntegrityError:
+            session.rollback()
+            return self._escribir_una_a_una(session, filas)
+        except Exception:
+            session.rollback()
+            self.cola.liberar(ids)
+            logger.exception("error vaciando la cola de escritura", extra={"filas": len(filas)})
+            return False
+        finally:
+            cerrar_db(session)
+
+    def _escribir_una_a_una(self, session: Session, filas: list[tuple[int, str, dict]]) -> bool:
+        """
+        Un lote rechazado por una restricción se reintenta fila a fila; las filas que siguen fallando
+        (p. ej. un jugador eliminado después de encolar) se descartan y se registran.
+        """
+        for fila in filas:
+            try:
+                escribir_lote(session, [fila])
+                self.escritas += 1
+            except IntegrityError as e:
+                session.rollback()
+                self.descartadas += 1
+                logger.error("fila de la cola descartada", extra={"tipo": fila[1], "datos": fila[2],
+                                                                   "error": str(e.orig)})
+            self.cola.confirmar([fila[0]])
+        return True
+
+    def estadisticas(self) -> dict:
+        return {
+            "activa": self.activa,
+            "pendientes": self.cola.tamano() if self.activa else 0,
+            "escritas": self.escritas,
+            "descartadas": self.descartadas,
+        }
+
+
+def crear_escritura_diferida_desde_entorno() -> EscrituraDiferida:
+    """
+    SUPERLIGA_ESCRITURA_DIFERIDA=1 activa el modo; por defecto las escrituras son síncronas.
+    """
+    if os.environ.get("SUPERLIGA_ESCRITURA_DIFERIDA", "0").lower() not in ("1", "true", "si"):
+        return EscrituraDiferida()
+    ruta = os.environ.get("SUPERLIGA_ESCRITURA_DIFERIDA_RUTA", "/tmp/superliga_cola_escritura.sqlite3")
+    return EscrituraDiferida(ColaEscritura(ruta), lote=int(os.environ.get("SUPERLIGA_ESCRITURA_DIFERIDA_LOTE", 500)),
+                             intervalo=float(os.environ.get("SUPERLIGA_ESCRITURA_DIFERIDA_INTERVALO", 1.0)))
+
+
+escritura_diferida = crear_escritura_diferida_desde_entorno()
@@ -0,0 +1,139 @@
+"""
+Exportación completa de estadísticas, partidos y estado de jugadores en NDJSON o CSV.
+
+Las consultas seleccionan columnas (no entidades ORM) y se ejecutan con stream_results y yield_per,
+así en PostgreSQL se usa un cursor del lado del servidor y ni el mapa de identidad ni la memoria
+crecen con la cantidad de historia exportada.
+
+Uso:
+    python -m src.exportacion estadisticas --formato csv --temporada 2024 --salida estadisticas.csv
+    python -m src.exportacion partidos --desde 2024-05-01 --hasta 2024-05-31
+"""
+import argparse
+import csv
+import io
+import sys
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from src.database import conectar_db, cerrar_db, Partido, Estadistica, EstadoJugador
+from src.negocio import parsear_rango_fechas
+from src.serializacion import dumps_bytes
+
+TIPOS = ("estadisticas", "partidos", "estado_jugadores")
+FORMATOS = ("ndjson", "csv")
+TAMANO_LOTE = 1000
+TIPOS_MIME = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _columnas(tipo: str) -> list:
+    if tipo == "estadisticas":
+        return [Estadistica.id, Estadistica.jugador_id, Estadistica.partido_id, Partido.fecha, Estadistica.puntos,
+                Estadistica.bloqueos, Estadistica.saques, Estadistica.recepciones]
+    if tipo == "partidos":
+        return [Partido.id, Partido.fecha, Partido.equipo_local_id, Partido.equipo_visitante_id, Partido.sets_local,
+                Partido.sets_visitante]
+    if tipo == "estado_jugadores":
+        return [EstadoJugador.id, EstadoJugador.jugador_id, EstadoJugador.partido_id, Partido.fecha,
+                EstadoJugador.disponible, EstadoJugador.lesion_tipo]
+    raise ValueError(f"Tipo de exportación desconocido: {tipo}. Opciones: {', '.join(TIPOS)}")
+
+
+def rango_de_temporada(temporada: int | None, desde: str = None, hasta: str = None):
+    """
+    Una temporada es un año natural de partidos. Se combina con desde/hasta tomando la intersección.
+    """
+    inicio, fin = parsear_rango_fechas(desde, hasta)
+    if temporada is not None:
+        inicio_temporada, fin_temporada = datetime(temporada, 1, 1), datetime(temporada + 1, 1, 1)
+        inicio = max(inicio, inicio_temporada) if inicio else inicio_temporada
+        fin = min(fin, fin_temporada) if fin else fin_temporada
+    return inicio, fin
+
+
+def consulta_exportacion(tipo: str, temporada: int = None, desde: str = None, hasta: str = None):
+    columnas = _columnas(tipo)
+    consulta = select(*columnas)
+    if tipo == "estadisticas":
+        consulta = consulta.join(Partido, Partido.id == Estadistica.partido_id)
+    elif tipo == "estado_jugadores":
+        consulta = consulta.join(Partido, Partido.id == EstadoJugador.partido_id)
+    inicio, fin = rango_de_temporada(temporada, desde, hasta)
+    if inicio:
+        consulta = consulta.where(Partido.fecha >= inicio)
+    if fin:
+        consulta = consulta.where(Partido.fecha < fin)
+    return consulta.order_by(columnas[0])
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def exportar(session: Session, tipo: str, formato: str = "ndjson", temporada: int = None, desde: str = None,
+             hasta: str = None):
+    """
+    Genera la exportación en bloques de bytes, uno por lote de TAMANO_LOTE filas.
+    Lanza ValueError si el tipo, el formato o las fechas no son válidos.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato}. Opciones: {', '.join(FORMATOS)}")
+    consulta = consulta_exportacion(tipo, temporada, desde, hasta)
+    resultado = session.execute(consulta.execution_options(stream_results=True, yield_per=TAMANO_LOTE))
+    nombres = list(resultado.keys())
+
+    def generar():
+        try:
+            if formato == "csv":
+                buffer = io.StringIO()
+                escritor = csv.writer(buffer, lineterminator="\n")
+                escritor.writerow(nombres)
+                for lote in resultado.partitions():
+                    escritor.writerows([_valor_csv(valor) for valor in fila] for fila in lote)
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if buffer.tell():
+                    yield buffer.getvalue().encode()
+            else:
+                for lote in resultado.partitions():
+                    yield b"".join(dumps_bytes(dict(zip(nombres, fila))) + b"\n" for fila in lote)
+        finally:
+            resultado.close()
+
+    return generar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta datos de la Superliga en NDJSON o CSV")
+    parser.add_argument("tipo", choices=TIPOS)
+    parser.add_argument("--formato", choices=FORMATOS, default="ndjson")
+    parser.add_argument("--temporada", type=int)
+    parser.add_argument("--desde")
+    parser.add_argument("--hasta")
+    parser.add_argument("--salida", help="Archivo de salida (por defecto, la salida estándar)")
+    args = parser.parse_args(argv)
+
+    session = conectar_db()
+    if not session:
+        return 1
+    salida = open(args.salida, "wb") if args.salida else sys.stdout.buffer
+    try:
+        for bloque in exportar(session, args.tipo, args.formato, args.temporada, args.desde, args.hasta):
+            salida.write(bloque)
+        return 0
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if args.salida:
+            salida.close()
+        cerrar_db(session)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
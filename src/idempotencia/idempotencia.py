@@ -0,0 +1,156 @@
+"""
+Escrituras idempotentes: upserts de estadística y estado de jugador, y respuestas guardadas por
+Idempotency-Key.
+
+Cada jugador tiene como mucho una fila de estadística y una de estado por partido (restricciones
+únicas), así que crear es "crear o reemplazar" con INSERT … ON CONFLICT DO UPDATE (ON DUPLICATE KEY
+UPDATE en MySQL) y un reintento deja el mismo resultado. Con otros dialectos se lee la clave y se
+inserta o actualiza dentro de la misma transacción.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from src.database import ClaveIdempotencia, Estadistica, EstadoJugador
+
+CLAVE_CONFLICTO = ("partido_id", "jugador_id")
+CAMPOS_ESTADISTICA = ("puntos", "bloqueos", "saques", "recepciones")
+CAMPOS_ESTADO = ("disponible", "lesion_tipo")
+DURACION_CLAVE = timedelta(hours=24)
+LONGITUD_MAXIMA_CLAVE = 255
+INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert, "mysql": mysql.insert, "mariadb": mysql.insert}
+
+
+def sentencia_upsert(session: Session, modelo, clave: tuple[str, ...], actualizar, donde=None):
+    """
+    INSERT … ON CONFLICT DO UPDATE sobre la restricción única `clave`, o ON DUPLICATE KEY UPDATE en
+    MySQL. `actualizar` recibe los valores propuestos (excluded o inserted) y devuelve el SET; `donde`
+    limita qué filas existentes se reemplazan. Devuelve None si el dialecto no tiene upsert.
+    """
+    dialecto = session.get_bind().dialect.name
+    if dialecto not in INSERTS:
+        return None
+    sentencia = INSERTS[dialecto](modelo)
+    if dialecto in ("mysql", "mariadb"):
+        valores = actualizar(sentencia.inserted)
+        if donde is not None:
+            # MySQL no admite WHERE aquí y asigna de izquierda a derecha con los valores ya nuevos: cada
+            # columna se condiciona por separado y las que usa `donde` tienen que ir las últimas.
+            valores = {campo: case((donde, valor), else_=modelo.__table__.c[campo]) for campo, valor in valores.items()}
+        return sentencia.on_duplicate_key_update(list(valores.items()))
+    return sentencia.on_conflict_do_update(index_elements=list(clave), set_=actualizar(sentencia.excluded),
+                                           where=donde)
+
+
+def insertar_o_actualizar(session: Session, modelo, filas: list[dict], clave: tuple[str, ...], actualizar,
+                          donde=None, render_nulls: bool = False):
+    """
+    Ejecuta el upsert de sentencia_upsert para todas las filas. Si el dialecto no lo tiene, bloquea y
+    lee cada clave y la inserta o la actualiza en la transacción actual; `actualizar` recibe entonces
+    la propia fila. No hace commit.
+
+    Sin render_nulls el ORM omite los None (para aplicar los valores por defecto de las columnas) y
+    emite una sentencia por cada combinación de columnas presentes.
+    """
+    sentencia = sentencia_upsert(session, modelo, clave, actualizar, donde)
+    if sentencia is not None:
+        session.execute(sentencia, filas, execution_options={"render_nulls": render_nulls})
+        return
+    columnas = [modelo.__table__.c[campo] for campo in clave]
+    for fila in filas:
+        filtro = [columna == fila[campo] for columna, campo in zip(columnas, clave)]
+        if session.execute(select(*columnas).where(*filtro).with_for_update()).first() is None:
+            session.execute(insert(modelo).values(**fila))
+        else:
+            condiciones = filtro if donde is None else [*filtro, donde]
+            session.execute(update(modelo).where(*condiciones).values(actualizar(fila)))
+
+
+def returning_ve_estado_anterior(session: Session) -> bool:
+    """
+    En PostgreSQL las subconsultas de RETURNING ven la instantánea previa a la sentencia, así que
+    pueden devolver el valor anterior de la fila; SQLite ya ve el valor nuevo.
+    """
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def upsert(session: Session, modelo, filas: list[dict], campos: tuple[str, ...], render_nulls: bool = False):
+    """
+    Inserta o reemplaza varias filas de un modelo con (partido_id, jugador_id) único en una sola
+    sentencia. Si una misma clave aparece varias veces, gana la última.
+    """
+    por_clave = {tuple(fila[c] for c in CLAVE_CONFLICTO): fila for fila in filas}
+    if not por_clave:
+        return
+    insertar_o_actualizar(session, modelo, list(por_clave.values()), CLAVE_CONFLICTO,
+                          lambda propuestos: {campo: propuestos[campo] for campo in campos}, render_nulls=render_nulls)
+
+
+def upsert_estadisticas(session: Session, filas: list[dict], equipos_por_jugador: dict[int, int]) -> dict[int, int]:
+    """
+    Upsert masivo de estadísticas. Devuelve la variación de puntos anotados por equipo respecto a las
+    filas que se reemplazan, leídas antes con una sola consulta.
+    """
+    por_clave = {(fila["partido_id"], fila["jugador_id"]): fila for fila in filas}
+    if not por_clave:
+        return {}
+    partidos = {partido_id for partido_id, _ in por_clave}
+    jugadores = {jugador_id for _, jugador_id in por_clave}
+    anteriores = {
+        (partido_id, jugador_id): puntos or 0
+        for partido_id, jugador_id, puntos in session.execute(
+            select(Estadistica.partido_id, Estadistica.jugador_id, Estadistica.puntos)
+            .where(Estadistica.partido_id.in_(partidos), Estadistica.jugador_id.in_(jugadores))
+        )
+    }
+    upsert(session, Estadistica, list(por_clave.values()), CAMPOS_ESTADISTICA)
+    puntos_por_equipo = {}
+    for clave, fila in por_clave.items():
+        equipo_id = equipos_por_jugador.get(fila["jugador_id"])
+        puntos_por_equipo[equipo_id] = (puntos_por_equipo.get(equipo_id, 0) + (fila["puntos"] or 0)
+                                        - anteriores.get(clave, 0))
+    return puntos_por_equipo
+
+
+def upsert_estados(session: Session, filas: list[dict]):
+    """
+    Upsert masivo de estados. lesion_tipo es None en unas filas y no en otras, y ninguna columna del
+    estado tiene valor por defecto: los None se escriben como NULL para que todo vaya en una sentencia.
+    """
+    upsert(session, EstadoJugador, filas, CAMPOS_ESTADO, render_nulls=True)
+
+
+def huella_peticion(metodo: str, ruta: str, cuerpo: bytes) -> str:
+    return hashlib.sha256(metodo.encode() + b" " + ruta.encode() + b"\n" + cuerpo).hexdigest()
+
+
+def buscar_respuesta(session: Session, clave: str) -> ClaveIdempotencia | None:
+    guardada = session.get(ClaveIdempotencia, clave)
+    if guardada is None:
+        return None
+    creada = guardada.creada if guardada.creada.tzinfo else guardada.creada.replace(tzinfo=timezone.utc)
+    if creada < datetime.now(timezone.utc) - DURACION_CLAVE:
+        return None
+    return guardada
+
+
+def guardar_respuesta(session: Session, clave: str, huella: str, estado: int, respuesta: str):
+    """
+    Guarda la respuesta de la primera ejecución. Si otra petición con la misma clave se adelantó, se
+    conserva la suya. Las claves caducadas se sustituyen y se purgan de vez en cuando.
+    """
+    ahora = datetime.now(timezone.utc)
+    insertar_o_actualizar(
+        session, ClaveIdempotencia,
+        [{"clave": clave, "huella": huella, "estado": estado, "respuesta": respuesta, "creada": ahora}], ("clave",),
+        lambda propuestos: {campo: propuestos[campo] for campo in ("huella", "estado", "respuesta", "creada")},
+        donde=ClaveIdempotencia.creada < ahora - DURACION_CLAVE,
+    )
+    if hash(clave) % 100 == 0:
+        purgar_claves(session, ahora - DURACION_CLAVE)
+    session.commit()
+
+
+def purgar_claves(session: Session, antes: datetime) -> int:
+    return session.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.creada < antes)).rowcount
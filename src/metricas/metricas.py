@@ -0,0 +1,143 @@
+"""
+Métricas por ruta en el formato de texto de Prometheus.
+
+Al terminar cada petición la aplicación registra su duración y las medidas de base de datos que
+src.registro acumula desde los eventos del engine (sentencias, tiempo en SQL y espera del pool).
+El registro son contadores e histogramas con cubetas fijas en memoria, actualizados bajo un único
+lock por petición, así que se puede dejar activo en producción. Los valores son por proceso: con
+varios workers, Prometheus debe consultar cada uno.
+
+Con SUPERLIGA_SERVER_TIMING=1 las respuestas incluyen además la cabecera Server-Timing.
+"""
+import os
+import threading
+from bisect import bisect_left
+
+BUCKETS_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SENTENCIAS = (1, 2, 3, 5, 10, 20, 50, 100)
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+SERVER_TIMING = os.environ.get("SUPERLIGA_SERVER_TIMING", "0").lower() in ("1", "true", "si")
+SIN_RUTA = "<sin_ruta>"
+
+
+class Histograma:
+    __slots__ = ("limites", "cuentas", "suma", "total")
+
+    def __init__(self, limites: tuple):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        indice = bisect_left(self.limites, valor)
+        if indice < len(self.cuentas):
+            self.cuentas[indice] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumuladas(self):
+        acumulado = 0
+        for limite, cuenta in zip(self.limites, self.cuentas):
+            acumulado += cuenta
+            yield limite, acumulado
+        yield "+Inf", self.total
+
+
+class MetricasRuta:
+    __slots__ = ("por_status", "duracion", "sentencias", "tiempo_sql", "espera_pool")
+
+    def __init__(self):
+        self.por_status = {}
+        self.duracion = Histograma(BUCKETS_DURACION)
+        self.sentencias = Histograma(BUCKETS_SENTENCIAS)
+        self.tiempo_sql = 0.0
+        self.espera_pool = 0.0
+
+
+def _etiquetas(**valores) -> str:
+    partes = []
+    for nombre, valor in valores.items():
+        texto = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{nombre}="{texto}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def _numero(valor) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class RegistroMetricas:
+    """
+    Métricas acumuladas de este proceso, indexadas por (método, patrón de la ruta).
+    """
+
+    def __init__(self):
+        self._rutas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metodo: str, ruta: str | None, status: int, duracion: float, tiempo_sql: float,
+                  sentencias: int, espera_pool: float):
+        clave = (metodo, ruta or SIN_RUTA)
+        with self._lock:
+            metricas = self._rutas.get(clave)
+            if metricas is None:
+                metricas = self._rutas[clave] = MetricasRuta()
+            metricas.por_status[status] = metricas.por_status.get(status, 0) + 1
+            metricas.duracion.observar(duracion)
+            metricas.sentencias.observar(sentencias)
+            metricas.tiempo_sql += tiempo_sql
+            metricas.espera_pool += espera_pool
+
+    def exportar(self, pool: dict = None) -> str:
+        """
+        Texto de exposición de Prometheus con las métricas por ruta y, si se pasa, el estado del pool.
+        """
+        with self._lock:
+            rutas = sorted(self._rutas.items())
+            copia = [(clave, dict(m.por_status), list(m.duracion.acumuladas()), m.duracion.suma,
+                      list(m.sentencias.acumuladas()), m.sentencias.suma, m.tiempo_sql, m.espera_pool)
+                     for clave, m in rutas]
+        lineas = []
+
+        def cabecera(nombre: str, tipo: str, ayuda: str):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+        def histograma(nombre: str, indice_cubetas: int, indice_suma: int):
+            for (metodo, ruta), *datos in copia:
+                for limite, cuenta in datos[indice_cubetas]:
+                    lineas.append(f"{nombre}_bucket{_etiquetas(metodo=metodo, ruta=ruta, le=limite)} {cuenta}")
+                lineas.append(f"{nombre}_sum{_etiquetas(metodo=metodo, ruta=ruta)} {_numero(datos[indice_suma])}")
+                lineas.append(f"{nombre}_count{_etiquetas(metodo=metodo, ruta=ruta)} {datos[indice_cubetas][-1][1]}")
+
+        cabecera("superliga_http_peticiones_total", "counter", "Peticiones HTTP atendidas.")
+        for (metodo, ruta), por_status, *_ in copia:
+            for status, cuenta in sorted(por_status.items()):
+                lineas.append(f"superliga_http_peticiones_total{_etiquetas(metodo=metodo, ruta=ruta, status=status)} "
+                              f"{cuenta}")
+        cabecera("superliga_http_duracion_segundos", "histogram", "Duración de las peticiones HTTP.")
+        histograma("superliga_http_duracion_segundos", 1, 2)
+        cabecera("superliga_sql_sentencias_por_peticion", "histogram", "Sentencias SQL ejecutadas por petición.")
+        histograma("superliga_sql_sentencias_por_peticion", 3, 4)
+        cabecera("superliga_sql_segundos_total", "counter", "Tiempo total en sentencias SQL.")
+        for (metodo, ruta), *datos in copia:
+            lineas.append(f"superliga_sql_segundos_total{_etiquetas(metodo=metodo, ruta=ruta)} {_numero(datos[5])}")
+        cabecera("superliga_pool_espera_segundos_total", "counter", "Tiempo total esperando una conexión del pool.")
+        for (metodo, ruta), *datos in copia:
+            lineas.append(f"superliga_pool_espera_segundos_total{_etiquetas(metodo=metodo, ruta=ruta)} "
+                          f"{_numero(datos[6])}")
+        for campo, ayuda in (("en_uso", "Conexiones prestadas."), ("inactivas", "Conexiones libres en el pool."),
+                             ("overflow", "Conexiones por encima de pool_size.")):
+            if pool and campo in pool:
+                cabecera(f"superliga_pool_{campo}", "gauge", ayuda)
+                lineas.append(f"superliga_pool_{campo} {pool[campo]}")
+        return "\n".join(lineas) + "\n"
+
+
+def server_timing(duracion: float, tiempo_sql: float, sentencias: int, espera_pool: float) -> str:
+    return (f'app;dur={duracion * 1000:.2f}, db;dur={tiempo_sql * 1000:.2f};desc="{sentencias} sentencias", '
+            f"pool;dur={espera_pool * 1000:.2f}")
+
+
+metricas = RegistroMetricas()
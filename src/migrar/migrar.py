@@ -0,0 +1,62 @@
+"""
+Comando de migración: crea el esquema de la base de datos.
+
+La aplicación no crea tablas al arrancar, así que este comando se ejecuta una vez por despliegue,
+antes de levantar los workers:
+
+    python -m src.migrar
+    python -m src.migrar --database-url sqlite:///superliga.db
+    python -m src.migrar --sql > esquema.sql
+
+Crea las tablas e índices que falten. Los cambios sobre tablas existentes siguen en sql/migraciones.
+"""
+import argparse
+import os
+import sys
+from sqlalchemy import create_mock_engine, inspect
+from src.database import Base, crear_esquema, obtener_database_url, obtener_engine
+
+
+def ddl_esquema(url: str) -> list[str]:
+    """
+    Sentencias CREATE del esquema completo en el dialecto de la URL, sin conectarse a la base de datos.
+    """
+    sentencias = []
+
+    def registrar(sentencia, *_args, **_kwargs):
+        sentencias.append(str(sentencia.compile(dialect=motor.dialect)).strip() + ";")
+
+    motor = create_mock_engine(url, registrar)
+    Base.metadata.create_all(motor, checkfirst=False)
+    return sentencias
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crea el esquema de la base de datos de la Superliga")
+    parser.add_argument("--database-url", help="Por defecto, la de SUPERLIGA_DATABASE_URL o Clever Cloud")
+    parser.add_argument("--sql", action="store_true", help="Muestra el DDL sin ejecutarlo")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["SUPERLIGA_DATABASE_URL"] = args.database_url
+    if args.sql:
+        print("\n\n".join(ddl_esquema(obtener_database_url())))
+        return 0
+
+    try:
+        motor = obtener_engine()
+        existentes = set(inspect(motor).get_table_names())
+        crear_esquema(motor)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    creadas = sorted(set(Base.metadata.tables) - existentes)
+    if creadas:
+        print(f"Tablas creadas: {', '.join(creadas)}.")
+    else:
+        print("El esquema ya estaba creado.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Lógica HTTP común a la aplicación síncrona (src/app/app.py) y a la asíncrona (src/app_async/app_async.py).
+
+Nada de este módulo depende de Flask ni de Quart: las funciones reciben la petición (o sus args y
+cabeceras) y devuelven valores o cabeceras, y cada aplicación construye la respuesta con su framework.
+Así la paginación, los validadores de los GET condicionales y las repeticiones por Idempotency-Key se
+comportan igual en los dos modos.
+"""
+from datetime import datetime, timezone
+from src.negocio import codificar_cursor, decodificar_cursor
+from src.idempotencia import LONGITUD_MAXIMA_CLAVE
+from src.serializacion import dumps_bytes
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+
+def parametros_paginacion(args) -> tuple[int, str | None]:
+    """
+    Lee limit y after de la query string. Lanza ValueError si no son válidos.
+    """
+    try:
+        limit = int(args.get("limit", LIMITE_POR_DEFECTO))
+    except ValueError:
+        raise ValueError("limit debe ser un número entero")
+    if limit < 1 or limit > LIMITE_MAXIMO:
+        raise ValueError(f"limit debe estar entre 1 y {LIMITE_MAXIMO}")
+    after = args.get("after")
+    if after is not None:
+        decodificar_cursor(after)
+    return limit, after
+
+
+def parametro_entero(args, nombre: str, por_defecto: int = None) -> int | None:
+    """
+    Lee un parámetro entero opcional de la query string. Lanza ValueError si no es válido.
+    """
+    valor = args.get(nombre)
+    if valor is None or valor == "":
+        return por_defecto
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError(f"{nombre} debe ser un número entero")
+
+
+def ultimo_evento_id(peticion) -> int | None:
+    """
+    Id del último evento recibido por un cliente SSE que reconecta (cabecera Last-Event-ID o
+    ?last_event_id=). Lanza ValueError si no es un entero.
+    """
+    valor = peticion.headers.get("Last-Event-ID") or peticion.args.get("last_event_id")
+    if not valor:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError("Last-Event-ID debe ser un número entero")
+
+
+def quiere_streaming(args) -> bool:
+    return args.get("stream", "").lower() in ("1", "true", "si")
+
+
+def pagina_con_cursor(filas, limit: int, clave):
+    """
+    Recorta las limit + 1 filas pedidas a limit y calcula el cursor de la página siguiente.
+    """
+    if len(filas) <= limit:
+        return filas, None
+    filas = filas[:limit]
+    return filas, codificar_cursor(*clave(filas[-1]))
+
+
+def cabeceras_paginacion(url_base: str, elementos: list, siguiente: str | None) -> dict:
+    """
+    X-Next-Cursor y Link rel="next" de una página que no es la última; vacío en la última.
+    """
+    if not siguiente:
+        return {}
+    return {"X-Next-Cursor": siguiente,
+            "Link": f'<{url_base}?limit={len(elementos)}&after={siguiente}>; rel="next"'}
+
+
+def validadores(tipo: str, entidad_id: int, version: int, actualizado: datetime | None,
+                pendiente: int = 0) -> tuple[str, datetime | None]:
+    """
+    ETag y Last-Modified del ámbito (tipo, id). pendiente es la marca de la escritura diferida: mientras
+    haya filas en la cola el ETag cambia con cada una.
+    """
+    etag = f"{tipo}-{entidad_id}-{version}" + (f"-p{pendiente}" if pendiente else "")
+    if actualizado is not None and actualizado.tzinfo is None:
+        actualizado = actualizado.replace(tzinfo=timezone.utc)
+    return etag, actualizado
+
+
+def no_modificado(peticion, etag: str, actualizado: datetime | None, pendiente: int = 0) -> bool:
+    """
+    True si el cliente ya tiene la versión actual (If-None-Match o, si no lo envía, If-Modified-Since).
+    Con escrituras pendientes If-Modified-Since no basta, porque la fecha aún no las refleja.
+    """
+    if peticion.if_none_match:
+        return peticion.if_none_match.contains_weak(etag)
+    if peticion.if_modified_since and actualizado is not None and not pendiente:
+        return actualizado.replace(microsecond=0) <= peticion.if_modified_since
+    return False
+
+
+def anadir_validadores(respuesta, etag: str, actualizado: datetime | None):
+    respuesta.set_etag(etag, weak=True)
+    if actualizado is not None:
+        respuesta.last_modified = actualizado
+    respuesta.headers["Cache-Control"] = "no-cache"
+
+
+def clave_idempotencia(peticion) -> str | None:
+    """
+    Valor de la cabecera Idempotency-Key, o None si no viene. Lanza ValueError si está vacía o es
+    demasiado larga.
+    """
+    clave = peticion.headers.get("Idempotency-Key")
+    if clave is not None and (not clave or len(clave) > LONGITUD_MAXIMA_CLAVE):
+        raise ValueError(f"Idempotency-Key debe tener entre 1 y {LONGITUD_MAXIMA_CLAVE} caracteres")
+    return clave
+
+
+def respuesta_repetida(guardada, huella: str) -> tuple[str | bytes, int, dict]:
+    """
+    Cuerpo, estado y cabeceras con los que contestar a un reintento cuya clave ya tiene respuesta
+    guardada: la misma respuesta, o un 422 si la clave se usó con otra petición.
+    """
+    if guardada.huella != huella:
+        return dumps_bytes({"error": "Idempotency-Key ya usada con otra petición"}), 422, {}
+    return guardada.respuesta, guardada.estado, {"Idempotent-Replayed": "true"}
+
+
+def debe_guardarse(estado: int) -> bool:
+    """
+    Los errores del servidor no se guardan: el cliente puede reintentar con la misma clave.
+    """
+    return estado < 500
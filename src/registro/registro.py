@@ -0,0 +1,172 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from sqlalchemy import event
+
+# Contexto de la petición en curso; lo rellena la aplicación y lo leen el filtro y los eventos del engine.
+request_id_actual = contextvars.ContextVar("request_id", default=None)
+ruta_actual = contextvars.ContextVar("ruta", default=None)
+# Medidas de base de datos de la petición: [segundos en SQL, sentencias, segundos esperando una conexión].
+medidas_db_actual = contextvars.ContextVar("medidas_db", default=None)
+
+# Ruido a nivel de conexión, apagado por defecto.
+NIVELES_POR_DEFECTO = {
+    "sqlalchemy.engine": logging.WARNING,
+    "sqlalchemy.pool": logging.WARNING,
+    "superliga.db": logging.WARNING,
+    "werkzeug": logging.WARNING,
+}
+
+_listener = None
+
+
+class FiltroContexto(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_actual.get()
+        record.ruta = ruta_actual.get()
+        return True
+
+
+class FormatoJSON(logging.Formatter):
+    """
+    Una línea JSON por registro. Los campos pasados en extra= se incluyen tal cual.
+    """
+
+    CAMPOS_BASE = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        linea = {
+            "ts": round(record.created, 3),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in self.CAMPOS_BASE and valor is not None:
+                linea[clave] = valor
+        if record.exc_info:
+            linea["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+
+def _leer_niveles(valor: str) -> dict:
+    """
+    Interpreta SUPERLIGA_LOG_NIVELES, p. ej. "superliga.negocio=DEBUG,sqlalchemy.engine=INFO".
+    """
+    niveles = {}
+    for par in filter(None, (parte.strip() for parte in valor.split(","))):
+        nombre, _, nivel = par.partition("=")
+        niveles[nombre.strip()] = logging.getLevelName(nivel.strip().upper())
+    return niveles
+
+
+def configurar_logging():
+    """
+    Envía todos los registros a una cola en memoria; un hilo aparte los formatea y escribe en stderr,
+    de modo que el hilo de la petición nunca se bloquea en E/S. Es idempotente.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    salida = logging.StreamHandler(sys.stderr)
+    salida.setFormatter(FormatoJSON())
+    cola = queue.SimpleQueue()
+    manejador = logging.handlers.QueueHandler(cola)
+    manejador.addFilter(FiltroContexto())
+
+    raiz = logging.getLogger()
+    raiz.handlers = [manejador]
+    raiz.setLevel(os.environ.get("SUPERLIGA_LOG_NIVEL", "INFO").upper())
+    niveles = dict(NIVELES_POR_DEFECTO)
+    niveles.update(_leer_niveles(os.environ.get("SUPERLIGA_LOG_NIVELES", "")))
+    for nombre, nivel in niveles.items():
+        logging.getLogger(nombre).setLevel(nivel)
+
+    _listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener_logging)
+
+
+def detener_logging():
+    """
+    Vacía la cola y detiene el hilo escritor.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def iniciar_contexto(request_id: str, ruta: str):
+    request_id_actual.set(request_id)
+    ruta_actual.set(ruta)
+    medidas_db_actual.set([0.0, 0, 0.0])
+
+
+def tiempo_db_ms() -> float:
+    medidas = medidas_db_actual.get()
+    return round(medidas[0] * 1000, 2) if medidas else 0.0
+
+
+def medidas_db() -> tuple[float, int, float]:
+    """
+    (segundos en SQL, sentencias, segundos de espera del pool) acumulados en la petición en curso.
+    """
+    medidas = medidas_db_actual.get()
+    return tuple(medidas) if medidas else (0.0, 0, 0.0)
+
+
+def _medir_espera_pool(pool):
+    """
+    SQLAlchemy no tiene un evento previo a pedir una conexión al pool, así que se envuelve connect()
+    de la instancia para medir cuánto tarda en entregarla (espera por pool lleno y pre-ping incluidos).
+    """
+    conectar = pool.connect
+
+    def connect():
+        inicio = time.perf_counter()
+        try:
+            return conectar()
+        finally:
+            medidas = medidas_db_actual.get()
+            if medidas is not None:
+                medidas[2] += time.perf_counter() - inicio
+
+    pool.connect = connect
+
+
+def medir_tiempo_db(engine):
+    """
+    Acumula en el contexto de la petición en curso el tiempo y el número de sentencias SQL y la espera
+    para obtener una conexión del pool.
+    """
+    _medir_espera_pool(engine.pool)
+
+    @event.listens_for(engine, "engine_disposed")
+    def pool_recreado(conn):
+        _medir_espera_pool(engine.pool)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_sentencia", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def despues(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info["inicio_sentencia"].pop()
+        medidas = medidas_db_actual.get()
+        if medidas is not None:
+            medidas[0] += time.perf_counter() - inicio
+            medidas[1] += 1
+
+    @event.listens_for(engine, "handle_error")
+    def error(contexto):
+        inicios = contexto.connection.info.get("inicio_sentencia") if contexto.connection is not None else None
+        if inicios:
+            inicios.pop()
@@ -0,0 +1,8 @@
+"""
+src.negocio es la capa de negocio de src/relaciones/relaciones.py: el mismo módulo con otro nombre,
+no una copia, para que ambos nombres compartan estado.
+"""
+import sys
+from src import relaciones
+
+sys.modules[__name__] = relaciones
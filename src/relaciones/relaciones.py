@@ -1,4 +1,10 @@
-from sqlalchemy.orm import Session
+import base64
+import json
+import logging
+from sqlalchemy import insert, update, select, func, or_, and_, inspect, DateTime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from src.database import (
     conectar_db,
     cerrar_db,
@@ -7,158 +13,772 @@ from src.database import (
     Partido,
     Estadistica,
     EstadoJugador,
+    EventoPartido,
 )
-from datetime import datetime
+from src.cache import cache_entidades
+from src.escritura_diferida import escritura_diferida
+from src.idempotencia import (
+    CAMPOS_ESTADISTICA,
+    CAMPOS_ESTADO,
+    CLAVE_CONFLICTO,
+    insertar_o_actualizar,
+    returning_ve_estado_anterior,
+    sentencia_upsert,
+    upsert_estadisticas,
+    upsert_estados,
+)
+from src.en_vivo import agregador_en_vivo, CAMPOS_EVENTO, EVENTO_FINAL, MAX_SETS
+from src.clasificacion import (
+    registrar_equipo,
+    registrar_resultado,
+    registrar_puntos_anotados,
+    puntos_anotados_jugador,
+    resultado_valido,
+)
+from src.versiones import incrementar_versiones, LIGA
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger("superliga.negocio")
 
 
 def crear_equipo(session: Session, nombre: str, ciudad: str, entrenador: str) -> Equipo:
     equipo = Equipo(nombre=nombre, ciudad=ciudad, entrenador=entrenador)
     session.add(equipo)
+    session.flush()
+    registrar_equipo(session, equipo.id)
+    incrementar_versiones(session, ("equipo", equipo.id), LIGA)
     session.commit()
+    cache_entidades.invalidar("equipo", equipo.id)
     return equipo
 
 
+def _columnas(entidad) -> dict:
+    return {atributo.key: getattr(entidad, atributo.key) for atributo in inspect(entidad).mapper.column_attrs}
+
+
+def _obtener_con_cache(session: Session, modelo, tipo: str, entidad_id: int):
+    """
+    Busca la entidad en el mapa de identidad de la sesión, luego en la caché y por último en la base de
+    datos. Las filas de la caché se adjuntan a la sesión con merge(load=False), sin emitir SQL.
+    """
+    entidad = session.identity_map.get(identity_key(modelo, entidad_id))
+    if entidad is not None:
+        return entidad
+    valores = cache_entidades.obtener(tipo, entidad_id)
+    if valores is not None:
+        entidad = modelo(**valores)
+        make_transient_to_detached(entidad)
+        return session.merge(entidad, load=False)
+    entidad = session.query(modelo).filter(modelo.id == entidad_id).first()
+    if entidad is not None:
+        cache_entidades.guardar(tipo, entidad_id, _columnas(entidad))
+    return entidad
+
+
 def obtener_equipo_por_id(session: Session, equipo_id: int) -> Equipo | None:
-    return session.query(Equipo).filter(Equipo.id == equipo_id).first()
+    return _obtener_con_cache(session, Equipo, "equipo", equipo_id)
 
 
 def crear_jugador(session: Session, nombre: str, apellido: str, posicion: str, numero: int,
                   equipo_id: int) -> Jugador | None:
-    equipo = obtener_equipo_por_id(session, equipo_id)
-    if not equipo:
-        print(f"No se puede crear el jugador. El equipo con ID {equipo_id} no existe.")
+    """
+    Inserta el jugador con INSERT … RETURNING. No lee antes el equipo: si no existe, la FK rechaza
+    la sentencia y se devuelve None.
+    """
+    sentencia = insert(Jugador).values(nombre=nombre, apellido=apellido, posicion=posicion, numero=numero,
+                                       equipo_id=equipo_id).returning(Jugador)
+    try:
+        jugador = session.execute(sentencia).scalar_one()
+    except IntegrityError:
+        session.rollback()
+        logger.info(f"No se puede crear el jugador. El equipo con ID {equipo_id} no existe.")
         return None
-    jugador = Jugador(nombre=nombre, apellido=apellido, posicion=posicion, numero=numero, equipo=equipo)
-    session.add(jugador)
+    incrementar_versiones(session, ("jugador", jugador.id), ("equipo", equipo_id))
     session.commit()
+    cache_entidades.invalidar("jugador", jugador.id)
     return jugador
 
 
 def obtener_jugador_por_id(session: Session, jugador_id: int) -> Jugador | None:
-    return session.query(Jugador).filter(Jugador.id == jugador_id).first()
+    return _obtener_con_cache(session, Jugador, "jugador", jugador_id)
 
 
 def actualizar_jugador(session: Session, jugador_id: int, nombre: str = None, apellido: str = None,
                        posicion: str = None, numero: int = None, equipo_id: int = None) -> Jugador | None:
-    jugador = obtener_jugador_por_id(session, jugador_id)
-    if not jugador:
-        print(f"No se puede actualizar el jugador. El jugador con ID {jugador_id} no existe.")
+    """
+    Actualiza los campos indicados con un único UPDATE … RETURNING. Si el jugador no existe no se
+    devuelve ninguna fila; si el equipo nuevo no existe, la FK rechaza la sentencia.
+    """
+    valores = {campo: valor for campo, valor in (("nombre", nombre), ("apellido", apellido), ("posicion", posicion),
+                                                 ("numero", numero), ("equipo_id", equipo_id)) if valor}
+    if not valores:
+        return obtener_jugador_por_id(session, jugador_id)
+
+    anterior = select(Jugador.equipo_id).where(Jugador.id == jugador_id)
+    columnas = [Jugador]
+    equipo_anterior_id = None
+    if returning_ve_estado_anterior(session):
+        columnas.append(anterior.scalar_subquery())
+    elif "equipo_id" in valores:
+        equipo_anterior_id = session.scalar(anterior)
+    sentencia = update(Jugador).where(Jugador.id == jugador_id).values(**valores).returning(*columnas)
+    try:
+        resultado = session.execute(sentencia, execution_options={"populate_existing": True,
+                                                                  "synchronize_session": False}).first()
+    except IntegrityError:
+        session.rollback()
+        logger.info(f"No se puede actualizar el jugador. El equipo con ID {equipo_id} no existe.")
         return None
-
-    if nombre:
-        jugador.nombre = nombre
-    if apellido:
-        jugador.apellido = apellido
-    if posicion:
-        jugador.posicion = posicion
-    if numero:
-        jugador.numero = numero
-    if equipo_id:
-        equipo = obtener_equipo_por_id(session, equipo_id)
-        if not equipo:
-            print(f"No se puede actualizar el jugador. El equipo con ID {equipo_id} no existe.")
-            return None
-        jugador.equipo = equipo
+    if resultado is None:
+        session.rollback()
+        logger.info(f"No se puede actualizar el jugador. El jugador con ID {jugador_id} no existe.")
+        return None
+    jugador = resultado[0]
+    if len(resultado) > 1:
+        equipo_anterior_id = resultado[1]
+    if "equipo_id" in valores and equipo_anterior_id != jugador.equipo_id:
+        puntos = puntos_anotados_jugador(session, jugador_id)
+        registrar_puntos_anotados(session, {equipo_anterior_id: -puntos, jugador.equipo_id: puntos})
+    incrementar_versiones(session, ("jugador", jugador_id), ("equipo", equipo_anterior_id),
+                          ("equipo", jugador.equipo_id), LIGA)
     session.commit()
+    cache_entidades.invalidar("jugador", jugador_id)
     return jugador
 
 
 def eliminar_jugador(session: Session, jugador_id: int) -> bool:
-    jugador = obtener_jugador_por_id(session, jugador_id)
+    """
+    Elimina el jugador y descuenta sus puntos de la clasificación de su equipo: sus estadísticas y sus
+    eventos en directo se quedan sin jugador y el recálculo completo ya no los cuenta.
+    """
+    jugador = session.get(Jugador, jugador_id, with_for_update=True, populate_existing=True)
     if not jugador:
-        print(f"No se puede eliminar el jugador. El jugador con ID {jugador_id} no existe.")
+        logger.info(f"No se puede eliminar el jugador. El jugador con ID {jugador_id} no existe.")
         return False
+    registrar_puntos_anotados(session, {jugador.equipo_id: -puntos_anotados_jugador(session, jugador_id)})
+    incrementar_versiones(session, ("jugador", jugador_id), ("equipo", jugador.equipo_id), LIGA)
+    # evento_partido no tiene relación en el ORM que anule la clave ajena al borrar.
+    session.execute(update(EventoPartido).where(EventoPartido.jugador_id == jugador_id).values(jugador_id=None))
     session.delete(jugador)
     session.commit()
+    cache_entidades.invalidar("jugador", jugador_id)
     return True
 
 
+FORMATOS_HORA = ("%I:%M %p", "%I:%M%p", "%H:%M", "%H:%M:%S")
+
+
+def combinar_fecha_hora(fecha: str, hora: str) -> datetime:
+    """
+    Convierte la fecha ("2024-05-20") y la hora ("8:00 PM" o "20:00") de la API en un timestamp.
+    Lanza ValueError si alguna no es válida.
+    """
+    dia = datetime.strptime(fecha.strip(), "%Y-%m-%d")
+    for formato in FORMATOS_HORA:
+        try:
+            momento = datetime.strptime(hora.strip().upper(), formato)
+        except ValueError:
+            continue
+        return dia.replace(hour=momento.hour, minute=momento.minute, second=momento.second)
+    raise ValueError(f"Hora inválida: {hora}")
+
+
+def parsear_rango_fechas(desde: str = None, hasta: str = None) -> tuple[datetime | None, datetime | None]:
+    """
+    Convierte los parámetros desde/hasta (fecha o fecha y hora ISO) en un intervalo [desde, hasta).
+    Una fecha sin hora en hasta incluye el día completo. Lanza ValueError si no son válidos.
+    """
+    inicio = fin = None
+    try:
+        if desde:
+            inicio = datetime.fromisoformat(desde)
+        if hasta:
+            fin = datetime.fromisoformat(hasta)
+            if len(hasta) == 10:
+                fin += timedelta(days=1)
+    except ValueError:
+        raise ValueError("desde y hasta deben ser fechas ISO, p. ej. 2024-05-20")
+    return inicio, fin
+
+
 def crear_partido(session: Session, fecha: str, hora: str, equipo_local_id: int,
                   equipo_visitante_id: int) -> Partido | None:
-    equipo_local = obtener_equipo_por_id(session, equipo_local_id)
-    equipo_visitante = obtener_equipo_por_id(session, equipo_visitante_id)
-    if not equipo_local:
-        print(f"No se puede crear el partido. El equipo local con ID {equipo_local_id} no existe.")
+    try:
+        fecha_hora = combinar_fecha_hora(fecha, hora)
+    except ValueError:
+        logger.info(f"No se puede crear el partido. La fecha {fecha} {hora} no es válida.")
         return None
-    if not equipo_visitante:
-        print(f"No se puede crear el partido. El equipo visitante con ID {equipo_visitante_id} no existe.")
+    sentencia = insert(Partido).values(fecha=fecha_hora, equipo_local_id=equipo_local_id,
+                                       equipo_visitante_id=equipo_visitante_id).returning(Partido)
+    try:
+        partido = session.execute(sentencia).scalar_one()
+    except IntegrityError:
+        session.rollback()
+        logger.info(f"No se puede crear el partido. El equipo local con ID {equipo_local_id} o el visitante con ID "
+                    f"{equipo_visitante_id} no existe.")
         return None
-
-    partido = Partido(fecha=fecha, hora=hora, equipo_local=equipo_local, equipo_visitante=equipo_visitante)
-    session.add(partido)
+    incrementar_versiones(session, ("partido", partido.id), ("equipo", equipo_local_id),
+                          ("equipo", equipo_visitante_id))
     session.commit()
+    cache_entidades.invalidar("partido", partido.id)
     return partido
 
 
 def obtener_partido_por_id(session: Session, partido_id: int) -> Partido | None:
-    return session.query(Partido).filter(Partido.id == partido_id).first()
+    return _obtener_con_cache(session, Partido, "partido", partido_id)
+
+
+def _partido_para_escritura(session: Session, partido_id: int) -> Partido | None:
+    """
+    Lee el partido de la base de datos con SELECT … FOR UPDATE, nunca de la caché: otro proceso puede
+    haber cambiado su resultado y las escrituras dependen del estado actual. La caché es solo para lecturas.
+    """
+    return session.get(Partido, partido_id, with_for_update=True, populate_existing=True)
+
+
+def registrar_resultado_partido(session: Session, partido_id: int, sets_local: int,
+                                sets_visitante: int) -> Partido | None:
+    partido = _partido_para_escritura(session, partido_id)
+    if not partido:
+        logger.info(f"No se puede registrar el resultado. El partido con ID {partido_id} no existe.")
+        return None
+    if not resultado_valido(sets_local, sets_visitante):
+        logger.info(f"No se puede registrar el resultado. {sets_local}-{sets_visitante} no es un marcador válido.")
+        return None
+    registrar_resultado(session, partido, sets_local, sets_visitante)
+    partido.sets_local = sets_local
+    partido.sets_visitante = sets_visitante
+    incrementar_versiones(session, ("partido", partido_id), ("equipo", partido.equipo_local_id),
+                          ("equipo", partido.equipo_visitante_id), LIGA)
+    session.commit()
+    cache_entidades.invalidar("partido", partido_id)
+    return partido
+
+
+def _validar_para_cola(session: Session, jugador_id: int, partido_id: int, descripcion: str) -> bool:
+    """
+    En escritura diferida la fila no llega a la base de datos antes de responder, así que la FK no puede
+    rechazarla: se comprueban el jugador y el partido con dos lecturas por clave primaria, sin caché.
+    """
+    if not session.get(Jugador, jugador_id):
+        logger.info(f"No se puede crear {descripcion}. El jugador con ID {jugador_id} no existe.")
+        return False
+    if not session.get(Partido, partido_id):
+        logger.info(f"No se puede crear {descripcion}. El partido con ID {partido_id} no existe.")
+        return False
+    return True
+
+
+def _upsert_devolviendo(session: Session, modelo, fila: dict, campos: tuple[str, ...], *columnas):
+    """
+    Crea o reemplaza la fila de (partido_id, jugador_id) y devuelve `columnas` de la fila escrita: con
+    RETURNING si el dialecto lo admite y, si no (MySQL), releyéndola en la misma transacción.
+    """
+    def actualizar(propuestos):
+        return {campo: propuestos[campo] for campo in campos}
+
+    opciones = {"populate_existing": True}
+    sentencia = sentencia_upsert(session, modelo, CLAVE_CONFLICTO, actualizar)
+    if sentencia is not None and session.get_bind().dialect.insert_returning:
+        return session.execute(sentencia.values(**fila).returning(*columnas), execution_options=opciones).one()
+    insertar_o_actualizar(session, modelo, [fila], CLAVE_CONFLICTO, actualizar)
+    return session.execute(select(*columnas).where(modelo.partido_id == fila["partido_id"],
+                                                   modelo.jugador_id == fila["jugador_id"]),
+                           execution_options=opciones).one()
 
 
 def crear_estadistica(session: Session, jugador_id: int, partido_id: int, puntos: int = 0, bloqueos: int = 0,
                       saques: int = 0, recepciones: int = 0) -> Estadistica | None:
-    jugador = obtener_jugador_por_id(session, jugador_id)
-    partido = obtener_partido_por_id(session, partido_id)
-    if not jugador:
-        print(f"No se puede crear la estadística. El jugador con ID {jugador_id} no existe.")
-        return None
-    if not partido:
-        print(f"No se puede crear la estadística. El partido con ID {partido_id} no existe.")
+    """
+    Crea o reemplaza la estadística del jugador en el partido con un único INSERT … ON CONFLICT DO UPDATE.
+    No lee antes el jugador ni el partido: si no existen, la FK rechaza la sentencia y se devuelve None.
+    """
+    fila = {"jugador_id": jugador_id, "partido_id": partido_id, "puntos": puntos, "bloqueos": bloqueos,
+            "saques": saques, "recepciones": recepciones}
+    if escritura_diferida.activa:
+        if not _validar_para_cola(session, jugador_id, partido_id, "la estadística"):
+            return None
+        escritura_diferida.encolar("estadistica", fila)
+        return Estadistica(**fila)
+
+    equipo = select(Jugador.equipo_id).where(Jugador.id == jugador_id).scalar_subquery()
+    anterior = select(Estadistica.puntos).where(Estadistica.partido_id == partido_id,
+                                                Estadistica.jugador_id == jugador_id)
+    columnas = [Estadistica, equipo]
+    puntos_anteriores = None
+    if returning_ve_estado_anterior(session):
+        columnas.append(anterior.scalar_subquery())
+    else:
+        puntos_anteriores = session.scalar(anterior)
+    try:
+        resultado = _upsert_devolviendo(session, Estadistica, fila, CAMPOS_ESTADISTICA, *columnas)
+    except IntegrityError:
+        session.rollback()
+        logger.info(f"No se puede crear la estadística. El jugador con ID {jugador_id} o el partido con ID "
+                    f"{partido_id} no existe.")
         return None
-    estadistica = Estadistica(jugador=jugador, partido=partido, puntos=puntos, bloqueos=bloqueos, saques=saques,
-                              recepciones=recepciones)
-    session.add(estadistica)
+    estadistica, equipo_id = resultado[0], resultado[1]
+    if len(resultado) > 2:
+        puntos_anteriores = resultado[2]
+    registrar_puntos_anotados(session, {equipo_id: (puntos or 0) - (puntos_anteriores or 0)})
+    incrementar_versiones(session, ("partido", partido_id), ("jugador", jugador_id), ("equipo", equipo_id), LIGA)
     session.commit()
     return estadistica
 
 
 def crear_estado_jugador(session: Session, jugador_id: int, partido_id: int, disponible: bool,
                          lesion_tipo: str = None) -> EstadoJugador | None:
-    jugador = obtener_jugador_por_id(session, jugador_id)
-    partido = obtener_partido_por_id(session, partido_id)
-    if not jugador:
-        print(f"No se puede crear el estado del jugador. El jugador con ID {jugador_id} no existe.")
-        return None
-    if not partido:
-        print(f"No se puede crear el estado del jugador. El partido con ID {partido_id} no existe.")
+    """
+    Crea o reemplaza el estado del jugador para el partido con un único INSERT … ON CONFLICT DO UPDATE.
+    """
+    fila = {"jugador_id": jugador_id, "partido_id": partido_id, "disponible": disponible,
+            "lesion_tipo": lesion_tipo}
+    if escritura_diferida.activa:
+        if not _validar_para_cola(session, jugador_id, partido_id, "el estado del jugador"):
+            return None
+        escritura_diferida.encolar("estado_jugador", fila)
+        return EstadoJugador(**fila)
+
+    try:
+        estado_jugador = _upsert_devolviendo(session, EstadoJugador, fila, CAMPOS_ESTADO, EstadoJugador)[0]
+    except IntegrityError:
+        session.rollback()
+        logger.info(f"No se puede crear el estado del jugador. El jugador con ID {jugador_id} o el partido con ID "
+                    f"{partido_id} no existe.")
         return None
-    estado_jugador = EstadoJugador(jugador=jugador, partido=partido, disponible=disponible, lesion_tipo=lesion_tipo)
-    session.add(estado_jugador)
+    incrementar_versiones(session, ("partido", partido_id))
     session.commit()
     return estado_jugador
 
 
-def obtener_jugadores_de_equipo(session: Session, equipo_id: int) -> list[Jugador]:
-    equipo = obtener_equipo_por_id(session, equipo_id)
-    if not equipo:
-        print(f"No se pueden obtener los jugadores. El equipo con ID {equipo_id} no existe.")
-        return []
-    return equipo.jugadores
+def obtener_estadisticas_pendientes(partido_id: int) -> list[Estadistica]:
+    """
+    Estadísticas del partido aceptadas en modo de escritura diferida que aún no se escribieron en la
+    base de datos, como objetos sin id y sin sesión, para que las lecturas vean las propias escrituras.
+    """
+    return [Estadistica(**fila) for fila in escritura_diferida.pendientes("estadistica", partido_id)]
+
+
+def obtener_estados_pendientes(partido_id: int) -> list[EstadoJugador]:
+    return [EstadoJugador(**fila) for fila in escritura_diferida.pendientes("estado_jugador", partido_id)]
+
+
+def superponer_pendientes(filas, pendientes, excluir=(), anadir: bool = True):
+    """
+    Superpone a las filas guardadas de un partido las que siguen en la cola de escritura diferida. Las
+    escrituras son upserts por (partido, jugador): la fila pendiente sustituye a la guardada del mismo
+    jugador y toma su id, y si un jugador tiene varias pendientes gana la última. Con anadir, las de
+    jugadores sin fila guardada se añaden al final, salvo las de excluir.
+    """
+    por_jugador = {pendiente.jugador_id: pendiente for pendiente in pendientes}
+    for fila in filas:
+        pendiente = por_jugador.pop(fila.jugador_id, None)
+        if pendiente is None:
+            yield fila
+        else:
+            pendiente.id = fila.id
+            yield pendiente
+    if anadir:
+        yield from (pendiente for jugador_id, pendiente in por_jugador.items() if jugador_id not in excluir)
+
+
+def _jugadores_en_paginas_anteriores(session: Session, modelo, partido_id: int, pendientes: list,
+                                     after: str = None) -> set[int]:
+    """
+    Jugadores con filas pendientes que ya tienen fila guardada, que puede estar en una página anterior a
+    after. Sin after se recorren todas las filas y no hace falta consultar.
+    """
+    if not pendientes or after is None:
+        return set()
+    return set(session.scalars(select(modelo.jugador_id).where(
+        modelo.partido_id == partido_id, modelo.jugador_id.in_({pendiente.jugador_id for pendiente in pendientes}))))
+
+
+def pagina_con_pendientes(session: Session, modelo, partido_id: int, filas: list, pendientes: list, after: str = None,
+                          ultima_pagina: bool = True) -> list:
+    """
+    superponer_pendientes sobre una página del listado: las pendientes de jugadores nuevos van solo en la
+    última página.
+    """
+    excluir = _jugadores_en_paginas_anteriores(session, modelo, partido_id, pendientes, after) if ultima_pagina else ()
+    return list(superponer_pendientes(filas, pendientes, excluir, anadir=ultima_pagina))
+
+
+def iterar_con_pendientes(session: Session, modelo, partido_id: int, filas, pendientes: list, after: str = None):
+    """
+    superponer_pendientes sobre un listado completo en streaming, sin cargarlo en memoria.
+    """
+    return superponer_pendientes(filas, pendientes,
+                                 _jugadores_en_paginas_anteriores(session, modelo, partido_id, pendientes, after))
+
+
+def crear_estadisticas_bulk(session: Session, partido_id: int, lineas: list[dict]) -> tuple[int, list[dict]] | None:
+    """
+    Inserta o reemplaza todas las líneas de estadísticas de un partido en una sola transacción.
+    Valida los jugadores con una única consulta IN y devuelve (creadas, errores por fila).
+    """
+    partido = _partido_para_escritura(session, partido_id)
+    if not partido:
+        logger.info(f"No se pueden crear las estadísticas. El partido con ID {partido_id} no existe.")
+        return None
 
+    ids_solicitados = {linea.get("jugador_id") for linea in lineas if isinstance(linea, dict)}
+    ids_solicitados.discard(None)
+    equipos_por_jugador = {}
+    if ids_solicitados:
+        equipos_por_jugador = dict(
+            session.query(Jugador.id, Jugador.equipo_id).filter(Jugador.id.in_(ids_solicitados)).all()
+        )
+
+    filas = []
+    errores = []
+    for indice, linea in enumerate(lineas):
+        if not isinstance(linea, dict) or not linea.get("jugador_id"):
+            errores.append({"indice": indice, "error": "jugador_id es requerido"})
+            continue
+        jugador_id = linea["jugador_id"]
+        if jugador_id not in equipos_por_jugador:
+            errores.append({"indice": indice, "jugador_id": jugador_id,
+                            "error": f"El jugador con ID {jugador_id} no existe"})
+            continue
+        fila = {"jugador_id": jugador_id, "partido_id": partido_id}
+        for campo in CAMPOS_ESTADISTICA:
+            fila[campo] = linea.get(campo, 0)
+        filas.append(fila)
+
+    if filas:
+        puntos_por_equipo = upsert_estadisticas(session, filas, equipos_por_jugador)
+        registrar_puntos_anotados(session, puntos_por_equipo)
+        incrementar_versiones(session, ("partido", partido_id), LIGA,
+                              *(("jugador", fila["jugador_id"]) for fila in filas),
+                              *(("equipo", equipo_id) for equipo_id in puntos_por_equipo))
+        session.commit()
+    return len(filas), errores
+
+
+def obtener_convocatoria(session: Session, partido_id: int) -> list | None:
+    """
+    Jugadores de los dos equipos del partido con su disponibilidad, en una sola consulta: el partido
+    con LEFT JOIN a los jugadores de ambos equipos y LEFT JOIN a su estado para ese partido.
+    disponible y lesion_tipo son None si el jugador aún no tiene estado. Cada fila lleva también
+    equipo_local_id y equipo_visitante_id; un equipo sin jugadores aparece como una fila con id None.
+    Devuelve None si el partido no existe.
+    """
+    filas = session.execute(
+        select(Partido.equipo_local_id, Partido.equipo_visitante_id, Jugador.id, Jugador.nombre, Jugador.apellido,
+               Jugador.posicion, Jugador.numero, Jugador.equipo_id, EstadoJugador.disponible,
+               EstadoJugador.lesion_tipo)
+        .select_from(Partido)
+        .outerjoin(Jugador, or_(Jugador.equipo_id == Partido.equipo_local_id,
+                                Jugador.equipo_id == Partido.equipo_visitante_id))
+        .outerjoin(EstadoJugador, and_(EstadoJugador.jugador_id == Jugador.id, EstadoJugador.partido_id == Partido.id))
+        .where(Partido.id == partido_id)
+        .order_by(Jugador.equipo_id, Jugador.numero, Jugador.id)
+    ).all()
+    return filas or None
+
+
+def actualizar_convocatoria(session: Session, partido_id: int,
+                            lineas: list[dict]) -> tuple[int, list[dict]] | None:
+    """
+    Fija la disponibilidad de una plantilla completa en una transacción: valida los jugadores contra
+    los dos equipos con una consulta IN y escribe todos los estados con un único upsert.
+    Devuelve (actualizados, errores por fila) o None si el partido no existe.
+    """
+    partido = _partido_para_escritura(session, partido_id)
+    if not partido:
+        logger.info(f"No se puede actualizar la convocatoria. El partido con ID {partido_id} no existe.")
+        return None
+    equipos = {partido.equipo_local_id, partido.equipo_visitante_id}
+
+    ids_solicitados = {linea.get("jugador_id") for linea in lineas if isinstance(linea, dict)}
+    ids_solicitados.discard(None)
+    equipos_por_jugador = {}
+    if ids_solicitados:
+        equipos_por_jugador = dict(
+            session.query(Jugador.id, Jugador.equipo_id).filter(Jugador.id.in_(ids_solicitados)).all()
+        )
+
+    filas = []
+    errores = []
+    for indice, linea in enumerate(lineas):
+        if not isinstance(linea, dict) or not linea.get("jugador_id") or not isinstance(linea.get("disponible"), bool):
+            errores.append({"indice": indice, "error": "jugador_id y disponible son requeridos"})
+            continue
+        jugador_id = linea["jugador_id"]
+        if equipos_por_jugador.get(jugador_id) not in equipos:
+            errores.append({"indice": indice, "jugador_id": jugador_id,
+                            "error": f"El jugador con ID {jugador_id} no juega en este partido"})
+            continue
+        filas.append({"jugador_id": jugador_id, "partido_id": partido_id, "disponible": linea["disponible"],
+                      "lesion_tipo": linea.get("lesion_tipo")})
+
+    if filas:
+        upsert_estados(session, filas)
+        incrementar_versiones(session, ("partido", partido_id))
+        session.commit()
+    return len(filas), errores
+
+
+def registrar_eventos_partido(session: Session, partido_id: int,
+                              eventos: list[dict]) -> tuple[int, list[dict]] | None:
+    """
+    Añade un lote de eventos en directo al registro del partido con una sola inserción y actualiza el
+    marcador en memoria. Los jugadores se validan con una única consulta IN contra los dos equipos.
+    Devuelve (creados, errores por fila).
+    """
+    partido = _partido_para_escritura(session, partido_id)
+    if not partido:
+        logger.info(f"No se pueden registrar los eventos. El partido con ID {partido_id} no existe.")
+        return None
 
-def obtener_partidos_de_equipo(session: Session, equipo_id: int) -> list[Partido]:
+    ids_solicitados = {evento.get("jugador_id") for evento in eventos if isinstance(evento, dict)}
+    ids_solicitados.discard(None)
+    jugadores_del_partido = set()
+    if ids_solicitados:
+        jugadores_del_partido = {
+            jugador_id for (jugador_id,) in
+            session.query(Jugador.id)
+            .filter(Jugador.id.in_(ids_solicitados),
+                    Jugador.equipo_id.in_((partido.equipo_local_id, partido.equipo_visitante_id)))
+        }
+
+    ahora = datetime.now(timezone.utc)
+    filas = []
+    errores = []
+    for indice, evento in enumerate(eventos):
+        if not isinstance(evento, dict) or not evento.get("jugador_id") or not evento.get("tipo"):
+            errores.append({"indice": indice, "error": "jugador_id y tipo son requeridos"})
+            continue
+        jugador_id, tipo, set_numero = evento["jugador_id"], evento["tipo"], evento.get("set")
+        if tipo not in CAMPOS_EVENTO:
+            errores.append({"indice": indice, "error": f"Tipo de evento desconocido: {tipo}"})
+            continue
+        if not isinstance(set_numero, int) or not 1 <= set_numero <= MAX_SETS:
+            errores.append({"indice": indice, "error": f"set debe estar entre 1 y {MAX_SETS}"})
+            continue
+        if jugador_id not in jugadores_del_partido:
+            errores.append({"indice": indice, "jugador_id": jugador_id,
+                            "error": f"El jugador con ID {jugador_id} no juega este partido"})
+            continue
+        filas.append({"partido_id": partido_id, "jugador_id": jugador_id, "tipo": tipo, "set_numero": set_numero,
+                      "registrado": ahora})
+
+    if filas:
+        session.execute(insert(EventoPartido), filas)
+        incrementar_versiones(session, ("partido", partido_id))
+        session.commit()
+        agregador_en_vivo.obtener_o_reconstruir(session, partido_id).ponerse_al_dia(session)
+    return len(filas), errores
+
+
+def obtener_estadisticas_en_vivo(session: Session, partido_id: int) -> list[dict] | None:
+    """
+    Box score del partido si está en juego, agregado desde el registro de eventos aunque los haya
+    recibido otro worker; None si no tiene eventos o ya terminó.
+    """
+    marcador = agregador_en_vivo.obtener_en_juego(session, partido_id)
+    if marcador is None:
+        return None
+    return marcador.box_score()
+
+
+def finalizar_partido(session: Session, partido_id: int) -> int | None:
+    """
+    Pitido final: escribe los totales del marcador en directo en las filas de Estadistica del partido
+    (un upsert por jugador) y registra el evento final, todo en una transacción. Repetirlo tras una corrección
+    vuelve a escribir los totales, no los suma. Devuelve el número de jugadores escritos.
+    """
+    partido = _partido_para_escritura(session, partido_id)
+    if not partido:
+        logger.info(f"No se puede finalizar el partido. El partido con ID {partido_id} no existe.")
+        return None
+    marcador = agregador_en_vivo.obtener_o_reconstruir(session, partido_id)
+    marcador.ponerse_al_dia(session)
+    totales = marcador.box_score()
+    if not totales:
+        return 0
+
+    equipos_por_jugador = dict(
+        session.query(Jugador.id, Jugador.equipo_id).filter(Jugador.id.in_([t["jugador_id"] for t in totales])).all()
+    )
+    filas = [{"jugador_id": total["jugador_id"], "partido_id": partido_id,
+              **{campo: total[campo] for campo in CAMPOS_ESTADISTICA}} for total in totales]
+    puntos_por_equipo = upsert_estadisticas(session, filas, equipos_por_jugador)
+    session.execute(insert(EventoPartido), [{"partido_id": partido_id, "jugador_id": None, "tipo": EVENTO_FINAL,
+                                             "set_numero": None, "registrado": datetime.now(timezone.utc)}])
+    registrar_puntos_anotados(session, puntos_por_equipo)
+    incrementar_versiones(session, ("partido", partido_id), LIGA,
+                          *(("jugador", total["jugador_id"]) for total in totales),
+                          *(("equipo", equipo_id) for equipo_id in puntos_por_equipo))
+    session.commit()
+    agregador_en_vivo.terminar(partido_id)
+    return len(totales)
+
+
+def _consulta_resumen(session: Session, *columnas_grupo, desde: str = None, hasta: str = None):
+    agregados = [func.count(func.distinct(Estadistica.partido_id)).label("partidos")]
+    for campo in CAMPOS_ESTADISTICA:
+        columna = getattr(Estadistica, campo)
+        agregados += [
+            func.coalesce(func.sum(columna), 0).label(f"{campo}_total"),
+            func.avg(columna).label(f"{campo}_promedio"),
+            func.max(columna).label(f"{campo}_maximo"),
+        ]
+    consulta = (
+        session.query(*columnas_grupo, *agregados)
+        .select_from(Estadistica)
+        .join(Partido, Partido.id == Estadistica.partido_id)
+    )
+    inicio, fin = parsear_rango_fechas(desde, hasta)
+    if inicio:
+        consulta = consulta.filter(Partido.fecha >= inicio)
+    if fin:
+        consulta = consulta.filter(Partido.fecha < fin)
+    return consulta.group_by(*columnas_grupo)
+
+
+def _resumen_a_dict(fila) -> dict:
+    resumen = {"partidos": fila.partidos if fila else 0}
+    for campo in CAMPOS_ESTADISTICA:
+        promedio = getattr(fila, f"{campo}_promedio") if fila else None
+        maximo = getattr(fila, f"{campo}_maximo") if fila else None
+        resumen[campo] = {
+            "total": int(getattr(fila, f"{campo}_total")) if fila else 0,
+            "promedio": round(float(promedio), 2) if promedio is not None else 0,
+            "maximo": maximo or 0,
+        }
+    return resumen
+
+
+def obtener_resumen_jugador(session: Session, jugador_id: int, desde: str = None,
+                            hasta: str = None) -> dict | None:
+    """
+    Totales, promedios y máximos de temporada de un jugador, calculados en la base de datos
+    con una sola consulta GROUP BY sobre estadistica.
+    """
+    jugador = obtener_jugador_por_id(session, jugador_id)
+    if not jugador:
+        logger.info(f"No se puede obtener el resumen. El jugador con ID {jugador_id} no existe.")
+        return None
+    fila = (
+        _consulta_resumen(session, Estadistica.jugador_id, desde=desde, hasta=hasta)
+        .filter(Estadistica.jugador_id == jugador_id)
+        .first()
+    )
+    return _resumen_a_dict(fila)
+
+
+def obtener_resumen_equipo(session: Session, equipo_id: int, desde: str = None,
+                           hasta: str = None) -> dict | None:
+    """
+    Totales, promedios y máximos de temporada de los jugadores de un equipo, calculados en la
+    base de datos con una sola consulta GROUP BY sobre estadistica.
+    """
     equipo = obtener_equipo_por_id(session, equipo_id)
     if not equipo:
-        print(f"No se pueden obtener los partidos. El equipo con ID {equipo_id} no existe.")
-        return []
-    partidos_local = equipo.partidos_local
-    partidos_visitante = equipo.partidos_visitante
-    return partidos_local + partidos_visitante
+        logger.info(f"No se puede obtener el resumen. El equipo con ID {equipo_id} no existe.")
+        return None
+    fila = (
+        _consulta_resumen(session, Jugador.equipo_id, desde=desde, hasta=hasta)
+        .join(Jugador, Jugador.id == Estadistica.jugador_id)
+        .filter(Jugador.equipo_id == equipo_id)
+        .first()
+    )
+    return _resumen_a_dict(fila)
 
 
-def obtener_estadisticas_de_partido(session: Session, partido_id: int) -> list[Estadistica]:
-    partido = obtener_partido_por_id(session, partido_id)
-    if not partido:
-        print(f"No se pueden obtener las estadísticas. El partido con ID {partido_id} no existe.")
-        return []
-    return partido.estadisticas
+TAMANO_LOTE = 500
 
 
-def obtener_estado_jugadores_de_partido(session: Session, partido_id: int) -> list[EstadoJugador]:
-    partido = obtener_partido_por_id(session, partido_id)
-    if not partido:
-        print(f"No se puede obtener el estado de los jugadores. El partido con ID {partido_id} no existe.")
-        return []
-    return partido.estado_jugadores
+def codificar_cursor(*valores) -> str:
+    texto = json.dumps(valores, default=lambda valor: valor.isoformat())
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> list:
+    """
+    Devuelve los valores de la clave de orden contenidos en el cursor. Lanza ValueError si el
+    cursor no es válido.
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"Cursor inválido: {cursor}") from error
+    if not isinstance(valores, list) or not valores:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return valores
+
+
+def _paginar(consulta, columnas_orden: list, after: str = None, limit: int = None, iterar: bool = False):
+    """
+    Aplica paginación por clave (keyset) sobre las columnas de orden dadas, la última de las cuales
+    debe ser única. Con limit, se piden limit + 1 filas para que el llamador sepa si hay otra página.
+    Con iterar, devuelve un iterador que trae las filas en lotes en lugar de una lista.
+    """
+    if after is not None:
+        valores = decodificar_cursor(after)
+        if len(valores) != len(columnas_orden):
+            raise ValueError(f"Cursor inválido: {after}")
+        try:
+            valores = [datetime.fromisoformat(valor) if isinstance(columna.type, DateTime) else valor
+                       for columna, valor in zip(columnas_orden, valores)]
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"Cursor inválido: {after}") from error
+        condiciones = []
+        for i, columna in enumerate(columnas_orden):
+            iguales = [columnas_orden[j] == valores[j] for j in range(i)]
+            condiciones.append(and_(*iguales, columna > valores[i]))
+        consulta = consulta.filter(or_(*condiciones))
+    consulta = consulta.order_by(*columnas_orden)
+    if limit is not None:
+        consulta = consulta.limit(limit + 1)
+    if iterar:
+        return consulta.yield_per(TAMANO_LOTE)
+    return consulta.all()
+
+
+def obtener_jugadores_de_equipo(session: Session, equipo_id: int, limit: int = None,
+                                after: str = None, iterar: bool = False) -> list[Jugador]:
+    consulta = session.query(Jugador).filter(Jugador.equipo_id == equipo_id)
+    return _paginar(consulta, [Jugador.id], after=after, limit=limit, iterar=iterar)
+
+
+def obtener_partidos_de_equipo(session: Session, equipo_id: int, limit: int = None,
+                               after: str = None, iterar: bool = False) -> list[Partido]:
+    consulta = session.query(Partido).filter(
+        or_(Partido.equipo_local_id == equipo_id, Partido.equipo_visitante_id == equipo_id))
+    return _paginar(consulta, [Partido.fecha, Partido.id], after=after, limit=limit, iterar=iterar)
+
+
+def obtener_partidos(session: Session, desde: str = None, hasta: str = None, equipo_id: int = None,
+                     limit: int = None, after: str = None, iterar: bool = False) -> list[Partido]:
+    """
+    Partidos en el intervalo [desde, hasta), opcionalmente de un equipo, ordenados por fecha.
+    Usa los índices (fecha, id) y (equipo_*_id, fecha, id).
+    """
+    inicio, fin = parsear_rango_fechas(desde, hasta)
+    consulta = session.query(Partido)
+    if inicio:
+        consulta = consulta.filter(Partido.fecha >= inicio)
+    if fin:
+        consulta = consulta.filter(Partido.fecha < fin)
+    if equipo_id is not None:
+        consulta = consulta.filter(
+            or_(Partido.equipo_local_id == equipo_id, Partido.equipo_visitante_id == equipo_id))
+    return _paginar(consulta, [Partido.fecha, Partido.id], after=after, limit=limit, iterar=iterar)
+
+
+def obtener_estadisticas_de_partido(session: Session, partido_id: int, limit: int = None,
+                                    after: str = None, iterar: bool = False) -> list[Estadistica]:
+    consulta = session.query(Estadistica).filter(Estadistica.partido_id == partido_id)
+    return _paginar(consulta, [Estadistica.id], after=after, limit=limit, iterar=iterar)
+
+
+def obtener_estado_jugadores_de_partido(session: Session, partido_id: int, limit: int = None,
+                                        after: str = None, iterar: bool = False) -> list[EstadoJugador]:
+    consulta = session.query(EstadoJugador).filter(EstadoJugador.partido_id == partido_id)
+    return _paginar(consulta, [EstadoJugador.id], after=after, limit=limit, iterar=iterar)
 
 
 def main():
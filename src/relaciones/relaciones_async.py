@@ -0,0 +1,74 @@
+"""
+Equivalentes asíncronos de las funciones de negocio.
+
+Cada función recibe una AsyncSession y ejecuta la función síncrona correspondiente con
+AsyncSession.run_sync, de modo que la lógica (validaciones, caché, clasificación, versiones) es
+la misma en los dos modos y todo el SQL viaja por el driver asíncrono sin bloquear el event loop.
+La sesión debe crearse con expire_on_commit=False para poder leer los objetos devueltos fuera de run_sync.
+"""
+from functools import wraps
+from sqlalchemy.ext.asyncio import AsyncSession
+from src import negocio
+from src import clasificacion
+from src import calendario
+from src import versiones
+from src import analitica
+from src import idempotencia
+from src import exportacion
+
+
+def _asincrona(funcion):
+    @wraps(funcion)
+    async def envoltura(session: AsyncSession, *args, **kwargs):
+        return await session.run_sync(funcion, *args, **kwargs)
+    return envoltura
+
+
+crear_equipo = _asincrona(negocio.crear_equipo)
+obtener_equipo_por_id = _asincrona(negocio.obtener_equipo_por_id)
+crear_jugador = _asincrona(negocio.crear_jugador)
+obtener_jugador_por_id = _asincrona(negocio.obtener_jugador_por_id)
+actualizar_jugador = _asincrona(negocio.actualizar_jugador)
+eliminar_jugador = _asincrona(negocio.eliminar_jugador)
+crear_partido = _asincrona(negocio.crear_partido)
+obtener_partido_por_id = _asincrona(negocio.obtener_partido_por_id)
+obtener_partidos = _asincrona(negocio.obtener_partidos)
+registrar_resultado_partido = _asincrona(negocio.registrar_resultado_partido)
+crear_estadistica = _asincrona(negocio.crear_estadistica)
+crear_estadisticas_bulk = _asincrona(negocio.crear_estadisticas_bulk)
+registrar_eventos_partido = _asincrona(negocio.registrar_eventos_partido)
+obtener_estadisticas_en_vivo = _asincrona(negocio.obtener_estadisticas_en_vivo)
+finalizar_partido = _asincrona(negocio.finalizar_partido)
+crear_estado_jugador = _asincrona(negocio.crear_estado_jugador)
+obtener_convocatoria = _asincrona(negocio.obtener_convocatoria)
+actualizar_convocatoria = _asincrona(negocio.actualizar_convocatoria)
+obtener_jugadores_de_equipo = _asincrona(negocio.obtener_jugadores_de_equipo)
+obtener_partidos_de_equipo = _asincrona(negocio.obtener_partidos_de_equipo)
+obtener_estadisticas_de_partido = _asincrona(negocio.obtener_estadisticas_de_partido)
+obtener_estado_jugadores_de_partido = _asincrona(negocio.obtener_estado_jugadores_de_partido)
+pagina_con_pendientes = _asincrona(negocio.pagina_con_pendientes)
+obtener_resumen_jugador = _asincrona(negocio.obtener_resumen_jugador)
+obtener_resumen_equipo = _asincrona(negocio.obtener_resumen_equipo)
+obtener_clasificacion = _asincrona(clasificacion.obtener_clasificacion)
+crear_calendario = _asincrona(calendario.crear_calendario)
+obtener_version = _asincrona(versiones.obtener_version)
+obtener_lideres = _asincrona(analitica.obtener_lideres)
+obtener_percentiles_por_posicion = _asincrona(analitica.obtener_percentiles_por_posicion)
+obtener_forma_jugador = _asincrona(analitica.obtener_forma_jugador)
+buscar_respuesta = _asincrona(idempotencia.buscar_respuesta)
+guardar_respuesta = _asincrona(idempotencia.guardar_respuesta)
+iterar_con_pendientes = _asincrona(negocio.iterar_con_pendientes)
+exportar = _asincrona(exportacion.exportar)
+
+
+async def iterar_en_sesion(session: AsyncSession, iterador):
+    """
+    Recorre un iterador síncrono que lee de la sesión por lotes (un listado con iterar=True, una
+    exportación) dando cada paso con run_sync, para que las lecturas sigan sin bloquear el event loop.
+    """
+    fin = object()
+    while True:
+        elemento = await session.run_sync(lambda _: next(iterador, fin))
+        if elemento is fin:
+            return
+        yield elemento
@@ -0,0 +1,144 @@
+"""
+Serialización compartida de las respuestas de la API.
+
+Las proyecciones por modelo preparan una sola vez un attrgetter con todos sus atributos y construyen
+el diccionario a partir de él, en lugar de repetir el diccionario a mano en cada ruta.
+El encoder JSON usa orjson si está instalado (SUPERLIGA_JSON=std fuerza el módulo json estándar).
+"""
+import json
+import os
+from operator import attrgetter
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+USAR_ORJSON = orjson is not None and os.environ.get("SUPERLIGA_JSON", "orjson").lower() != "std"
+
+
+class Proyeccion:
+    """
+    Convierte un objeto (o una fila con atributos) en un diccionario con los campos dados.
+    Cada campo es un nombre de atributo o un par (nombre, función que recibe el objeto).
+    """
+
+    def __init__(self, *campos):
+        self.campos = campos
+        atributos = tuple(campo for campo in campos if isinstance(campo, str))
+        calculados = tuple(campo for campo in campos if not isinstance(campo, str))
+        if len(atributos) > 1:
+            leer = attrgetter(*atributos)
+        else:
+            def leer(objeto):
+                return tuple(getattr(objeto, atributo) for atributo in atributos)
+
+        def convertir(objeto) -> dict:
+            resultado = dict(zip(atributos, leer(objeto)))
+            for nombre, funcion in calculados:
+                resultado[nombre] = funcion(objeto)
+            return resultado
+
+        self._convertir = convertir
+
+    def __call__(self, objeto) -> dict:
+        return self._convertir(objeto)
+
+    def lista(self, objetos) -> list[dict]:
+        convertir = self._convertir
+        return [convertir(objeto) for objeto in objetos]
+
+    def ampliada(self, *campos) -> "Proyeccion":
+        return Proyeccion(*self.campos, *campos)
+
+
+def _fecha_partido(partido) -> str:
+    return partido.fecha.date().isoformat()
+
+
+EQUIPO = Proyeccion("id", "nombre", "ciudad", "entrenador")
+JUGADOR_DE_EQUIPO = Proyeccion("id", "nombre", "apellido", "posicion", "numero")
+JUGADOR = JUGADOR_DE_EQUIPO.ampliada("equipo_id")
+PARTIDO = Proyeccion("id", ("fecha", _fecha_partido), "hora", "equipo_local_id", "equipo_visitante_id")
+PARTIDO_CON_RESULTADO = PARTIDO.ampliada("sets_local", "sets_visitante")
+ESTADISTICA_DE_PARTIDO = Proyeccion("id", "jugador_id", "puntos", "bloqueos", "saques", "recepciones")
+ESTADISTICA = Proyeccion("id", "jugador_id", "partido_id", "puntos", "bloqueos", "saques", "recepciones")
+ESTADO_DE_PARTIDO = Proyeccion("id", "jugador_id", "disponible", "lesion_tipo")
+ESTADO_JUGADOR = Proyeccion("id", "jugador_id", "partido_id", "disponible", "lesion_tipo")
+CONVOCADO = JUGADOR_DE_EQUIPO.ampliada("disponible", "lesion_tipo")
+
+
+def convocatoria(partido_id: int, filas, pendientes=()) -> dict:
+    """
+    Agrupa las filas de obtener_convocatoria en las plantillas local y visitante. Los estados aún en
+    la cola de escritura diferida sustituyen a los guardados.
+    """
+    por_jugador = {estado.jugador_id: estado for estado in pendientes}
+    resultado = {"partido_id": partido_id, "local": [], "visitante": []}
+    for fila in filas:
+        if fila.id is None:
+            continue
+        jugador = CONVOCADO(fila)
+        estado = por_jugador.get(fila.id)
+        if estado is not None:
+            jugador["disponible"], jugador["lesion_tipo"] = estado.disponible, estado.lesion_tipo
+        resultado["local" if fila.equipo_id == fila.equipo_local_id else "visitante"].append(jugador)
+    return resultado
+
+
+def _por_defecto(valor):
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    raise TypeError(f"Objeto de tipo {type(valor).__name__} no serializable a JSON")
+
+
+def dumps_bytes(datos, indentar: bool = False) -> bytes:
+    if USAR_ORJSON:
+        opciones = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indentar else 0)
+        return orjson.dumps(datos, default=_por_defecto, option=opciones)
+    if indentar:
+        return json.dumps(datos, default=_por_defecto, ensure_ascii=False, indent=2, sort_keys=True).encode()
+    return json.dumps(datos, default=_por_defecto, ensure_ascii=False, separators=(",", ":"),
+                      sort_keys=True).encode()
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask que usa orjson cuando está disponible; jsonify pasa por aquí.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if USAR_ORJSON and not kwargs:
+            return dumps_bytes(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """
+        DefaultJSONProvider.response siempre pasa separators o indent a dumps, que entonces no usaría
+        orjson: aquí se escriben directamente los bytes de dumps_bytes, indentados igual que en Flask.
+        """
+        if not USAR_ORJSON:
+            return super().response(*args, **kwargs)
+        datos = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(dumps_bytes(datos, indentar) + b"\n", mimetype=self.mimetype)
+
+
+def stream_array(filas, proyeccion: Proyeccion, tamano_bloque: int = 64 * 1024):
+    """
+    Genera un array JSON elemento a elemento a partir de un iterador de filas, agrupando la salida
+    en bloques de unos tamano_bloque bytes. La memoria usada no depende del número de filas.
+    """
+    convertir = proyeccion._convertir
+    bloque = bytearray(b"[")
+    separador = b""
+    for fila in filas:
+        bloque += separador
+        bloque += dumps_bytes(convertir(fila))
+        separador = b","
+        if len(bloque) >= tamano_bloque:
+            yield bytes(bloque)
+            bloque.clear()
+    bloque += b"]"
+    yield bytes(bloque)
@@ -1,34 +1,27 @@
+import logging
+from sqlalchemy import text
+from src.database import obtener_engine
 
-import mysql.connector
+logger = logging.getLogger("superliga.db")
 
 
 def conectar_db():
     """
-    Establece una conexión a la base de datos y devuelve el objeto de conexión.
+    Devuelve una conexión del pool compartido de la aplicación.
     """
     try:
-
-        conexion = mysql.connector.connect(
-            host="localhost",
-            user="tu_usuario",
-            password="tu_contraseña",
-            database="nombre_de_la_base_de_datos"
-        )
-
-        print("Conexión a la base de datos establecida correctamente.")
-        return conexion
-    except Exception as error:
-        print(f"Error al conectar a la base de datos: {error}")
+        return obtener_engine().connect()
+    except Exception:
+        logger.exception("Error al conectar a la base de datos")
         return None
 
 
 def cerrar_db(conexion):
     """
-    Cierra la conexión a la base de datos.
+    Devuelve la conexión al pool.
     """
     if conexion:
         conexion.close()
-        print("Conexión a la base de datos cerrada.")
 
 
 if __name__ == "__main__":
@@ -36,11 +29,8 @@ if __name__ == "__main__":
     mi_conexion = conectar_db()
     if mi_conexion:
 
-        cursor = mi_conexion.cursor()
-        cursor.execute("SELECT * FROM Jugador")
-        resultados = cursor.fetchall()
+        resultados = mi_conexion.execute(text("SELECT * FROM jugador")).fetchall()
         for fila in resultados:
             print(fila)
-        cursor.close()
 
         cerrar_db(mi_conexion)
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from src.database import VersionEntidad
+from src.idempotencia import insertar_o_actualizar
+
+# Ámbitos versionados. Cada escritura incrementa la versión de los ámbitos cuyas lecturas cambia:
+#   "equipo"  -> /equipos/<id>, sus jugadores, sus partidos y su resumen
+#   "jugador" -> /jugadores/<id> y su resumen
+#   "partido" -> /partidos/<id>, sus estadísticas y el estado de sus jugadores
+#   "liga"    -> /clasificacion, /lideres y /lideres/percentiles (entidad_id 0)
+LIGA = ("liga", 0)
+
+
+def incrementar_versiones(session: Session, *claves: tuple[str, int]):
+    """
+    Incrementa la versión de cada (tipo, entidad_id) en la transacción actual con un único upsert
+    (INSERT … ON CONFLICT DO UPDATE, u ON DUPLICATE KEY UPDATE en MySQL). No hace commit. Las claves se escriben ordenadas para que dos
+    transacciones concurrentes bloqueen las filas en el mismo orden.
+    """
+    ahora = datetime.now(timezone.utc)
+    filas = [{"tipo": tipo, "entidad_id": entidad_id, "version": 1, "actualizado": ahora}
+             for tipo, entidad_id in sorted(set(claves), key=str) if entidad_id is not None]
+    if not filas:
+        return
+    insertar_o_actualizar(
+        session, VersionEntidad, filas, ("tipo", "entidad_id"),
+        lambda propuestos: {"version": VersionEntidad.version + 1, "actualizado": propuestos["actualizado"]},
+    )
+
+
+def obtener_version(session: Session, tipo: str, entidad_id: int) -> tuple[int, datetime | None]:
+    """
+    Devuelve (version, actualizado). Una entidad que nunca se ha escrito tiene versión 0.
+    """
+    fila = (
+        session.query(VersionEntidad.version, VersionEntidad.actualizado)
+        .filter(VersionEntidad.tipo == tipo, VersionEntidad.entidad_id == entidad_id)
+        .first()
+    )
+    if fila is None:
+        return 0, None
+    return fila.version, fila.actualizado
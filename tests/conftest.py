@@ -0,0 +1,72 @@
+"""
+Fixtures comunes: una base de datos SQLite temporal con el esquema creado, la aplicación Flask y un
+cliente de pruebas. Las tablas y la caché de entidades se vacían al terminar cada test.
+
+La base de datos se puede cambiar con SUPERLIGA_TEST_DATABASE_URL; nunca se usa SUPERLIGA_DATABASE_URL,
+porque los tests borran todas las tablas.
+"""
+import os
+import tempfile
+import pytest
+
+os.environ["SUPERLIGA_DATABASE_URL"] = os.environ.get(
+    "SUPERLIGA_TEST_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='superliga_tests_')}/superliga.db")
+os.environ.setdefault("SUPERLIGA_LOG_NIVEL", "WARNING")
+
+from src.app import crear_app
+from src.cache import cache_entidades
+from src.database import Base, SessionLocal, crear_esquema, obtener_engine
+from src.en_vivo import agregador_en_vivo
+
+pytest_plugins = ["src.pytest_depuracion"]
+
+
+@pytest.fixture(scope="session")
+def app():
+    crear_esquema()
+    return crear_app()
+
+
+@pytest.fixture
+def cliente(app):
+    yield app.test_client()
+    SessionLocal.remove()
+    with obtener_engine().begin() as conexion:
+        for tabla in reversed(Base.metadata.sorted_tables):
+            conexion.execute(tabla.delete())
+    cache_entidades.limpiar()
+    for partido_id in agregador_en_vivo.partidos_en_juego():
+        agregador_en_vivo.terminar(partido_id)
+
+
+@pytest.fixture
+def session(cliente):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def liga(cliente):
+    """
+    Tres equipos con cuatro jugadores cada uno y un partido entre los dos primeros con la estadística y
+    el estado de cada jugador. Devuelve los ids creados.
+    """
+    equipos = [cliente.post("/equipos", json={"nombre": f"Equipo {i}", "ciudad": "Bogotá",
+                                              "entrenador": "Carlos Pérez"}).get_json()["id"] for i in range(3)]
+    jugadores = {
+        equipo_id: [cliente.post("/jugadores", json={"nombre": "Juan", "apellido": f"Pérez {numero}",
+                                                     "posicion": "Central", "numero": numero,
+                                                     "equipo_id": equipo_id}).get_json()["id"]
+                    for numero in range(1, 5)]
+        for equipo_id in equipos
+    }
+    partido_id = cliente.post("/partidos", json={"fecha": "2024-05-20", "hora": "8:00 PM",
+                                                 "equipo_local_id": equipos[0],
+                                                 "equipo_visitante_id": equipos[1]}).get_json()["id"]
+    convocados = jugadores[equipos[0]] + jugadores[equipos[1]]
+    cliente.post(f"/partidos/{partido_id}/estadisticas/bulk",
+                 json=[{"jugador_id": jugador_id, "puntos": 3} for jugador_id in convocados])
+    cliente.put(f"/partidos/{partido_id}/convocatoria",
+                json=[{"jugador_id": jugador_id, "disponible": True} for jugador_id in convocados])
+    return {"equipos": equipos, "jugadores": jugadores, "partido": partido_id}
@@ -0,0 +1,47 @@
+"""
+Líderes, percentiles y forma a partir de la matriz de estadísticas en memoria.
+"""
+
+
+def _jugador(liga, equipo=0, indice=0):
+    return liga["jugadores"][liga["equipos"][equipo]][indice]
+
+
+def test_lideres(cliente, liga):
+    jugador_id = _jugador(liga)
+    cliente.post("/estadisticas", json={"jugador_id": jugador_id, "partido_id": liga["partido"], "puntos": 10})
+    lideres = cliente.get("/lideres?k=2").get_json()
+    assert len(lideres) == 2
+    assert lideres[0] == {"jugador_id": jugador_id, "posicion": "Central", "puntos": 10.0, "partidos": 1}
+    assert lideres[1]["puntos"] == 3.0
+    assert cliente.get("/lideres?metrica=goles").status_code == 400
+
+
+def test_percentiles_por_posicion(cliente, liga):
+    percentiles = cliente.get("/lideres/percentiles").get_json()
+    assert percentiles["Central"]["jugadores"] == 8
+    assert percentiles["Central"]["p50"] == 3.0
+
+
+def test_forma(cliente, liga):
+    forma = cliente.get(f"/jugadores/{_jugador(liga)}/forma").get_json()
+    assert [(fila["partido_id"], fila["fecha"], fila["puntos"]) for fila in forma] == [
+        (liga["partido"], "2024-05-20", 3)]
+    assert cliente.get(f"/jugadores/{_jugador(liga)}/forma?ventana=0").status_code == 400
+
+
+def test_jugador_eliminado_sale_de_la_matriz(cliente, liga):
+    jugador_id = _jugador(liga)
+    assert cliente.get(f"/jugadores/{jugador_id}/forma").status_code == 200
+    assert jugador_id in {fila["jugador_id"] for fila in cliente.get("/lideres?k=20").get_json()}
+
+    assert cliente.delete(f"/jugadores/{jugador_id}").status_code == 200
+    assert jugador_id not in {fila["jugador_id"] for fila in cliente.get("/lideres?k=20").get_json()}
+    assert cliente.get("/lideres/percentiles").get_json()["Central"]["jugadores"] == 7
+    assert cliente.get(f"/jugadores/{jugador_id}/forma").status_code == 404
+
+
+def test_etag_de_lideres_cambia_al_editar_un_jugador(cliente, liga):
+    etag = cliente.get("/lideres").headers["ETag"]
+    cliente.put(f"/jugadores/{_jugador(liga)}", json={"nombre": "Pedro"})
+    assert cliente.get("/lideres", headers={"If-None-Match": etag}).status_code == 200
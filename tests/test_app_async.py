@@ -0,0 +1,130 @@
+"""
+Aplicación ASGI (Quart): mismas rutas y respuestas que la aplicación Flask sobre la misma base de datos,
+y el trabajo bloqueante que no es SQL fuera del event loop.
+"""
+import asyncio
+import threading
+import pytest
+from src import app_async
+from src.cache import BackendSQLite, cache_entidades
+from src.database import ejecutar_bloqueante
+from src.metricas import TIPO_CONTENIDO
+
+RUTAS = (
+    "/partidos",
+    "/partidos?stream=1",
+    "/partidos/{partido}",
+    "/partidos/{partido}/estadisticas",
+    "/partidos/{partido}/estadisticas?stream=1",
+    "/partidos/{partido}/estado_jugadores?stream=1",
+    "/partidos/{partido}/convocatoria",
+    "/equipos/{equipo}/jugadores?stream=1",
+    "/equipos/{equipo}/partidos?stream=1",
+    "/equipos/{equipo}/jugadores?limit=3",
+    "/jugadores/{jugador}",
+    "/jugadores/{jugador}/resumen",
+    "/jugadores/{jugador}/forma",
+    "/clasificacion",
+    "/lideres",
+    "/export/partidos",
+    "/export/estadisticas?formato=csv",
+    "/no-existe",
+)
+
+
+class ClienteAsincrono:
+    """
+    Cliente de pruebas de Quart usable desde tests síncronos: cada petición corre en su propio event
+    loop, así que el pool del engine asíncrono se vacía al terminar.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def _pedir(self, metodo, ruta, **opciones):
+        try:
+            respuesta = await getattr(self.app.test_client(), metodo)(ruta, **opciones)
+            return respuesta.status_code, respuesta.headers, await respuesta.get_data()
+        finally:
+            await app_async.obtener_engine_async().dispose()
+
+    def get(self, ruta, **opciones):
+        return asyncio.run(self._pedir("get", ruta, **opciones))
+
+    def post(self, ruta, **opciones):
+        return asyncio.run(self._pedir("post", ruta, **opciones))
+
+
+@pytest.fixture(scope="module")
+def aplicacion_async():
+    return app_async.crear_app()
+
+
+@pytest.fixture
+def cliente_async(aplicacion_async, cliente):
+    return ClienteAsincrono(aplicacion_async)
+
+
+@pytest.mark.parametrize("ruta", RUTAS)
+def test_misma_respuesta_que_la_aplicacion_flask(cliente, cliente_async, liga, ruta):
+    equipo = liga["equipos"][0]
+    ruta = ruta.format(partido=liga["partido"], equipo=equipo, jugador=liga["jugadores"][equipo][0])
+    esperada = cliente.get(ruta)
+    estado, cabeceras, cuerpo = cliente_async.get(ruta)
+    assert (estado, cuerpo) == (esperada.status_code, esperada.data)
+    assert cabeceras.get("X-Next-Cursor") == esperada.headers.get("X-Next-Cursor")
+    assert cabeceras.get("ETag") == esperada.headers.get("ETag")
+
+
+@pytest.mark.parametrize("ruta", ("/partidos?desde=ayer", "/partidos?stream=1&after=no-es-un-cursor",
+                                  "/partidos?equipo_id=abc", "/export/partidos?formato=xml",
+                                  "/export/partidos?temporada=dos"))
+def test_parametros_no_validos_son_400(cliente_async, ruta):
+    assert cliente_async.get(ruta)[0] == 400
+
+
+def test_idempotency_key(cliente_async, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    cuerpo = {"jugador_id": jugador_id, "partido_id": liga["partido"], "puntos": 10}
+    primera = cliente_async.post("/estadisticas", json=cuerpo, headers={"Idempotency-Key": "async-1"})
+    repetida = cliente_async.post("/estadisticas", json=cuerpo, headers={"Idempotency-Key": "async-1"})
+    assert (primera[0], repetida[0]) == (201, 201)
+    assert repetida[1]["Idempotent-Replayed"] == "true"
+    assert repetida[2] == primera[2]
+    otra = cliente_async.post("/estadisticas", json={**cuerpo, "puntos": 1}, headers={"Idempotency-Key": "async-1"})
+    assert otra[0] == 422
+    assert cliente_async.post("/estadisticas", json=cuerpo, headers={"Idempotency-Key": ""})[0] == 400
+
+
+def test_ejecutar_bloqueante_usa_otro_hilo_dentro_de_run_sync():
+    async def comprobar():
+        motor = app_async.obtener_engine_async()
+        try:
+            async with app_async.SessionAsync(bind=motor) as session:
+                return await session.run_sync(lambda _: ejecutar_bloqueante(threading.get_ident))
+        finally:
+            await motor.dispose()
+    assert asyncio.run(comprobar()) != threading.get_ident()
+    assert ejecutar_bloqueante(threading.get_ident) == threading.get_ident()
+
+
+def test_cache_sqlite_fuera_del_event_loop(cliente_async, liga, monkeypatch, tmp_path):
+    hilos = []
+
+    class BackendVigilado(BackendSQLite):
+        def obtener(self, clave):
+            hilos.append(threading.current_thread())
+            return super().obtener(clave)
+
+    monkeypatch.setattr(cache_entidades, "backend", BackendVigilado(str(tmp_path / "cache.sqlite3")))
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    assert cliente_async.get(f"/jugadores/{jugador_id}")[0] == 200
+    assert hilos and threading.main_thread() not in hilos
+
+
+def test_metrics(cliente_async, liga):
+    cliente_async.get(f"/equipos/{liga['equipos'][0]}")
+    estado, cabeceras, cuerpo = cliente_async.get("/metrics")
+    assert (estado, cabeceras["Content-Type"]) == (200, TIPO_CONTENIDO)
+    muestra = 'superliga_http_peticiones_total{metodo="GET",ruta="/equipos/<int:equipo_id>",status="200"}'
+    assert muestra in cuerpo.decode()
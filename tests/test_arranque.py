@@ -0,0 +1,76 @@
+"""
+Arranque perezoso: importar y crear las aplicaciones no crea engines ni toca la base de datos, que
+se crea con el comando de migración.
+"""
+import os
+import subprocess
+import sys
+import pytest
+from src import database, migrar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPROBAR_ARRANQUE = """
+import importlib, json
+modulo = importlib.import_module({modulo!r})
+modulo.crear_app()
+modulo.crear_app()
+from src import database
+print(json.dumps([database._engine is None, getattr(modulo, "_engine_async", None) is None]))
+"""
+
+
+@pytest.mark.parametrize("modulo", ("src.app", "src.app_async"))
+def test_crear_app_no_crea_engines(modulo, tmp_path):
+    # Una URL a un directorio que no existe: cualquier conexión fallaría.
+    entorno = {**os.environ, "PYTHONPATH": RAIZ,
+               "SUPERLIGA_DATABASE_URL": f"sqlite:///{tmp_path}/no-existe/superliga.db"}
+    salida = subprocess.run([sys.executable, "-c", COMPROBAR_ARRANQUE.format(modulo=modulo)], cwd=RAIZ,
+                            env=entorno, capture_output=True, text=True, timeout=60)
+    assert salida.returncode == 0, salida.stderr
+    assert salida.stdout.strip() == "[true, true]"
+
+
+def test_al_crear_engine(monkeypatch):
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setattr(database, "_al_crear_engine", [])
+    llamadas = []
+
+    def gancho(motor):
+        llamadas.append(motor)
+
+    database.al_crear_engine(gancho)
+    database.al_crear_engine(gancho)
+    assert llamadas == []
+    motor = database.obtener_engine()
+    try:
+        assert llamadas == [motor]
+        assert database.obtener_engine() is motor
+        tardio = []
+        database.al_crear_engine(tardio.append)
+        assert tardio == [motor]
+    finally:
+        motor.dispose()
+
+
+def test_migrar_crea_el_esquema_una_vez(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setenv("SUPERLIGA_DATABASE_URL", "")
+    url = f"sqlite:///{tmp_path}/superliga.db"
+    try:
+        assert migrar.main(["--database-url", url]) == 0
+        assert "Tablas creadas: " in capsys.readouterr().out
+        monkeypatch.setattr(database, "_engine", None)
+        assert migrar.main(["--database-url", url]) == 0
+        assert capsys.readouterr().out == "El esquema ya estaba creado.\n"
+    finally:
+        database._engine.dispose()
+
+
+def test_migrar_sql_sin_conectar(monkeypatch, capsys):
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setenv("SUPERLIGA_DATABASE_URL", "")
+    assert migrar.main(["--sql", "--database-url", "postgresql://nadie@servidor-inexistente/superliga"]) == 0
+    ddl = capsys.readouterr().out
+    assert "CREATE TABLE partido" in ddl
+    assert "TIMESTAMP WITH TIME ZONE" in ddl
+    assert database._engine is None
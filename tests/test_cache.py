@@ -0,0 +1,105 @@
+"""
+Caché de lectura de equipo/jugador/partido: backends LRU+TTL, contadores e invalidación en escrituras.
+"""
+from datetime import datetime
+import pytest
+from src import cache
+from src.cache import BackendMemoria, BackendSQLite, CacheEntidades, cache_entidades, crear_cache_desde_entorno
+from src.database import SessionLocal
+from src.negocio import obtener_jugador_por_id, obtener_partido_por_id
+
+
+@pytest.fixture(params=("memoria", "sqlite"))
+def backend(request, tmp_path):
+    if request.param == "memoria":
+        return BackendMemoria(max_entradas=2, ttl=60)
+    return BackendSQLite(str(tmp_path / "cache.sqlite3"), max_entradas=2, ttl=60)
+
+
+def test_backend_expulsa_la_entrada_menos_usada(backend):
+    fecha = datetime(2024, 5, 20, 20, 0)
+    backend.guardar("partido:1", {"id": 1, "fecha": fecha})
+    backend.guardar("partido:2", {"id": 2})
+    assert backend.obtener("partido:1") == ({"id": 1, "fecha": fecha}, 0)
+    assert backend.guardar("partido:3", {"id": 3}) == 1
+    assert backend.obtener("partido:2") == (None, 0)
+    assert backend.obtener("partido:1")[0]["id"] == 1
+    assert backend.tamano() == 2
+
+
+def test_backend_caduca_por_ttl(backend, monkeypatch):
+    backend.guardar("equipo:1", {"id": 1})
+    reloj = cache.time.monotonic() + 61, cache.time.time() + 61
+    monkeypatch.setattr(cache.time, "monotonic", lambda: reloj[0])
+    monkeypatch.setattr(cache.time, "time", lambda: reloj[1])
+    assert backend.obtener("equipo:1") == (None, 1)
+    assert backend.tamano() == 0
+
+
+def test_backend_sqlite_compartido_entre_instancias(tmp_path):
+    ruta = str(tmp_path / "cache.sqlite3")
+    BackendSQLite(ruta).guardar("jugador:1", {"id": 1, "nombre": "Juan"})
+    otro = BackendSQLite(ruta)
+    assert otro.obtener("jugador:1")[0] == {"id": 1, "nombre": "Juan"}
+    otro.eliminar("jugador:1")
+    assert BackendSQLite(ruta).obtener("jugador:1") == (None, 0)
+
+
+def test_contadores_de_aciertos_fallos_y_expulsiones():
+    entidades = CacheEntidades(BackendMemoria(max_entradas=1))
+    assert entidades.obtener("equipo", 1) is None
+    entidades.guardar("equipo", 1, {"id": 1})
+    entidades.guardar("equipo", 2, {"id": 2})
+    assert entidades.obtener("equipo", 2) == {"id": 2}
+    estadisticas = entidades.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"], estadisticas["expulsiones"]) == (1, 1, 1)
+    assert estadisticas["backend"] == "BackendMemoria"
+
+
+def test_cache_desactivada_no_guarda_nada():
+    entidades = CacheEntidades()
+    entidades.guardar("equipo", 1, {"id": 1})
+    assert entidades.obtener("equipo", 1) is None
+    assert entidades.estadisticas()["entradas"] == 0
+
+
+@pytest.mark.parametrize("tipo, backend", (("memoria", BackendMemoria), ("sqlite", BackendSQLite),
+                                           ("desactivada", type(None))))
+def test_backend_elegido_por_entorno(monkeypatch, tmp_path, tipo, backend):
+    monkeypatch.setenv("SUPERLIGA_CACHE", tipo)
+    monkeypatch.setenv("SUPERLIGA_CACHE_RUTA", str(tmp_path / "cache.sqlite3"))
+    assert type(crear_cache_desde_entorno().backend) is backend
+
+
+def test_lectura_repetida_sale_de_la_cache(cliente, liga, presupuesto_sql):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    cache_entidades.limpiar()
+    cliente.get(f"/jugadores/{jugador_id}")
+    aciertos = cache_entidades.aciertos
+    session = SessionLocal()
+    with presupuesto_sql.maximo(0, "jugador en caché"):
+        assert obtener_jugador_por_id(session, jugador_id).id == jugador_id
+    session.close()
+    assert cache_entidades.aciertos == aciertos + 1
+
+
+def test_escrituras_invalidan_la_cache(cliente, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    assert cliente.get(f"/jugadores/{jugador_id}").get_json()["nombre"] == "Juan"
+    cliente.put(f"/jugadores/{jugador_id}", json={"nombre": "Pedro", "equipo_id": liga["equipos"][2]})
+    jugador = cliente.get(f"/jugadores/{jugador_id}").get_json()
+    assert (jugador["nombre"], jugador["equipo_id"]) == ("Pedro", liga["equipos"][2])
+
+    obtener_partido_por_id(SessionLocal(), liga["partido"])
+    cliente.put(f"/partidos/{liga['partido']}/resultado", json={"sets_local": 3, "sets_visitante": 0})
+    SessionLocal.remove()
+    assert obtener_partido_por_id(SessionLocal(), liga["partido"]).sets_local == 3
+
+    assert cliente.delete(f"/jugadores/{jugador_id}").status_code == 200
+    assert cliente.get(f"/jugadores/{jugador_id}").status_code == 404
+
+
+def test_debug_cache_expone_los_contadores(cliente, liga):
+    cliente.get(f"/equipos/{liga['equipos'][0]}")
+    estadisticas = cliente.get("/debug/cache").get_json()
+    assert {"backend", "entradas", "aciertos", "fallos", "expulsiones"} <= set(estadisticas)
@@ -0,0 +1,104 @@
+"""
+Generación y validación del calendario round-robin.
+"""
+from datetime import datetime
+import pytest
+from src.calendario import generar_calendario, jornadas_round_robin, validar_calendario
+from src.database import obtener_engine
+
+
+@pytest.mark.parametrize("equipos", ([1, 2, 3, 4], [1, 2, 3, 4, 5], list(range(1, 11))))
+@pytest.mark.parametrize("ida_y_vuelta", (True, False))
+def test_calendario_generado_es_valido(equipos, ida_y_vuelta):
+    partidos, errores = generar_calendario(2025, equipos, ida_y_vuelta=ida_y_vuelta)
+    assert errores == []
+    assert validar_calendario(partidos, equipos, ida_y_vuelta=ida_y_vuelta) == []
+
+
+def test_cada_equipo_juega_una_vez_por_jornada():
+    for jornada in jornadas_round_robin([1, 2, 3, 4, 5, 6]):
+        equipos = [equipo for cruce in jornada for equipo in cruce]
+        assert sorted(equipos) == [1, 2, 3, 4, 5, 6]
+
+
+def test_con_equipos_impares_descansa_uno_por_jornada():
+    jornadas = jornadas_round_robin([1, 2, 3, 4, 5], ida_y_vuelta=False)
+    assert len(jornadas) == 5
+    assert all(len(jornada) == 2 for jornada in jornadas)
+
+
+def _partido(jornada, dia, local, visitante):
+    return {"jornada": jornada, "fecha": datetime(2025, 1, dia, 19), "sede": f"equipo-{local}",
+            "equipo_local_id": local, "equipo_visitante_id": visitante}
+
+
+def test_validador_detecta_cruce_repetido():
+    partidos = [_partido(1, 4, 1, 2), _partido(2, 11, 1, 2), _partido(3, 18, 3, 1)]
+    errores = validar_calendario(partidos, [1, 2, 3], ida_y_vuelta=False)
+    assert any("repetido" in error for error in errores)
+
+
+def test_validador_detecta_equipo_dos_veces_en_la_jornada():
+    partidos = [_partido(1, 4, 1, 2), _partido(1, 5, 3, 1), _partido(2, 11, 2, 3)]
+    errores = validar_calendario(partidos, [1, 2, 3], ida_y_vuelta=False)
+    assert "El equipo 1 juega dos veces en la jornada 1" in errores
+
+
+def test_validador_detecta_descanso_insuficiente():
+    partidos = [_partido(1, 4, 1, 2), _partido(2, 5, 3, 1), _partido(3, 11, 2, 3)]
+    errores = validar_calendario(partidos, [1, 2, 3], ida_y_vuelta=False, descanso_minimo_dias=2)
+    assert any(error.startswith("El equipo 1 descansa 0 días") for error in errores)
+
+
+def test_validador_detecta_cruce_no_valido():
+    errores = validar_calendario([_partido(1, 4, 1, 1)], [1, 2], ida_y_vuelta=False)
+    assert "Cruce no válido en la jornada 1: 1 - 1" in errores
+
+
+def test_crear_calendario_por_http(cliente):
+    equipos = [cliente.post("/equipos", json={"nombre": f"Equipo {i}", "ciudad": "Cali",
+                                              "entrenador": "Ana García"}).get_json()["id"] for i in range(4)]
+    respuesta = cliente.post("/temporadas/2025/calendario", json={})
+    assert respuesta.status_code == 201
+    assert respuesta.get_json()["total"] == len(equipos) * (len(equipos) - 1)
+    assert cliente.post("/temporadas/2025/calendario", json={}).status_code == 409
+
+
+@pytest.mark.parametrize("cuerpo", (
+    {"dias_entre_jornadas": "7"},
+    {"descanso_minimo_dias": 1.5},
+    {"horarios": [19]},
+    {"horarios": "19:00"},
+    {"equipos": "1,2"},
+    {"equipos": [1, "2"]},
+    {"inicio": 20250111},
+    {"ida_y_vuelta": "no"},
+    {"sedes": ["Coliseo"]},
+    {"sedes": {"uno": "Coliseo"}},
+    {"fechas_excluidas": "2025-01-18"},
+    [1, 2],
+))
+def test_parametros_con_tipo_no_valido_son_400(cliente, cuerpo):
+    for i in range(4):
+        cliente.post("/equipos", json={"nombre": f"Equipo {i}", "ciudad": "Cali", "entrenador": "Ana García"})
+    respuesta = cliente.post("/temporadas/2025/calendario", json=cuerpo)
+    assert respuesta.status_code == 400
+    assert "error" in respuesta.get_json()
+
+
+def test_sin_insert_returning_de_varias_filas(cliente, monkeypatch):
+    equipos = [cliente.post("/equipos", json={"nombre": f"Equipo {i}", "ciudad": "Cali",
+                                              "entrenador": "Ana García"}).get_json()["id"] for i in range(6)]
+    # Partido de la temporada entre dos equipos que no entran en el calendario: no debe devolverse.
+    cliente.post("/partidos", json={"fecha": "2026-03-01", "hora": "8:00 PM", "equipo_local_id": equipos[4],
+                                    "equipo_visitante_id": equipos[5]})
+    equipos = equipos[:4]
+    monkeypatch.setattr(obtener_engine().dialect, "insert_executemany_returning", False)
+
+    respuesta = cliente.post("/temporadas/2026/calendario", json={"equipos": equipos})
+    assert respuesta.status_code == 201
+    partidos = respuesta.get_json()["partidos"]
+    assert len(partidos) == 12
+    assert partidos == sorted(partidos, key=lambda partido: (partido["fecha"], partido["id"]))
+    assert {(partido["equipo_local_id"], partido["equipo_visitante_id"]) for partido in partidos} == {
+        (local, visitante) for local in equipos for visitante in equipos if local != visitante}
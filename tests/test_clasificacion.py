@@ -0,0 +1,64 @@
+"""
+Clasificación mantenida de forma incremental, su recálculo completo y el comando de verificación.
+"""
+from src import clasificacion
+from src.database import Clasificacion
+
+
+def _filas(cliente):
+    return {fila["equipo_id"]: fila for fila in cliente.get("/clasificacion").get_json()}
+
+
+def test_puntos_fivb_y_correccion_del_resultado(cliente, liga):
+    local, visitante, _ = liga["equipos"]
+    cliente.put(f"/partidos/{liga['partido']}/resultado", json={"sets_local": 3, "sets_visitante": 2})
+    filas = _filas(cliente)
+    assert (filas[local]["puntos"], filas[visitante]["puntos"]) == (2, 1)
+    assert (filas[local]["sets_favor"], filas[local]["sets_contra"]) == (3, 2)
+
+    cliente.put(f"/partidos/{liga['partido']}/resultado", json={"sets_local": 0, "sets_visitante": 3})
+    filas = _filas(cliente)
+    assert (filas[local]["puntos"], filas[visitante]["puntos"]) == (0, 3)
+    assert (filas[local]["partidos_jugados"], filas[visitante]["partidos_ganados"]) == (1, 1)
+    assert [fila["equipo_id"] for fila in cliente.get("/clasificacion").get_json()][0] == visitante
+
+
+def test_resultado_no_valido_es_400(cliente, liga):
+    respuesta = cliente.put(f"/partidos/{liga['partido']}/resultado", json={"sets_local": 3, "sets_visitante": 3})
+    assert respuesta.status_code == 400
+
+
+def test_equipo_nuevo_aparece_a_cero(cliente, liga):
+    assert set(_filas(cliente)) == set(liga["equipos"])
+    assert all(fila["puntos"] == 0 for fila in _filas(cliente).values())
+
+
+def test_incremental_igual_al_recalculo(cliente, liga, session):
+    local = liga["jugadores"][liga["equipos"][0]]
+    cliente.put(f"/partidos/{liga['partido']}/resultado", json={"sets_local": 3, "sets_visitante": 1})
+    cliente.post("/estadisticas", json={"jugador_id": local[0], "partido_id": liga["partido"], "puntos": 20})
+    cliente.put(f"/jugadores/{local[1]}", json={"equipo_id": liga["equipos"][2]})
+    cliente.delete(f"/jugadores/{local[2]}")
+    assert clasificacion.verificar_clasificacion(session) == []
+    assert _filas(cliente)[liga["equipos"][0]]["puntos_anotados"] == 20 + 3
+
+
+def test_comando_verifica_y_reconstruye(cliente, liga, session, monkeypatch, capsys):
+    cliente.put(f"/partidos/{liga['partido']}/resultado", json={"sets_local": 3, "sets_visitante": 0})
+    session.query(Clasificacion).filter(Clasificacion.equipo_id == liga["equipos"][0]).update({"puntos": 99})
+    session.commit()
+
+    monkeypatch.setattr("sys.argv", ["clasificacion", "verificar"])
+    assert clasificacion.main() == 1
+    assert f"Equipo {liga['equipos'][0]}: puntos = 99, esperado 3" in capsys.readouterr().out
+
+    monkeypatch.setattr("sys.argv", ["clasificacion", "reconstruir"])
+    assert clasificacion.main() == 0
+    monkeypatch.setattr("sys.argv", ["clasificacion", "verificar"])
+    assert clasificacion.main() == 0
+    assert _filas(cliente)[liga["equipos"][0]]["puntos"] == 3
+
+
+def test_comando_desconocido(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["clasificacion", "borrar"])
+    assert clasificacion.main() == 2
@@ -0,0 +1,69 @@
+"""
+Convocatoria de un partido: lectura de las dos plantillas y actualización en bloque.
+"""
+
+
+def _disponibilidad(cliente, partido_id):
+    convocatoria = cliente.get(f"/partidos/{partido_id}/convocatoria").get_json()
+    return {jugador["id"]: (jugador["disponible"], jugador["lesion_tipo"])
+            for jugador in convocatoria["local"] + convocatoria["visitante"]}
+
+
+def test_plantillas_local_y_visitante(cliente, liga):
+    local, visitante, _ = liga["equipos"]
+    convocatoria = cliente.get(f"/partidos/{liga['partido']}/convocatoria").get_json()
+    assert convocatoria["partido_id"] == liga["partido"]
+    assert [jugador["id"] for jugador in convocatoria["local"]] == liga["jugadores"][local]
+    assert [jugador["id"] for jugador in convocatoria["visitante"]] == liga["jugadores"][visitante]
+    assert all(jugador["disponible"] for jugador in convocatoria["local"] + convocatoria["visitante"])
+
+
+def test_equipo_sin_jugadores_y_jugador_sin_estado(cliente, liga):
+    sin_plantilla = cliente.post("/equipos", json={"nombre": "Nuevo", "ciudad": "Cali",
+                                                   "entrenador": "Ana García"}).get_json()["id"]
+    partido_id = cliente.post("/partidos", json={"fecha": "2024-06-01", "hora": "8:00 PM",
+                                                 "equipo_local_id": liga["equipos"][2],
+                                                 "equipo_visitante_id": sin_plantilla}).get_json()["id"]
+    convocatoria = cliente.get(f"/partidos/{partido_id}/convocatoria").get_json()
+    assert convocatoria["visitante"] == []
+    assert {(jugador["disponible"], jugador["lesion_tipo"]) for jugador in convocatoria["local"]} == {(None, None)}
+
+
+def test_actualizacion_en_bloque_con_errores_por_fila(cliente, liga, presupuesto_sql):
+    local, _, ajeno = liga["equipos"]
+    lesionado, disponible = liga["jugadores"][local][:2]
+    respuesta = cliente.put(f"/partidos/{liga['partido']}/convocatoria", json={"jugadores": [
+        {"jugador_id": lesionado, "disponible": False, "lesion_tipo": "Hombro"},
+        {"jugador_id": disponible, "disponible": True},
+        {"jugador_id": liga["jugadores"][ajeno][0], "disponible": True},
+        {"jugador_id": lesionado, "disponible": "no"},
+        "no es un objeto",
+    ]})
+    assert respuesta.status_code == 200
+    resultado = respuesta.get_json()
+    assert resultado["actualizados"] == 2
+    assert [error["indice"] for error in resultado["errores"]] == [2, 3, 4]
+    assert resultado["errores"][0]["jugador_id"] == liga["jugadores"][ajeno][0]
+
+    disponibilidad = _disponibilidad(cliente, liga["partido"])
+    assert disponibilidad[lesionado] == (False, "Hombro")
+    assert disponibilidad[disponible] == (True, None)
+
+
+def test_convocatoria_cambia_el_etag_del_partido(cliente, liga):
+    ruta = f"/partidos/{liga['partido']}/estado_jugadores"
+    etag = cliente.get(ruta).headers["ETag"]
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    cliente.put(f"/partidos/{liga['partido']}/convocatoria", json=[{"jugador_id": jugador_id, "disponible": False}])
+    assert cliente.get(ruta, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_peticiones_no_validas(cliente, liga):
+    ruta = f"/partidos/{liga['partido']}/convocatoria"
+    assert cliente.put(ruta, json=[]).status_code == 400
+    assert cliente.put(ruta, json={"jugadores": "todos"}).status_code == 400
+    sin_validas = cliente.put(ruta, json=[{"jugador_id": 0, "disponible": True}])
+    assert sin_validas.status_code == 400
+    assert sin_validas.get_json()["actualizados"] == 0
+    assert cliente.put("/partidos/0/convocatoria", json=[{"jugador_id": 1, "disponible": True}]).status_code == 404
+    assert cliente.get("/partidos/0/convocatoria").status_code == 404
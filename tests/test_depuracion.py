@@ -0,0 +1,57 @@
+"""
+Modo de depuración de SQL: presupuesto por bloque, detector de N+1 y log de consultas lentas.
+"""
+import logging
+from sqlalchemy import select
+from src.database import Jugador
+from src.depuracion import depuracion_sql, forma_sentencia
+from src.negocio import obtener_jugadores_de_equipo, obtener_partidos
+
+
+def test_forma_sentencia_ignora_los_parametros():
+    assert forma_sentencia("SELECT * FROM jugador WHERE id IN (?, ?, ?)") == \
+        forma_sentencia("SELECT *\n  FROM jugador WHERE id IN (?)") == "SELECT * FROM jugador WHERE id IN (...)"
+    assert forma_sentencia("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)") == "INSERT INTO t (a, b) VALUES (...)"
+    assert forma_sentencia("SELECT * FROM t WHERE a = :a_1") == "SELECT * FROM t WHERE a = :a_1"
+
+
+def test_maximo_detecta_el_exceso(liga, session, presupuesto_sql):
+    with presupuesto_sql.maximo(1, "dos listados"):
+        obtener_partidos(session, limit=50)
+        obtener_jugadores_de_equipo(session, liga["equipos"][0], limit=50)
+    assert [exceso["sentencias"] for exceso in presupuesto_sql.excesos] == [2]
+    presupuesto_sql.excesos.clear()
+
+
+def test_detector_de_n_mas_1(liga, session, presupuesto_sql, caplog):
+    jugadores = liga["jugadores"][liga["equipos"][0]]
+    with caplog.at_level(logging.WARNING, logger="superliga.sql"):
+        with presupuesto_sql.maximo(2, "jugadores uno a uno"):
+            for jugador_id in jugadores:
+                session.execute(select(Jugador.nombre).where(Jugador.id == jugador_id)).one()
+    exceso, = presupuesto_sql.excesos
+    presupuesto_sql.excesos.clear()
+    repetida, = exceso["repetidas"]
+    assert repetida["veces"] == len(jugadores)
+    assert repetida["sentencia"].startswith("SELECT jugador.nombre FROM jugador WHERE jugador.id =")
+    assert repetida["origen"].startswith(__file__)
+    assert "test_detector_de_n_mas_1" in repetida["origen"]
+    assert "sentencia repetida (posible N+1)" in caplog.text
+
+
+def test_repeticiones_bajo_el_umbral_no_son_n_mas_1(liga, session, presupuesto_sql):
+    with presupuesto_sql.maximo(3):
+        obtener_partidos(session, limit=50)
+        obtener_jugadores_de_equipo(session, liga["equipos"][0], limit=50)
+        obtener_jugadores_de_equipo(session, liga["equipos"][1], limit=50)
+    assert presupuesto_sql.excesos == []
+
+
+def test_log_de_consultas_lentas(liga, session, monkeypatch, caplog):
+    monkeypatch.setattr(depuracion_sql, "umbral_lenta_ms", 0.0)
+    with caplog.at_level(logging.WARNING, logger="superliga.sql"):
+        session.execute(select(Jugador.id).where(Jugador.equipo_id == liga["equipos"][0])).all()
+    registro, = [r for r in caplog.records if r.getMessage() == "consulta lenta"]
+    assert registro.sentencia.startswith("SELECT jugador.id FROM jugador WHERE jugador.equipo_id =")
+    assert str(liga["equipos"][0]) in registro.parametros
+    assert "test_log_de_consultas_lentas" in registro.origen
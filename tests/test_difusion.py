@@ -0,0 +1,94 @@
+"""
+Server-Sent Events del marcador en directo: un productor por partido compartido por todos los clientes.
+"""
+import json
+import pytest
+from src import difusion
+from src.difusion import Difusor
+
+ESPERA = 5
+
+
+@pytest.fixture
+def difusor(monkeypatch):
+    monkeypatch.setattr(difusion, "INTERVALO", 0.01)
+    difusor = Difusor()
+    yield difusor
+    difusor.detener()
+
+
+def _anotar(cliente, liga, jugador_id, veces=1):
+    eventos = [{"jugador_id": jugador_id, "tipo": "punto", "set": 1}] * veces
+    assert cliente.post(f"/partidos/{liga['partido']}/eventos", json=eventos).status_code == 201
+
+
+def _leer(suscripcion) -> tuple[int, str, dict]:
+    mensaje = suscripcion.cola.get(timeout=ESPERA).decode()
+    campos = dict(linea.split(": ", 1) for linea in mensaje.strip().splitlines())
+    return int(campos["id"]), campos["event"], json.loads(campos["data"])
+
+
+def test_un_productor_para_todos_los_clientes(cliente, liga, difusor):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    _anotar(cliente, liga, jugador_id, veces=2)
+    primera = difusor.suscribir(liga["partido"])
+    segunda = difusor.suscribir(liga["partido"])
+    assert difusor.estadisticas() == {liga["partido"]: 2}
+
+    evento_id, nombre, datos = _leer(primera)
+    assert nombre == "estadisticas"
+    assert {fila["jugador_id"]: fila["puntos"] for fila in datos["estadisticas"]} == {jugador_id: 2}
+    assert _leer(segunda)[0] == evento_id
+
+    _anotar(cliente, liga, jugador_id)
+    assert _leer(primera)[0] > evento_id
+    difusor.desuscribir(liga["partido"], primera)
+    difusor.desuscribir(liga["partido"], segunda)
+
+
+def test_last_event_id_solo_reenvia_si_hay_cambios(cliente, liga, difusor):
+    _anotar(cliente, liga, liga["jugadores"][liga["equipos"][0]][0])
+    evento_id = _leer(difusor.suscribir(liga["partido"]))[0]
+
+    al_dia = difusor.suscribir(liga["partido"], ultimo_id=evento_id)
+    atrasada = difusor.suscribir(liga["partido"], ultimo_id=evento_id - 1)
+    assert _leer(atrasada)[0] == evento_id
+    assert al_dia.cola.empty()
+
+
+def test_cliente_lento_se_descarta(cliente, liga, difusor):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    _anotar(cliente, liga, jugador_id)
+    lenta = difusion.Suscripcion(tamano=1)
+    rapida = difusor.suscribir(liga["partido"])
+    difusor._productores[liga["partido"]].agregar(lenta)
+    _leer(rapida)
+
+    _anotar(cliente, liga, jugador_id)
+    _leer(rapida)
+    assert lenta.descartada
+    assert difusor.estadisticas() == {liga["partido"]: 1}
+    assert list(lenta.mensajes()) == []
+
+
+def test_stream_de_un_partido_finalizado(cliente, liga, monkeypatch):
+    monkeypatch.setattr(difusion, "INTERVALO", 0.01)
+    _anotar(cliente, liga, liga["jugadores"][liga["equipos"][0]][0])
+    assert cliente.post(f"/partidos/{liga['partido']}/finalizar").status_code == 200
+
+    respuesta = cliente.get(f"/partidos/{liga['partido']}/stream")
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == "text/event-stream"
+    assert respuesta.headers["Cache-Control"] == "no-cache"
+    mensajes = respuesta.data.decode().strip().split("\n\n")
+    assert len(mensajes) == 1
+    assert "event: final" in mensajes[0]
+    assert json.loads(mensajes[0].split("data: ", 1)[1])["finalizado"] is True
+
+
+@pytest.mark.parametrize("ruta, cabeceras, estado", (
+    ("/partidos/{partido}/stream", {"Last-Event-ID": "abc"}, 400),
+    ("/partidos/0/stream", {}, 404),
+))
+def test_errores_antes_de_abrir_el_stream(cliente, liga, ruta, cabeceras, estado):
+    assert cliente.get(ruta.format(partido=liga["partido"]), headers=cabeceras).status_code == estado
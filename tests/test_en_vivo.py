@@ -0,0 +1,54 @@
+"""
+Box score en directo servido desde el registro evento_partido, sea cual sea el worker.
+"""
+from src.en_vivo import agregador_en_vivo
+
+
+def _anotar(cliente, liga, jugador_id, tipo="punto", veces=1):
+    eventos = [{"jugador_id": jugador_id, "tipo": tipo, "set": 1}] * veces
+    respuesta = cliente.post(f"/partidos/{liga['partido']}/eventos", json=eventos)
+    assert respuesta.status_code == 201
+
+
+def test_otro_worker_sirve_el_box_score_en_directo(cliente, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    _anotar(cliente, liga, jugador_id, veces=2)
+    # Otro worker: no tiene el marcador en memoria.
+    agregador_en_vivo.terminar(liga["partido"])
+
+    respuesta = cliente.get(f"/partidos/{liga['partido']}/estadisticas")
+    assert respuesta.headers["X-En-Vivo"] == "1"
+    assert {fila["jugador_id"]: fila["puntos"] for fila in respuesta.get_json()} == {jugador_id: 2}
+
+    _anotar(cliente, liga, jugador_id, tipo="bloqueo")
+    fila, = cliente.get(f"/partidos/{liga['partido']}/estadisticas").get_json()
+    assert (fila["puntos"], fila["bloqueos"]) == (2, 1)
+
+
+def test_partido_terminado_en_otro_worker_lee_las_estadisticas_guardadas(cliente, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    _anotar(cliente, liga, jugador_id, veces=5)
+    cliente.get(f"/partidos/{liga['partido']}/estadisticas")
+    assert cliente.post(f"/partidos/{liga['partido']}/finalizar").status_code == 200
+
+    respuesta = cliente.get(f"/partidos/{liga['partido']}/estadisticas")
+    assert "X-En-Vivo" not in respuesta.headers
+    assert {fila["jugador_id"]: fila["puntos"] for fila in respuesta.get_json()}[jugador_id] == 5
+    assert agregador_en_vivo.partidos_en_juego() == []
+
+
+def test_partido_sin_eventos_no_queda_en_memoria(cliente, liga, presupuesto_sql):
+    respuesta = cliente.get(f"/partidos/{liga['partido']}/estadisticas")
+    assert "X-En-Vivo" not in respuesta.headers
+    assert agregador_en_vivo.partidos_en_juego() == []
+
+
+def test_eliminar_un_jugador_con_eventos(cliente, liga):
+    jugador_id, otro_id = liga["jugadores"][liga["equipos"][0]][:2]
+    _anotar(cliente, liga, jugador_id, veces=2)
+    _anotar(cliente, liga, otro_id)
+    assert cliente.delete(f"/jugadores/{jugador_id}").status_code == 200
+    agregador_en_vivo.terminar(liga["partido"])
+
+    respuesta = cliente.get(f"/partidos/{liga['partido']}/estadisticas")
+    assert {fila["jugador_id"]: fila["puntos"] for fila in respuesta.get_json()} == {otro_id: 1}
@@ -0,0 +1,101 @@
+"""
+Escritura diferida: 202 con la fila en la cola local, lecturas que ven las escrituras pendientes y
+vaciado por lotes con sus caminos de error.
+"""
+import logging
+import pytest
+from src import escritura_diferida as modulo
+from src.escritura_diferida import ColaEscritura, escritura_diferida
+
+
+@pytest.fixture
+def diferida(cliente, monkeypatch, tmp_path):
+    monkeypatch.setattr(escritura_diferida, "cola", ColaEscritura(str(tmp_path / "cola.sqlite3")))
+    monkeypatch.setattr(escritura_diferida, "escritas", 0)
+    monkeypatch.setattr(escritura_diferida, "descartadas", 0)
+    return escritura_diferida
+
+
+def _puntos(cliente, partido_id):
+    filas = cliente.get(f"/partidos/{partido_id}/estadisticas").get_json()
+    return {fila["jugador_id"]: fila["puntos"] for fila in filas}
+
+
+def _anotados(cliente, equipo_id):
+    return {fila["equipo_id"]: fila for fila in cliente.get("/clasificacion").get_json()}[equipo_id]["puntos_anotados"]
+
+
+def test_lecturas_ven_la_cola_y_el_vaciado_la_escribe(cliente, liga, diferida):
+    equipo_id = liga["equipos"][0]
+    jugador_id = liga["jugadores"][equipo_id][0]
+    ruta = f"/partidos/{liga['partido']}/estadisticas"
+    etag = cliente.get(ruta).headers["ETag"]
+
+    respuesta = cliente.post("/estadisticas", json={"jugador_id": jugador_id, "partido_id": liga["partido"],
+                                                    "puntos": 10})
+    assert respuesta.status_code == 202
+    assert _puntos(cliente, liga["partido"])[jugador_id] == 10
+    assert cliente.get(ruta, headers={"If-None-Match": etag}).status_code == 200
+    assert _anotados(cliente, equipo_id) == 12
+    assert cliente.get("/debug/escritura").get_json()["pendientes"] == 1
+
+    diferida.vaciar()
+    assert diferida.estadisticas() == {"activa": True, "pendientes": 0, "escritas": 1, "descartadas": 0}
+    assert _puntos(cliente, liga["partido"])[jugador_id] == 10
+    assert _anotados(cliente, equipo_id) == 19
+
+
+def test_vaciado_en_lotes(cliente, liga, diferida, monkeypatch):
+    monkeypatch.setattr(diferida, "lote", 3)
+    for jugador_id in liga["jugadores"][liga["equipos"][0]]:
+        respuesta = cliente.post("/estado_jugadores", json={"jugador_id": jugador_id, "partido_id": liga["partido"],
+                                                            "disponible": False, "lesion_tipo": "Tobillo"})
+        assert respuesta.status_code == 202
+    lotes = []
+    escribir_lote = modulo.escribir_lote
+
+    def contar(session, filas):
+        lotes.append(len(filas))
+        escribir_lote(session, filas)
+
+    monkeypatch.setattr(modulo, "escribir_lote", contar)
+    diferida.vaciar()
+    assert lotes == [3, 1]
+    assert diferida.cola.tamano() == 0
+    estados = cliente.get(f"/partidos/{liga['partido']}/estado_jugadores").get_json()
+    assert sum(estado["lesion_tipo"] == "Tobillo" for estado in estados) == 4
+
+
+def test_lote_rechazado_se_reintenta_fila_a_fila(cliente, liga, diferida, caplog):
+    jugadores = liga["jugadores"][liga["equipos"][0]]
+    for jugador_id in jugadores[:2]:
+        assert cliente.post("/estadisticas", json={"jugador_id": jugador_id, "partido_id": liga["partido"],
+                                                   "puntos": 7}).status_code == 202
+    # Jugador eliminado después de encolar su estadística: la FK rechaza su fila al vaciar.
+    assert cliente.delete(f"/jugadores/{jugadores[0]}").status_code == 200
+
+    with caplog.at_level(logging.ERROR, logger="superliga.escritura_diferida"):
+        diferida.vaciar()
+    assert (diferida.escritas, diferida.descartadas, diferida.cola.tamano()) == (1, 1, 0)
+    assert "fila de la cola descartada" in caplog.text
+    assert _puntos(cliente, liga["partido"])[jugadores[1]] == 7
+
+
+def test_error_transitorio_deja_el_lote_en_la_cola(cliente, liga, diferida, monkeypatch, caplog):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    cliente.post("/estadisticas", json={"jugador_id": jugador_id, "partido_id": liga["partido"], "puntos": 8})
+    escribir_lote = modulo.escribir_lote
+
+    def falla(session, filas):
+        raise RuntimeError("base de datos caída")
+
+    monkeypatch.setattr(modulo, "escribir_lote", falla)
+    with caplog.at_level(logging.ERROR, logger="superliga.escritura_diferida"):
+        diferida.vaciar()
+    assert "error vaciando la cola de escritura" in caplog.text
+    assert diferida.cola.tamano() == 1
+    assert _puntos(cliente, liga["partido"])[jugador_id] == 8
+
+    monkeypatch.setattr(modulo, "escribir_lote", escribir_lote)
+    diferida.vaciar()
+    assert (diferida.escritas, diferida.cola.tamano()) == (1, 0)
@@ -0,0 +1,52 @@
+"""
+Carga masiva del box score de un partido: POST /partidos/<id>/estadisticas/bulk.
+"""
+from src.negocio import crear_estadisticas_bulk
+
+
+def test_carga_valida_cada_linea_y_devuelve_los_errores_por_fila(cliente, liga):
+    local = liga["jugadores"][liga["equipos"][0]]
+    respuesta = cliente.post(f"/partidos/{liga['partido']}/estadisticas/bulk", json=[
+        {"jugador_id": local[0], "puntos": 12, "bloqueos": 3},
+        {"jugador_id": 9999, "puntos": 1},
+        {"puntos": 1},
+        {"jugador_id": local[1], "saques": 2},
+    ])
+    assert respuesta.status_code == 201
+    cuerpo = respuesta.get_json()
+    assert cuerpo["creadas"] == 2
+    assert [(error["indice"], error.get("jugador_id")) for error in cuerpo["errores"]] == [(1, 9999), (2, None)]
+
+    filas = {fila["jugador_id"]: fila for fila in cliente.get(f"/partidos/{liga['partido']}/estadisticas").get_json()}
+    assert (filas[local[0]]["puntos"], filas[local[0]]["bloqueos"]) == (12, 3)
+    assert (filas[local[1]]["puntos"], filas[local[1]]["saques"]) == (0, 2)
+
+
+def test_acepta_el_objeto_con_la_lista_de_estadisticas(cliente, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][1]][0]
+    respuesta = cliente.post(f"/partidos/{liga['partido']}/estadisticas/bulk",
+                             json={"estadisticas": [{"jugador_id": jugador_id, "puntos": 7}]})
+    assert respuesta.status_code == 201
+    assert respuesta.get_json() == {"creadas": 1, "errores": []}
+
+
+def test_sin_lineas_validas_no_escribe_nada(cliente, liga):
+    antes = cliente.get(f"/partidos/{liga['partido']}/estadisticas").get_json()
+    respuesta = cliente.post(f"/partidos/{liga['partido']}/estadisticas/bulk", json=[{"jugador_id": 9999}])
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["creadas"] == 0
+    assert cliente.get(f"/partidos/{liga['partido']}/estadisticas").get_json() == antes
+
+
+def test_peticiones_no_validas(cliente, liga):
+    assert cliente.post(f"/partidos/{liga['partido']}/estadisticas/bulk", json=[]).status_code == 400
+    assert cliente.post(f"/partidos/{liga['partido']}/estadisticas/bulk", json={"puntos": 1}).status_code == 400
+    assert cliente.post("/partidos/9999/estadisticas/bulk", json=[{"jugador_id": 1}]).status_code == 404
+
+
+def test_las_sentencias_no_crecen_con_las_lineas(liga, session, presupuesto_sql):
+    jugadores = liga["jugadores"][liga["equipos"][0]] + liga["jugadores"][liga["equipos"][1]]
+    with presupuesto_sql.maximo(6, "dos líneas"):
+        crear_estadisticas_bulk(session, liga["partido"], [{"jugador_id": j, "puntos": 1} for j in jugadores[:2]])
+    with presupuesto_sql.maximo(6, "ocho líneas"):
+        crear_estadisticas_bulk(session, liga["partido"], [{"jugador_id": j, "puntos": 2} for j in jugadores])
@@ -0,0 +1,68 @@
+"""
+GET condicionales: ETag y Last-Modified a partir del contador de versión de cada ámbito.
+"""
+import pytest
+from src import app
+
+
+@pytest.mark.parametrize("ruta", ("/partidos/{partido}/estadisticas", "/equipos/{equipo}/jugadores",
+                                  "/equipos/{equipo}", "/partidos/{partido}", "/clasificacion"))
+def test_if_none_match_responde_304_sin_cuerpo(cliente, liga, ruta):
+    ruta = ruta.format(partido=liga["partido"], equipo=liga["equipos"][0])
+    respuesta = cliente.get(ruta)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["Cache-Control"] == "no-cache"
+    no_modificada = cliente.get(ruta, headers={"If-None-Match": respuesta.headers["ETag"]})
+    assert no_modificada.status_code == 304
+    assert no_modificada.headers["ETag"] == respuesta.headers["ETag"]
+    assert not no_modificada.data
+
+
+def test_la_escritura_cambia_el_etag_de_su_ambito(cliente, liga):
+    estadisticas = f"/partidos/{liga['partido']}/estadisticas"
+    jugadores = f"/equipos/{liga['equipos'][2]}/jugadores"
+    etags = {ruta: cliente.get(ruta).headers["ETag"] for ruta in (estadisticas, jugadores)}
+
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    cliente.post("/estadisticas", json={"jugador_id": jugador_id, "partido_id": liga["partido"], "puntos": 9})
+    assert cliente.get(estadisticas, headers={"If-None-Match": etags[estadisticas]}).status_code == 200
+    assert cliente.get(jugadores, headers={"If-None-Match": etags[jugadores]}).status_code == 304
+
+    cliente.post("/jugadores", json={"nombre": "Ana", "apellido": "García", "posicion": "Líbero", "numero": 9,
+                                     "equipo_id": liga["equipos"][2]})
+    assert cliente.get(jugadores, headers={"If-None-Match": etags[jugadores]}).status_code == 200
+
+
+def test_etag_de_otra_entidad_no_vale(cliente, liga):
+    etag = cliente.get(f"/equipos/{liga['equipos'][0]}").headers["ETag"]
+    assert cliente.get(f"/equipos/{liga['equipos'][1]}", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_if_modified_since(cliente, liga):
+    ruta = f"/equipos/{liga['equipos'][0]}"
+    ultima = cliente.get(ruta).headers["Last-Modified"]
+    assert cliente.get(ruta, headers={"If-Modified-Since": ultima}).status_code == 304
+    assert cliente.get(ruta, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}).status_code == 200
+
+
+def test_304_no_ejecuta_la_vista(cliente, liga, monkeypatch):
+    monkeypatch.setattr(app, "SERVER_TIMING", True)
+    ruta = f"/partidos/{liga['partido']}/estadisticas"
+    etag = cliente.get(ruta).headers["ETag"]
+    respuesta = cliente.get(ruta, headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+    assert '"1 sentencias"' in respuesta.headers["Server-Timing"]
+
+
+def test_resultado_cambia_el_etag_de_la_clasificacion(cliente, liga):
+    etag = cliente.get("/clasificacion").headers["ETag"]
+    cliente.put(f"/partidos/{liga['partido']}/resultado", json={"sets_local": 3, "sets_visitante": 1})
+    respuesta = cliente.get("/clasificacion", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["ETag"] != etag
+
+
+def test_entidad_inexistente_no_lleva_etag(cliente):
+    respuesta = cliente.get("/equipos/9999")
+    assert respuesta.status_code == 404
+    assert "ETag" not in respuesta.headers
@@ -0,0 +1,72 @@
+"""
+Exportación completa en NDJSON y CSV, por HTTP y por línea de comandos.
+"""
+import csv
+import io
+import json
+import pytest
+from src import exportacion
+
+
+def _partido(cliente, liga, fecha):
+    return cliente.post("/partidos", json={"fecha": fecha, "hora": "8:00 PM", "equipo_local_id": liga["equipos"][1],
+                                           "equipo_visitante_id": liga["equipos"][2]}).get_json()["id"]
+
+
+def test_ndjson_una_linea_por_fila(cliente, liga):
+    respuesta = cliente.get("/export/estadisticas")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["Content-Type"] == "application/x-ndjson"
+    assert respuesta.headers["Content-Disposition"] == "attachment; filename=estadisticas.ndjson"
+    filas = [json.loads(linea) for linea in respuesta.data.decode().splitlines()]
+    assert len(filas) == 8
+    assert [fila["id"] for fila in filas] == sorted(fila["id"] for fila in filas)
+    assert set(filas[0]) == {"id", "jugador_id", "partido_id", "fecha", "puntos", "bloqueos", "saques",
+                             "recepciones"}
+    assert filas[0]["fecha"].startswith("2024-05-20")
+
+
+def test_csv_con_cabecera(cliente, liga):
+    respuesta = cliente.get("/export/partidos?formato=csv")
+    assert respuesta.headers["Content-Type"] == "text/csv; charset=utf-8"
+    filas = list(csv.reader(io.StringIO(respuesta.data.decode())))
+    assert filas[0] == ["id", "fecha", "equipo_local_id", "equipo_visitante_id", "sets_local", "sets_visitante"]
+    assert filas[1][0] == str(liga["partido"])
+    assert filas[1][4:] == ["", ""]
+
+
+def test_filtros_por_temporada_y_fechas(cliente, liga):
+    _partido(cliente, liga, "2025-03-01")
+    _partido(cliente, liga, "2025-06-01")
+
+    def fechas(consulta):
+        respuesta = cliente.get(f"/export/partidos?{consulta}")
+        return [json.loads(linea)["fecha"][:10] for linea in respuesta.data.decode().splitlines()]
+    assert fechas("temporada=2024") == ["2024-05-20"]
+    assert fechas("temporada=2025&hasta=2025-05-01") == ["2025-03-01"]
+    assert fechas("desde=2025-01-01") == ["2025-03-01", "2025-06-01"]
+
+
+def test_exporta_en_lotes(cliente, liga, monkeypatch, session):
+    monkeypatch.setattr(exportacion, "TAMANO_LOTE", 3)
+    bloques = list(exportacion.exportar(session, "estadisticas", "csv"))
+    assert len(bloques) == 3
+    assert sum(bloque.count(b"\n") for bloque in bloques) == 9
+
+
+@pytest.mark.parametrize("consulta", ("formato=xml", "temporada=dos", "desde=ayer"))
+def test_parametros_no_validos_son_400(cliente, consulta):
+    assert cliente.get(f"/export/estadisticas?{consulta}").status_code == 400
+
+
+def test_tipo_desconocido_es_404(cliente):
+    assert cliente.get("/export/equipos").status_code == 404
+
+
+def test_linea_de_comandos(cliente, liga, tmp_path, capsysbinary):
+    salida = tmp_path / "estado.csv"
+    assert exportacion.main(["estado_jugadores", "--formato", "csv", "--salida", str(salida)]) == 0
+    assert len(salida.read_text().splitlines()) == 9
+    assert exportacion.main(["partidos", "--temporada", "2024"]) == 0
+    assert json.loads(capsysbinary.readouterr().out)["id"] == liga["partido"]
+    assert exportacion.main(["partidos", "--desde", "ayer"]) == 2
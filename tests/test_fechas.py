@@ -0,0 +1,34 @@
+"""
+Fechas y horas tipadas y filtros por rango del calendario de partidos.
+"""
+import pytest
+
+
+def _partido(cliente, liga, fecha, hora="8:00 PM", local=1, visitante=2):
+    return cliente.post("/partidos", json={"fecha": fecha, "hora": hora, "equipo_local_id": liga["equipos"][local],
+                                           "equipo_visitante_id": liga["equipos"][visitante]})
+
+
+def test_fecha_y_hora_se_devuelven_normalizadas(cliente, liga):
+    partido = _partido(cliente, liga, "2024-05-21", "7:30 PM").get_json()
+    assert (partido["fecha"], partido["hora"]) == ("2024-05-21", "7:30 PM")
+
+
+@pytest.mark.parametrize("fecha, hora", (("21/05/2024", "8:00 PM"), ("2024-05-21", "25:00")))
+def test_fecha_u_hora_no_validas_son_400(cliente, liga, fecha, hora):
+    assert _partido(cliente, liga, fecha, hora).status_code == 400
+
+
+def test_rango_de_fechas(cliente, liga):
+    for dia in (21, 25, 30):
+        _partido(cliente, liga, f"2024-05-{dia}")
+    partidos = cliente.get("/partidos?desde=2024-05-21&hasta=2024-05-25").get_json()
+    assert [partido["fecha"] for partido in partidos] == ["2024-05-21", "2024-05-25"]
+    assert cliente.get("/partidos?desde=ayer").status_code == 400
+
+
+def test_filtro_por_equipo(cliente, liga):
+    _partido(cliente, liga, "2024-05-21")
+    partidos = cliente.get(f"/partidos?equipo_id={liga['equipos'][2]}").get_json()
+    assert [partido["equipo_visitante_id"] for partido in partidos] == [liga["equipos"][2]]
+    assert cliente.get("/partidos?equipo_id=abc").status_code == 400
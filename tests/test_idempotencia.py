@@ -0,0 +1,63 @@
+"""
+Idempotency-Key en las escrituras: los reintentos repiten la primera respuesta sin volver a escribir.
+"""
+from src import app as modulo_app
+
+
+def test_idempotency_key_repite_la_primera_respuesta(cliente, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    cuerpo = {"jugador_id": jugador_id, "partido_id": liga["partido"], "puntos": 10}
+    cabeceras = {"Idempotency-Key": "estadistica-1"}
+
+    primera = cliente.post("/estadisticas", json=cuerpo, headers=cabeceras)
+    repetida = cliente.post("/estadisticas", json=cuerpo, headers=cabeceras)
+    assert primera.status_code == repetida.status_code == 201
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in primera.headers
+    assert repetida.get_json() == primera.get_json()
+
+    clasificacion = {fila["equipo_id"]: fila for fila in cliente.get("/clasificacion").get_json()}
+    assert clasificacion[liga["equipos"][0]]["puntos_anotados"] == 3 * 3 + 10
+
+
+def test_idempotency_key_con_otra_peticion_es_422(cliente, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    cabeceras = {"Idempotency-Key": "estadistica-2"}
+    cliente.post("/estadisticas", json={"jugador_id": jugador_id, "partido_id": liga["partido"], "puntos": 1},
+                 headers=cabeceras)
+    respuesta = cliente.post("/estadisticas", json={"jugador_id": jugador_id, "partido_id": liga["partido"],
+                                                    "puntos": 2}, headers=cabeceras)
+    assert respuesta.status_code == 422
+
+
+def test_idempotency_key_vacia_es_400(cliente, liga):
+    respuesta = cliente.post(f"/partidos/{liga['partido']}/estadisticas/bulk", json=[],
+                             headers={"Idempotency-Key": ""})
+    assert respuesta.status_code == 400
+
+
+
+def test_idempotency_key_en_la_carga_masiva(cliente, liga):
+    ruta = f"/partidos/{liga['partido']}/estadisticas/bulk"
+    cuerpo = [{"jugador_id": jugador_id, "puntos": 5} for jugador_id in liga["jugadores"][liga["equipos"][0]]]
+    primera = cliente.post(ruta, json=cuerpo, headers={"Idempotency-Key": "bulk-1"})
+    repetida = cliente.post(ruta, json=cuerpo, headers={"Idempotency-Key": "bulk-1"})
+    assert repetida.status_code == primera.status_code
+    assert repetida.data == primera.data
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+
+
+def test_error_del_servidor_no_se_guarda(cliente, liga, monkeypatch):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    cuerpo = {"jugador_id": jugador_id, "partido_id": liga["partido"], "puntos": 4}
+    cabeceras = {"Idempotency-Key": "estadistica-3"}
+
+    def falla(*args, **kwargs):
+        raise RuntimeError("base de datos caída")
+
+    with monkeypatch.context() as parche:
+        parche.setattr(modulo_app, "crear_estadistica", falla)
+        assert cliente.post("/estadisticas", json=cuerpo, headers=cabeceras).status_code == 500
+    reintento = cliente.post("/estadisticas", json=cuerpo, headers=cabeceras)
+    assert reintento.status_code == 201
+    assert "Idempotent-Replayed" not in reintento.headers
@@ -0,0 +1,65 @@
+"""
+Métricas por ruta en formato Prometheus y cabecera Server-Timing.
+"""
+import pytest
+from src import app as modulo_app
+from src.metricas import Histograma, RegistroMetricas, TIPO_CONTENIDO
+
+
+@pytest.fixture
+def registro(monkeypatch):
+    registro = RegistroMetricas()
+    monkeypatch.setattr(modulo_app, "metricas", registro)
+    return registro
+
+
+def _muestras(texto: str) -> dict[str, float]:
+    return {linea.rsplit(" ", 1)[0]: float(linea.rsplit(" ", 1)[1])
+            for linea in texto.splitlines() if linea and not linea.startswith("#")}
+
+
+def test_histograma_acumulado():
+    histograma = Histograma((1, 5))
+    for valor in (0.5, 1, 3, 9):
+        histograma.observar(valor)
+    assert list(histograma.acumuladas()) == [(1, 2), (5, 3), ("+Inf", 4)]
+    assert (histograma.suma, histograma.total) == (13.5, 4)
+
+
+def test_exportar_escapa_las_etiquetas_y_anade_el_pool():
+    registro = RegistroMetricas()
+    registro.registrar("GET", '/ruta/"rara"', 200, 0.02, 0.01, 3, 0.0)
+    texto = registro.exportar({"en_uso": 1, "inactivas": 4})
+    muestras = _muestras(texto)
+    assert muestras['superliga_http_peticiones_total{metodo="GET",ruta="/ruta/\\"rara\\"",status="200"}'] == 1
+    assert muestras['superliga_sql_sentencias_por_peticion_bucket{metodo="GET",ruta="/ruta/\\"rara\\"",le="3"}'] == 1
+    assert muestras["superliga_pool_en_uso"] == 1
+    assert "superliga_pool_overflow" not in texto
+    assert "# TYPE superliga_http_duracion_segundos histogram" in texto
+
+
+def test_metrics_por_patron_de_ruta(cliente, liga, registro):
+    for equipo_id in liga["equipos"]:
+        cliente.get(f"/equipos/{equipo_id}")
+    cliente.get("/equipos/0")
+    cliente.get("/no-existe")
+
+    respuesta = cliente.get("/metrics")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["Content-Type"] == TIPO_CONTENIDO
+    muestras = _muestras(respuesta.data.decode())
+    ruta = 'metodo="GET",ruta="/equipos/<int:equipo_id>"'
+    assert muestras[f"superliga_http_peticiones_total{{{ruta},status=\"200\"}}"] == 3
+    assert muestras[f"superliga_http_peticiones_total{{{ruta},status=\"404\"}}"] == 1
+    assert muestras[f"superliga_http_duracion_segundos_count{{{ruta}}}"] == 4
+    assert muestras[f"superliga_sql_sentencias_por_peticion_sum{{{ruta}}}"] >= 1
+    assert muestras['superliga_http_peticiones_total{metodo="GET",ruta="<sin_ruta>",status="404"}'] == 1
+
+
+def test_server_timing(cliente, liga, monkeypatch):
+    ruta = f"/equipos/{liga['equipos'][0]}"
+    assert "Server-Timing" not in cliente.get(ruta).headers
+    monkeypatch.setattr(modulo_app, "SERVER_TIMING", True)
+    cabecera = cliente.get(ruta).headers["Server-Timing"]
+    assert [parte.split(";")[0] for parte in cabecera.split(", ")] == ["app", "db", "pool"]
+    assert 'desc="1 sentencias"' in cabecera
@@ -0,0 +1,51 @@
+"""
+Paginación por clave (keyset) de los listados: limit, after y X-Next-Cursor.
+"""
+import pytest
+
+
+def _recorrer(cliente, ruta, limit):
+    elementos, siguiente = [], f"{ruta}?limit={limit}"
+    while siguiente:
+        respuesta = cliente.get(siguiente)
+        assert respuesta.status_code == 200
+        elementos += respuesta.get_json()
+        cursor = respuesta.headers.get("X-Next-Cursor")
+        siguiente = f"{ruta}?limit={limit}&after={cursor}" if cursor else None
+    return elementos
+
+
+@pytest.mark.parametrize("ruta", ("/equipos/{equipo}/jugadores", "/partidos/{partido}/estadisticas",
+                                  "/partidos/{partido}/estado_jugadores"))
+def test_cursor_recorre_todas_las_paginas_sin_repetir(cliente, liga, ruta):
+    ruta = ruta.format(equipo=liga["equipos"][0], partido=liga["partido"])
+    completa = cliente.get(ruta).get_json()
+    paginada = _recorrer(cliente, ruta, 3)
+    assert paginada == completa
+    assert [elemento["id"] for elemento in paginada] == sorted(elemento["id"] for elemento in completa)
+
+
+def test_cursor_por_fecha_e_id(cliente, liga):
+    for dia in (21, 21, 22):
+        cliente.post("/partidos", json={"fecha": f"2024-05-{dia}", "hora": "8:00 PM",
+                                        "equipo_local_id": liga["equipos"][1],
+                                        "equipo_visitante_id": liga["equipos"][2]})
+    for ruta in ("/partidos", f"/equipos/{liga['equipos'][1]}/partidos"):
+        partidos = _recorrer(cliente, ruta, 2)
+        assert len({partido["id"] for partido in partidos}) == 4
+        assert partidos == sorted(partidos, key=lambda partido: (partido["fecha"], partido["id"]))
+
+
+def test_ultima_pagina_sin_cursor_y_enlace_next(cliente, liga):
+    ruta = f"/equipos/{liga['equipos'][0]}/jugadores"
+    primera = cliente.get(f"{ruta}?limit=3")
+    assert f"after={primera.headers['X-Next-Cursor']}" in primera.headers["Link"]
+    assert 'rel="next"' in primera.headers["Link"]
+    ultima = cliente.get(f"{ruta}?limit=3&after={primera.headers['X-Next-Cursor']}")
+    assert len(ultima.get_json()) == 1
+    assert "X-Next-Cursor" not in ultima.headers
+
+
+@pytest.mark.parametrize("consulta", ("after=no-es-un-cursor", "limit=0", "limit=501", "limit=diez"))
+def test_parametros_de_paginacion_no_validos_son_400(cliente, liga, consulta):
+    assert cliente.get(f"/partidos?{consulta}").status_code == 400
@@ -0,0 +1,51 @@
+"""
+Número de sentencias SQL de los listados: no puede crecer con el número de filas (N+1).
+"""
+import pytest
+from src.negocio import (
+    obtener_estadisticas_de_partido,
+    obtener_estado_jugadores_de_partido,
+    obtener_jugadores_de_equipo,
+    obtener_partidos,
+    obtener_partidos_de_equipo,
+)
+
+RUTAS_LISTADO = (
+    "/partidos",
+    "/equipos/{equipo}/jugadores",
+    "/equipos/{equipo}/partidos",
+    "/partidos/{partido}/estadisticas",
+    "/partidos/{partido}/estado_jugadores",
+    "/partidos/{partido}/convocatoria",
+    "/clasificacion",
+)
+
+
+@pytest.mark.parametrize("ruta", RUTAS_LISTADO)
+def test_listados_respetan_el_presupuesto_de_la_ruta(cliente, liga, presupuesto_sql, ruta):
+    respuesta = cliente.get(ruta.format(equipo=liga["equipos"][0], partido=liga["partido"]))
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()
+
+
+@pytest.mark.parametrize("ruta", ("/partidos", "/equipos/{equipo}/jugadores", "/partidos/{partido}/estadisticas"))
+def test_listados_en_streaming_respetan_el_presupuesto(cliente, liga, presupuesto_sql, ruta):
+    respuesta = cliente.get(ruta.format(equipo=liga["equipos"][0], partido=liga["partido"]) + "?stream=1")
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()
+
+
+def test_listados_en_una_sentencia(liga, session, presupuesto_sql):
+    equipo_id, partido_id = liga["equipos"][0], liga["partido"]
+    with presupuesto_sql.maximo(1, "obtener_partidos"):
+        partidos = obtener_partidos(session, limit=50)
+    with presupuesto_sql.maximo(1, "obtener_jugadores_de_equipo"):
+        jugadores = obtener_jugadores_de_equipo(session, equipo_id, limit=50)
+    with presupuesto_sql.maximo(1, "obtener_partidos_de_equipo"):
+        obtener_partidos_de_equipo(session, equipo_id, limit=50)
+    with presupuesto_sql.maximo(1, "obtener_estadisticas_de_partido"):
+        estadisticas = obtener_estadisticas_de_partido(session, partido_id, limit=50)
+    with presupuesto_sql.maximo(1, "obtener_estado_jugadores_de_partido"):
+        estados = obtener_estado_jugadores_de_partido(session, partido_id, limit=50)
+    assert (len(partidos), len(jugadores), len(estadisticas), len(estados)) == (1, 4, 8, 8)
+
@@ -0,0 +1,62 @@
+"""
+Resúmenes de temporada de jugador y equipo calculados con un GROUP BY en la base de datos.
+"""
+from src.database import Estadistica
+from src.negocio import obtener_resumen_equipo, obtener_resumen_jugador
+
+
+def _segundo_partido(cliente, liga, puntos_por_jugador):
+    partido_id = cliente.post("/partidos", json={"fecha": "2024-06-01", "hora": "7:00 PM",
+                                                 "equipo_local_id": liga["equipos"][1],
+                                                 "equipo_visitante_id": liga["equipos"][0]}).get_json()["id"]
+    cliente.post(f"/partidos/{partido_id}/estadisticas/bulk",
+                 json=[{"jugador_id": jugador_id, "puntos": puntos, "bloqueos": 1}
+                       for jugador_id, puntos in puntos_por_jugador.items()])
+    return partido_id
+
+
+def test_resumen_de_jugador(cliente, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    _segundo_partido(cliente, liga, {jugador_id: 10})
+    resumen = cliente.get(f"/jugadores/{jugador_id}/resumen").get_json()
+    assert resumen["jugador_id"] == jugador_id
+    assert resumen["partidos"] == 2
+    assert resumen["puntos"] == {"total": 13, "promedio": 6.5, "maximo": 10}
+    assert resumen["bloqueos"] == {"total": 1, "promedio": 0.5, "maximo": 1}
+
+
+def test_resumen_filtrado_por_fechas(cliente, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    _segundo_partido(cliente, liga, {jugador_id: 10})
+    resumen = cliente.get(f"/jugadores/{jugador_id}/resumen?desde=2024-05-25").get_json()
+    assert (resumen["partidos"], resumen["puntos"]["total"]) == (1, 10)
+    resumen = cliente.get(f"/jugadores/{jugador_id}/resumen?hasta=2024-05-25").get_json()
+    assert (resumen["partidos"], resumen["puntos"]["total"]) == (1, 3)
+
+
+def test_resumen_de_equipo(cliente, liga):
+    jugadores = liga["jugadores"][liga["equipos"][0]]
+    _segundo_partido(cliente, liga, {jugadores[0]: 10, jugadores[1]: 5})
+    resumen = cliente.get(f"/equipos/{liga['equipos'][0]}/resumen").get_json()
+    assert resumen["partidos"] == 2
+    assert resumen["puntos"]["total"] == 4 * 3 + 10 + 5
+    assert resumen["puntos"]["maximo"] == 10
+
+
+def test_resumen_sin_estadisticas_y_errores(cliente, liga):
+    jugador_id = liga["jugadores"][liga["equipos"][2]][0]
+    resumen = cliente.get(f"/jugadores/{jugador_id}/resumen").get_json()
+    assert resumen["partidos"] == 0
+    assert resumen["puntos"] == {"total": 0, "promedio": 0, "maximo": 0}
+    assert cliente.get("/jugadores/9999/resumen").status_code == 404
+    assert cliente.get("/equipos/9999/resumen").status_code == 404
+    assert cliente.get(f"/jugadores/{jugador_id}/resumen?desde=ayer").status_code == 400
+
+
+def test_resumen_no_carga_filas_de_estadistica(liga, session, presupuesto_sql):
+    jugador_id = liga["jugadores"][liga["equipos"][0]][0]
+    with presupuesto_sql.maximo(2, "resumen de jugador"):
+        obtener_resumen_jugador(session, jugador_id)
+    with presupuesto_sql.maximo(2, "resumen de equipo"):
+        obtener_resumen_equipo(session, liga["equipos"][0])
+    assert not any(isinstance(objeto, Estadistica) for objeto in session.identity_map.values())
@@ -0,0 +1,65 @@
+"""
+Proyecciones y proveedor JSON de las respuestas.
+"""
+import json
+from types import SimpleNamespace
+import pytest
+from src import serializacion
+
+
+@pytest.mark.skipif(not serializacion.USAR_ORJSON, reason="orjson no está instalado")
+def test_jsonify_usa_orjson(cliente, liga, monkeypatch):
+    llamadas = []
+    dumps_bytes = serializacion.dumps_bytes
+
+    def espia(datos, indentar=False):
+        llamadas.append(indentar)
+        return dumps_bytes(datos, indentar)
+
+    monkeypatch.setattr(serializacion, "dumps_bytes", espia)
+    respuesta = cliente.get(f"/equipos/{liga['equipos'][0]}")
+    assert respuesta.status_code == 200
+    assert llamadas == [False]
+    assert respuesta.data.endswith(b"}\n")
+
+
+@pytest.mark.parametrize("indentar", (False, True))
+def test_dumps_bytes_igual_que_json_estandar(indentar):
+    datos = {"b": [1, 2], "a": "ñandú", "c": None}
+    esperado = json.dumps(datos, ensure_ascii=False, sort_keys=True,
+                          **({"indent": 2} if indentar else {"separators": (",", ":")}))
+    assert serializacion.dumps_bytes(datos, indentar).decode() == esperado
+
+
+def test_proyeccion_con_atributos_y_campos_calculados():
+    objeto = SimpleNamespace(id=1, nombre="Juan", apellido="Pérez")
+    proyeccion = serializacion.Proyeccion("id", ("completo", lambda o: f"{o.nombre} {o.apellido}"))
+    assert proyeccion(objeto) == {"id": 1, "completo": "Juan Pérez"}
+    assert proyeccion.ampliada("nombre").lista([objeto]) == [{"id": 1, "completo": "Juan Pérez", "nombre": "Juan"}]
+    assert serializacion.Proyeccion("nombre")(objeto) == {"nombre": "Juan"}
+
+
+def test_stream_array_en_bloques():
+    filas = [SimpleNamespace(id=i) for i in range(100)]
+    bloques = list(serializacion.stream_array(filas, serializacion.Proyeccion("id"), tamano_bloque=64))
+    assert len(bloques) > 1
+    assert json.loads(b"".join(bloques)) == [{"id": i} for i in range(100)]
+    assert list(serializacion.stream_array([], serializacion.Proyeccion("id"))) == [b"[]"]
+
+
+@pytest.mark.parametrize("ruta", ("/partidos", "/equipos/{equipo}/jugadores", "/equipos/{equipo}/partidos",
+                                  "/partidos/{partido}/estadisticas", "/partidos/{partido}/estado_jugadores"))
+def test_stream_devuelve_el_listado_completo(cliente, liga, ruta):
+    ruta = ruta.format(equipo=liga["equipos"][0], partido=liga["partido"])
+    completo = cliente.get(ruta).get_json()
+    respuesta = cliente.get(f"{ruta}?stream=1&limit=1")
+    assert respuesta.status_code == 200
+    assert respuesta.is_streamed
+    assert respuesta.get_json() == completo
+
+
+@pytest.mark.parametrize("consulta", ("desde=basura", "hasta=2024-13-45", "after=no-es-un-cursor", "equipo_id=abc"))
+def test_stream_valida_los_parametros_antes_de_responder(cliente, liga, consulta):
+    respuesta = cliente.get(f"/partidos?stream=1&{consulta}")
+    assert respuesta.status_code == 400
+    assert "error" in respuesta.get_json()
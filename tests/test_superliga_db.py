@@ -0,0 +1,23 @@
+"""
+Conexión directa al pool compartido.
+"""
+import logging
+from src import superliga_db
+
+
+def test_conectar_db_registra_el_error(monkeypatch, caplog):
+    def sin_servidor():
+        raise ConnectionError("sin servidor")
+    monkeypatch.setattr(superliga_db, "obtener_engine", sin_servidor)
+    with caplog.at_level(logging.ERROR, logger="superliga.db"):
+        assert superliga_db.conectar_db() is None
+    registro, = caplog.records
+    assert registro.message == "Error al conectar a la base de datos"
+    assert registro.exc_info[0] is ConnectionError
+
+
+def test_conectar_y_cerrar(app):
+    conexion = superliga_db.conectar_db()
+    assert conexion is not None
+    superliga_db.cerrar_db(conexion)
+    assert conexion.closed